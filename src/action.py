@@ -1,24 +1,365 @@
 # Copyright 2023 Canonical Ltd.
 # See LICENSE file for licensing details.
 
-from parser import Parser
+import glob
+import json
+import logging
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass
+from parser import (
+    MappedParser,
+    Parser,
+    Record,
+    ShardedParser,
+    StreamParser,
+    is_group_creation,
+)
 from pathlib import Path
+from typing import ContextManager, Iterable, Iterator, Optional, Sequence
 
-from sqlalchemy import create_engine
+from sqlalchemy import Engine
 from sqlalchemy.orm import Session
 
-from constants import LDIF_PARSER_IGNORED_ATTRIBUTES
-from operations import OPERATIONS
+from bulk_load import BulkLoader
+from constants import (
+    DATABASE_POOL_SIZE,
+    LDIF_CHECKPOINT_SUFFIX,
+    LDIF_FILE_EXTENSION,
+    LDIF_MMAP_MIN_SIZE,
+    LDIF_PARSER_IGNORED_ATTRIBUTES,
+    PROCESS_POOL_START_METHOD,
+    SECURITY_LOG_BATCH_SIZE,
+    SECURITY_LOG_QUEUE_SIZE,
+    OperationType,
+)
+from exceptions import InvalidCheckpointError, PartiallyAppliedError
+from executor import BatchExecutor
+from journal import ApplyJournal
+from operations import security_logger
+from scheduler import DependencyScheduler
+from sync import Synchronizer
 
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Checkpoint:
+    """The progress of a chunked LDIF import.
+
+    `offset` is the number of leading records of the LDIF file that have been
+    committed or skipped, in the units of the `skip` argument of the parsers.
+    The size and modification time of the file identify the version of the
+    file the offset refers to.
+    """
+
+    offset: int
+    size: int
+    mtime_ns: int
+
+    @staticmethod
+    def path(ldif_file: Path) -> Path:
+        return ldif_file.with_name(ldif_file.name + LDIF_CHECKPOINT_SUFFIX)
+
+    @classmethod
+    def create(cls, ldif_file: Path, offset: int = 0) -> "Checkpoint":
+        stat = ldif_file.stat()
+        return cls(offset=offset, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+
+    @classmethod
+    def load(cls, ldif_file: Path) -> Optional["Checkpoint"]:
+        if not (path := cls.path(ldif_file)).is_file():
+            return None
+
+        checkpoint = cls(**json.loads(path.read_text()))
+        if checkpoint != cls.create(ldif_file, checkpoint.offset):
+            raise InvalidCheckpointError(
+                f"The LDIF file {ldif_file} has changed since the checkpoint {path} was saved"
+            )
+        return checkpoint
+
+    def save(self, ldif_file: Path) -> None:
+        path = self.path(ldif_file)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(asdict(self)))
+        tmp.replace(path)
+
+
+def _audit_log(summarize: bool) -> ContextManager[None]:
+    return security_logger.batched(
+        summarize=summarize,
+        batch_size=SECURITY_LOG_BATCH_SIZE,
+        queue_size=SECURITY_LOG_QUEUE_SIZE,
+    )
+
+
+def apply_ldif(
+    ldif_file: str | Path,
+    engine: Engine,
+    commit_every: Optional[int] = None,
+    resume: bool = False,
+    summarize_audit_log: bool = False,
+    journal_file: Optional[str | Path] = None,
+    reorder: bool = False,
+) -> None:
+    """Apply the records of an LDIF file to the database.
+
+    By default, the whole file is applied in a single transaction. With
+    `commit_every`, a transaction is committed every `commit_every` records
+    and a checkpoint recording the number of committed records is saved
+    next to the LDIF file. With `resume`, the records covered by an existing
+    checkpoint are skipped. With `journal_file`, the entries applied by
+    previous runs using the same journal are skipped, whatever LDIF file
+    they came from. With `reorder`, the whole file is parsed first and the
+    records are applied in dependency order instead of file order, see
+    `DependencyScheduler`; it is not meant to be combined with `commit_every`,
+    whose checkpoints count the records in file order.
+    """
+    ldif_file = Path(ldif_file)
+    checkpoint = Checkpoint.create(ldif_file)
+    if resume and (saved := Checkpoint.load(ldif_file)):
+        checkpoint = saved
+
+    with (
+        _audit_log(summarize_audit_log),
+        Session(engine) as session,
+        _journal(journal_file) as journal,
+        _stream_parser(ldif_file, skip=checkpoint.offset, journal=journal) as parser,
+    ):
+        records: Iterable[Record] = DependencyScheduler(parser) if reorder else parser
+        executor = BatchExecutor(session)
+        for count, record in enumerate(records, start=1):
+            executor.submit(record)
+
+            if commit_every and count % commit_every == 0:
+                executor.flush()
+                session.commit()
+                # The offset counts the records of the file, the skipped ones included
+                checkpoint.offset = parser.offset
+                if journal:
+                    journal.commit(checkpoint.offset)
+                checkpoint.save(ldif_file)
+
+        executor.flush()
+        session.commit()
+        if journal:
+            journal.commit()
+            logger.info("Skipped %d LDIF entries applied before", journal.skipped)
+
+    Checkpoint.path(ldif_file).unlink(missing_ok=True)
+
+
+@contextmanager
+def _stream_parser(
+    ldif_file: Path, skip: int, journal: Optional[ApplyJournal]
+) -> Iterator[StreamParser | ShardedParser]:
+    """Stream the records of an LDIF file, parsed in parallel if the file is large."""
+    if _is_mapped(ldif_file):
+        yield ShardedParser(
+            ldif_file,
+            ignored_attr_types=LDIF_PARSER_IGNORED_ATTRIBUTES,
+            skip=skip,
+            journal=journal,
+        )
+        return
 
-def apply_ldif(ldif_file: str | Path, target_database: str):
     with open(ldif_file, "rt") as f:
-        parser = Parser(f, ignored_attr_types=LDIF_PARSER_IGNORED_ATTRIBUTES)
+        yield StreamParser(
+            f, ignored_attr_types=LDIF_PARSER_IGNORED_ATTRIBUTES, skip=skip, journal=journal
+        )
+
+
+def _journal(journal_file: Optional[str | Path]) -> ContextManager[Optional[ApplyJournal]]:
+    return ApplyJournal(journal_file) if journal_file else nullcontext()
+
+
+def find_ldif_files(path: str) -> list[Path]:
+    """Resolve an LDIF file, a directory of LDIF files or a glob pattern."""
+    if (p := Path(path)).is_file():
+        return [p]
+
+    if p.is_dir():
+        return sorted(f for f in p.glob(f"*{LDIF_FILE_EXTENSION}") if f.is_file())
+
+    return sorted(f for f in map(Path, glob.glob(path)) if f.is_file())
+
+
+def _is_mapped(ldif_file: Path) -> bool:
+    """Whether an LDIF file is large enough to be parsed from a memory map."""
+    return ldif_file.stat().st_size >= LDIF_MMAP_MIN_SIZE
+
+
+def parse_ldif(ldif_file: Path) -> list[Record]:
+    mapped = _is_mapped(ldif_file)
+    with open(ldif_file, "rb" if mapped else "rt") as f:
+        parser = (MappedParser if mapped else Parser)(
+            f, ignored_attr_types=LDIF_PARSER_IGNORED_ATTRIBUTES
+        )
         parser.parse()
 
-    engine = create_engine(target_database)
+    return parser.all_records
+
+
+def _apply_records(engine: Engine, records: Iterable[Record]) -> None:
     with Session(engine) as session:
-        for record in parser.all_records:
-            operation = OPERATIONS[record.model]
-            operation.get_registry(record.op)(operation(), session, record)
+        executor = BatchExecutor(session)
+        for record in records:
+            executor.submit(record)
+
+        executor.flush()
         session.commit()
+
+
+def _apply_files_in_order(
+    engine: Engine, files: list[tuple[Path, list[Record]]]
+) -> list[tuple[Path, Optional[Exception]]]:
+    """Apply LDIF files one after the other, sharing the group hierarchy index."""
+    results: list[tuple[Path, Optional[Exception]]] = []
+    with Session(engine) as session:
+        executor = BatchExecutor(session)
+        for ldif_file, records in files:
+            try:
+                for record in records:
+                    executor.submit(record)
+                executor.flush()
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                # The indexes may hold the rolled back changes
+                executor = BatchExecutor(session)
+                results.append((ldif_file, e))
+            else:
+                results.append((ldif_file, None))
+
+    return results
+
+
+def apply_ldif_files(
+    ldif_files: Sequence[Path],
+    engine: Engine,
+    max_workers: int = DATABASE_POOL_SIZE,
+    summarize_audit_log: bool = False,
+) -> list[Path]:
+    """Apply multiple LDIF files concurrently.
+
+    The files are parsed in a process pool. The group creations of all files
+    are applied first, in file order, so that users can reference groups
+    created by any file. The remaining records of each file are then applied
+    in a transaction per file, with at most `max_workers` files applied at the
+    same time. The files moving entries are applied last, one after the
+    other, so that their group moves are checked against the same group
+    hierarchy. Apart from group creations, the records of a file must not
+    depend on the records of another file.
+
+    Each file is committed on its own, so a failing file does not prevent the
+    other files from being applied.
+
+    Returns the applied files.
+
+    Raises:
+        PartiallyAppliedError: If any file failed, with the applied and failed files.
+    """
+    mp_context = multiprocessing.get_context(PROCESS_POOL_START_METHOD)
+    with ProcessPoolExecutor(mp_context=mp_context) as pool:
+        parsed = list(pool.map(parse_ldif, ldif_files))
+
+    concurrent, in_order = [], []
+    for ldif_file, records in zip(ldif_files, parsed):
+        records = [record for record in records if not is_group_creation(record)]
+        moves = any(record.op is OperationType.MOVE for record in records)
+        (in_order if moves else concurrent).append((ldif_file, records))
+
+    with _audit_log(summarize_audit_log):
+        _apply_records(
+            engine,
+            (record for records in parsed for record in records if is_group_creation(record)),
+        )
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(_apply_records, engine, records): ldif_file
+                for ldif_file, records in concurrent
+            }
+            wait(futures)
+
+        results = [(futures[f], f.exception()) for f in futures]
+        results.extend(_apply_files_in_order(engine, in_order))
+
+    failures = {ldif_file: e for ldif_file, e in results if e}
+    for ldif_file, e in failures.items():
+        logger.error("Failed to apply the LDIF file %s: %s", ldif_file, e)
+
+    applied = [ldif_file for ldif_file in ldif_files if ldif_file not in failures]
+    if failures:
+        raise PartiallyAppliedError(
+            applied=[str(ldif_file) for ldif_file in applied],
+            failed=[str(ldif_file) for ldif_file in failures],
+        ) from next(iter(failures.values()))
+
+    return applied
+
+
+def sync_ldif(
+    ldif_files: Sequence[str | Path],
+    engine: Engine,
+    dry_run: bool = False,
+    summarize_audit_log: bool = False,
+) -> Counter:
+    """Synchronize the database with the desired state described by LDIF files.
+
+    The LDIF files list every user and group, without `changetype`. Only the
+    records needed to reach the desired state are applied, in a single
+    transaction. With `dry_run`, the records are computed but not applied.
+
+    Returns the number of applied records per operation.
+    """
+    with _audit_log(summarize_audit_log), Session(engine) as session:
+        synchronizer = Synchronizer(session)
+        for ldif_file in ldif_files:
+            with open(ldif_file, "rt") as f:
+                for record in StreamParser(f, ignored_attr_types=LDIF_PARSER_IGNORED_ATTRIBUTES):
+                    synchronizer.add(record)
+
+        records = list(synchronizer.records())
+        operations = Counter(record.op for record in records)
+        if dry_run:
+            return operations
+
+        executor = BatchExecutor(session)
+        for record in records:
+            executor.submit(record)
+
+        executor.flush()
+        session.commit()
+
+    return operations
+
+
+def bulk_load_ldif(
+    ldif_file: str | Path,
+    engine: Engine,
+    summarize_audit_log: bool = False,
+) -> Counter:
+    """Load an LDIF file made of creations, e.g. to populate an empty database.
+
+    The users and groups created by the LDIF file are loaded with `COPY` on
+    PostgreSQL until its first record other than a create. That record and
+    the following ones are then applied in order, in the same transaction.
+
+    Returns the number of applied records per operation.
+    """
+    with (
+        _audit_log(summarize_audit_log),
+        open(ldif_file, "rt") as f,
+        Session(engine) as session,
+        BulkLoader(session) as loader,
+    ):
+        for record in StreamParser(f, ignored_attr_types=LDIF_PARSER_IGNORED_ATTRIBUTES):
+            loader.submit(record)
+
+        loader.flush()
+        session.commit()
+
+    return loader.operations
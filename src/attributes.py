@@ -0,0 +1,142 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+import sys
+from collections.abc import ItemsView, Mapping, MutableMapping, ValuesView
+from typing import Any, Iterable, Iterator, Optional, Sequence
+
+from constants import ATTRIBUTE_MAP_SHAPES_SIZE
+
+# The key tuples of the attribute maps, shared by the maps with the same keys
+_shapes: dict[tuple[str, ...], tuple[str, ...]] = {}
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    # Lists are decoded in place, so the list read is the list held
+    for i, v in enumerate(value):
+        if isinstance(v, bytes):
+            value[i] = v.decode("utf-8")
+    return value
+
+
+def _shape(keys: tuple[str, ...]) -> tuple[str, ...]:
+    if (shape := _shapes.get(keys)) is None:
+        shape = tuple(map(sys.intern, keys))
+        if len(_shapes) < ATTRIBUTE_MAP_SHAPES_SIZE:
+            _shapes[keys] = shape
+    return shape
+
+
+class _ItemsView(ItemsView):
+    __slots__ = ()
+
+    def __iter__(self) -> Iterator[tuple[str, Any]]:
+        mapping = self._mapping
+        for i, key in enumerate(mapping._keys):
+            yield key, mapping._value(i)
+
+
+class _ValuesView(ValuesView):
+    __slots__ = ()
+
+    def __iter__(self) -> Iterator[Any]:
+        mapping = self._mapping
+        for i in range(len(mapping._keys)):
+            yield mapping._value(i)
+
+
+class AttributeMap(MutableMapping[str, Any]):
+    """A compact mapping of the attributes of a parsed LDIF record.
+
+    Parsed records can be held in memory by the hundred thousand, and an LDIF
+    file repeats the same few attribute names in every entry. Instead of a
+    dict per record, the keys are a tuple shared by every map with the same
+    keys, in the same order, and the values are a list in the key order.
+    Lookups scan the handful of keys of an entry instead of hashing them.
+
+    Values can be held as the raw bytes read from the LDIF file, or lists of
+    them, and are decoded from UTF-8 the first time they are read. Values
+    that are never read, e.g. the attributes dropped by an update, are never
+    decoded.
+    """
+
+    __slots__ = ("_keys", "_values")
+
+    def __init__(self, items: Mapping[str, Any] | Iterable[tuple[str, Any]] = ()) -> None:
+        self._keys: tuple[str, ...] = ()
+        self._values: list[Any] = []
+        if not items:
+            return
+        if isinstance(items, Mapping):
+            items = items.items()
+        for key, value in items:
+            self[key] = value
+
+    @classmethod
+    def from_lists(cls, keys: Sequence[str], values: list[Any]) -> "AttributeMap":
+        """Build a map from distinct keys and their values, taking ownership of the values."""
+        attributes = cls.__new__(cls)
+        attributes._keys = _shape(tuple(keys))
+        attributes._values = values
+        return attributes
+
+    def parts(self) -> tuple[tuple[str, ...], list[Any]]:
+        """Return the keys, shared with other maps, and the values, as taken by `from_lists`."""
+        return self._keys, self._values
+
+    def _value(self, i: int) -> Any:
+        value = self._values[i]
+        if isinstance(value, (bytes, list)):
+            value = self._values[i] = _decode(value)
+        return value
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            i = self._keys.index(key)
+        except ValueError:
+            raise KeyError(key) from None
+        return self._value(i)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        try:
+            self._values[self._keys.index(key)] = value
+        except ValueError:
+            self._keys = _shape(self._keys + (key,))
+            self._values.append(value)
+
+    def __delitem__(self, key: str) -> None:
+        try:
+            i = self._keys.index(key)
+        except ValueError:
+            raise KeyError(key) from None
+
+        self._keys = _shape(self._keys[:i] + self._keys[i + 1 :])
+        del self._values[i]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._keys
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+    def __reduce__(self) -> tuple:
+        return self.from_lists, self.parts()
+
+    def get(self, key: str, default: Optional[Any] = None) -> Any:
+        if key in self._keys:
+            return self._value(self._keys.index(key))
+        return default
+
+    def items(self) -> ItemsView[str, Any]:
+        return _ItemsView(self)
+
+    def values(self) -> ValuesView[Any]:
+        return _ValuesView(self)
@@ -0,0 +1,207 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+import json
+import tempfile
+from collections import Counter
+from dataclasses import replace
+from itertools import islice
+from logging import WARN
+from parser import Record
+from typing import Any, Iterable, Iterator, Optional, Type
+
+from psycopg import sql
+from sqlalchemy import Column, Connection, Dialect, column, table
+from sqlalchemy.orm import Session
+from sqlalchemy.types import TypeDecorator
+
+from constants import (
+    LDIF_BATCH_SIZE,
+    LDIF_TO_GROUP_MODEL_MAPPINGS,
+    LDIF_TO_USER_MODEL_MAPPINGS,
+    OperationType,
+)
+from database import Base, Group, IncludeGroup, User
+from executor import BatchExecutor
+from operations import security_logger
+
+Row = tuple[Any, ...]
+
+_INCLUDE_GROUP_COLUMNS = [
+    IncludeGroup.__table__.c.parentgroupid,
+    IncludeGroup.__table__.c.includegroupid,
+]
+
+
+class _RowEncoder:
+    """Encode the attributes of a create record into a row of a table.
+
+    Columns missing from the record take their ORM default, and the values of
+    custom types such as `JsonEncodeDict` and `GroupSet` are encoded as the
+    ORM would bind them.
+    """
+
+    def __init__(self, model: Type[Base], mappings: dict[str, str], dialect: Dialect) -> None:
+        self.dialect = dialect
+        self.mappings = mappings
+        self.columns: list[Column] = [c for c in model.__table__.columns if not c.primary_key]
+        self.attributes = [model.__mapper__.get_property_by_column(c).key for c in self.columns]
+        self.defaults = [
+            c.default.arg if c.default is not None and c.default.is_scalar else None
+            for c in self.columns
+        ]
+
+    def __call__(self, record: Record) -> Row:
+        values = {self.mappings[k]: v for k, v in record.attributes.items() if k in self.mappings}
+        if record.custom_attributes:
+            values["custom_attributes"] = record.custom_attributes
+
+        row = []
+        for c, attr, default in zip(self.columns, self.attributes, self.defaults):
+            value = values.get(attr, default)
+            if isinstance(c.type, TypeDecorator):
+                value = c.type.process_bind_param(value, self.dialect)
+            row.append(value)
+        return tuple(row)
+
+
+def _chunks(rows: Iterable[Row], size: int) -> Iterator[list[Row]]:
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def copy_rows(connection: Connection, columns: list[Column], rows: Iterable[Row]) -> None:
+    """Load rows into a table with `COPY ... FROM STDIN` on PostgreSQL.
+
+    Other databases fall back to multi-row inserts, e.g. SQLite in the tests.
+    """
+    table_name = columns[0].table.name
+    names = [c.name for c in columns]
+
+    if connection.dialect.name == "postgresql" and connection.dialect.driver == "psycopg":
+        stmt = sql.SQL("COPY {} ({}) FROM STDIN").format(
+            sql.Identifier(table_name),
+            sql.SQL(", ").join(map(sql.Identifier, names)),
+        )
+        with connection.connection.driver_connection.cursor() as cursor:
+            with cursor.copy(stmt) as copy:
+                for row in rows:
+                    copy.write_row(row)
+        return
+
+    # The values are already encoded, so the columns must not be typed
+    stmt = table(table_name, *map(column, names)).insert()
+    for chunk in _chunks(rows, LDIF_BATCH_SIZE):
+        connection.execute(stmt, [dict(zip(names, row)) for row in chunk])
+
+
+class BulkLoader:
+    """Load create records with `COPY`, bypassing the ORM.
+
+    Users are encoded and spooled to a temporary file while parsing, so the
+    memory usage does not depend on the number of users. Groups are kept in
+    memory, and loaded before the users their primary group refers to.
+
+    The bulk load stops at the first record other than a create: the loaded
+    creates are copied, and the parent groups of created groups that are not
+    created by the same load are attached with the ORM. That record and the
+    ones following it are then applied with the ORM in file order, so that
+    e.g. a deletion followed by the re-creation of the same entry keeps its
+    meaning.
+    """
+
+    def __init__(self, session: Session) -> None:
+        self.session = session
+        self.operations: Counter = Counter()
+
+        dialect = session.get_bind().dialect
+        self._encode_user = _RowEncoder(User, LDIF_TO_USER_MODEL_MAPPINGS, dialect)
+        self._encode_group = _RowEncoder(Group, LDIF_TO_GROUP_MODEL_MAPPINGS, dialect)
+        self._users = tempfile.TemporaryFile("w+t")
+        self._groups: list[Row] = []
+        self._gid_numbers: dict[str, Any] = {}
+        self._parent_groups: list[Record] = []
+        self._executor: Optional[BatchExecutor] = None
+
+    def __enter__(self) -> "BulkLoader":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._users.close()
+
+    def submit(self, record: Record) -> None:
+        self.operations[record.op] += 1
+        if self._executor is None and record.op is not OperationType.CREATE:
+            self._executor = self._copy()
+
+        if self._executor is not None:
+            self._executor.submit(record)
+            return
+
+        match record.op:
+            case OperationType.CREATE if record.model is User:
+                self._users.write(json.dumps(self._encode_user(record)))
+                self._users.write("\n")
+                security_logger.log_event(
+                    event=f"authz_admin:user_created:{record.identifier}",
+                    level=WARN,
+                    description=f"User `{record.identifier}` was created",
+                    user=record.identifier,
+                )
+
+            case OperationType.CREATE if record.model is Group:
+                self._groups.append(self._encode_group(record))
+                self._gid_numbers[record.identifier] = record.attributes.get("gidNumber")
+                if record.attributes.get("parentGroup"):
+                    self._parent_groups.append(record)
+
+    def _users_rows(self) -> Iterator[Row]:
+        self._users.seek(0)
+        for line in self._users:
+            yield tuple(json.loads(line))
+
+    def _include_groups_rows(self) -> tuple[list[Row], list[Record]]:
+        rows, associations = [], []
+        for record in self._parent_groups:
+            parent_group = record.attributes["parentGroup"]
+            security_logger.log_event(
+                event=f"authz_admin:group_created:{record.identifier}",
+                level=WARN,
+                description=f"Group `{record.identifier}` was created",
+                parent_group=parent_group,
+                group=record.identifier,
+            )
+
+            if parent_group in self._gid_numbers:
+                rows.append((self._gid_numbers[parent_group], record.attributes.get("gidNumber")))
+                continue
+
+            # The parent group is looked up like `GroupOperation.create_association` does
+            association = replace(record, attributes=dict(record.attributes))
+            association.op = OperationType.MOVE
+            association.attributes["newParentGroup"] = parent_group
+            associations.append(association)
+
+        return rows, associations
+
+    def _copy(self) -> BatchExecutor:
+        connection = self.session.connection()
+        if self._groups:
+            copy_rows(connection, self._encode_group.columns, self._groups)
+
+        rows, associations = self._include_groups_rows()
+        if rows:
+            copy_rows(connection, _INCLUDE_GROUP_COLUMNS, rows)
+
+        copy_rows(connection, self._encode_user.columns, self._users_rows())
+
+        executor = BatchExecutor(self.session)
+        for association in associations:
+            executor.submit(association)
+        return executor
+
+    def flush(self) -> None:
+        if self._executor is None:
+            self._executor = self._copy()
+        self._executor.flush()
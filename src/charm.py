@@ -17,10 +17,25 @@ from charms.glauth_utils.v0.glauth_auxiliary import (
 from ops.charm import ActionEvent, CharmBase, StartEvent
 from ops.main import main
 from ops.model import ActiveStatus, BlockedStatus, MaintenanceStatus, WaitingStatus
+from sqlalchemy import Engine
 
-from action import apply_ldif
-from constants import AUXILIARY_INTEGRATION_NAME
-from exceptions import InvalidAttributeValueError, InvalidDistinguishedNameError
+from action import apply_ldif, apply_ldif_files, bulk_load_ldif, find_ldif_files, sync_ldif
+from constants import (
+    AUXILIARY_INTEGRATION_NAME,
+    LDIF_BASE_DN,
+    LDIF_JOURNAL_FILE,
+    OperationType,
+)
+from engine import engine_registry
+from exceptions import (
+    InvalidAttributeValueError,
+    InvalidCheckpointError,
+    InvalidDistinguishedNameError,
+    PartiallyAppliedError,
+)
+from export import export_ldif
+from plan import plan_ldif
+from validation import validate_ldif
 
 logger = logging.getLogger(__name__)
 
@@ -46,6 +61,10 @@ class GLAuthUtilsCharm(CharmBase):
             self.on.apply_ldif_action,
             self._on_apply_ldif_action,
         )
+        self.framework.observe(
+            self.on.export_ldif_action,
+            self._on_export_ldif_action,
+        )
 
     def _on_start(self, event: StartEvent) -> None:
         self.unit.status = MaintenanceStatus("Configuring the glauth-utils charm.")
@@ -65,6 +84,7 @@ class GLAuthUtilsCharm(CharmBase):
         self.unit.status = ActiveStatus()
 
     def _on_auxiliary_unavailable(self, event: AuxiliaryUnavailableEvent) -> None:
+        engine_registry.dispose()
         self.unit.status = BlockedStatus("Waiting for the required auxiliary integration.")
 
     def _on_apply_ldif_action(self, event: ActionEvent) -> None:
@@ -72,9 +92,22 @@ class GLAuthUtilsCharm(CharmBase):
             event.fail(f"The {self.app.name} is not ready yet.")
             return
 
-        ldif_file = event.params.get("path")
-        if not Path(ldif_file).is_file():
-            event.fail(f"The LDIF file {ldif_file} does not exist.")
+        path = event.params.get("path")
+        if not (ldif_files := find_ldif_files(path)):
+            event.fail(f"The LDIF file {path} does not exist.")
+            return
+
+        if len(ldif_files) > 1 and self._single_file_params(event):
+            event.fail(
+                "The commit-every, resume and incremental parameters require a single LDIF file."
+            )
+            return
+
+        if event.params.get("reorder", False) and self._conflicts_with_reorder(event, ldif_files):
+            event.fail(
+                "The reorder parameter requires a single LDIF file, without the "
+                "commit-every, resume, validate, sync and bulk-load parameters."
+            )
             return
 
         auxiliary_data = self.auxiliary_requirer.consume_auxiliary_relation_data()
@@ -82,26 +115,211 @@ class GLAuthUtilsCharm(CharmBase):
             event.fail("The auxiliary data is not ready yet.")
             return
 
-        database = (
-            f"postgresql+psycopg://"
-            f"{auxiliary_data.username}:"
-            f"{auxiliary_data.password}@"
-            f"{auxiliary_data.endpoint}/"
-            f"{auxiliary_data.database}"
+        engine = engine_registry.get(
+            auxiliary_data,
+            pool_size=self.config["database-pool-size"],
+            pool_pre_ping=self.config["database-pool-pre-ping"],
         )
 
-        event.log("Applying LDIF file...")
+        if event.params.get("sync", False):
+            self._sync_ldif(event, ldif_files, engine)
+            return
+
+        if event.params.get("validate", False) and not self._validate_ldif(
+            event, ldif_files, engine
+        ):
+            return
+
+        if event.params.get("bulk-load", False):
+            self._bulk_load_ldif(event, ldif_files, engine)
+            return
+
+        if event.params.get("dry-run", False):
+            self._plan_ldif(event, ldif_files, engine)
+            return
+
+        self._apply_ldif(event, ldif_files, engine)
+
+    @staticmethod
+    def _single_file_params(event: ActionEvent) -> bool:
+        return any(event.params.get(p) for p in ("commit-every", "resume", "incremental"))
+
+    @staticmethod
+    def _conflicts_with_reorder(event: ActionEvent, ldif_files: list[Path]) -> bool:
+        params = ("commit-every", "resume", "validate", "sync", "bulk-load")
+        return len(ldif_files) > 1 or any(event.params.get(p) for p in params)
+
+    def _apply_ldif(self, event: ActionEvent, ldif_files: list[Path], engine: Engine) -> None:
+        commit_every = event.params.get("commit-every")
+        resume = event.params.get("resume", False)
+        summarize_audit_log = event.params.get("summarize-audit-log", False)
+        journal_file = LDIF_JOURNAL_FILE if event.params.get("incremental", False) else None
+
+        event.log(f"Applying {len(ldif_files)} LDIF file(s)...")
         try:
-            apply_ldif(ldif_file, database)
+            if len(ldif_files) == 1:
+                apply_ldif(
+                    ldif_files[0],
+                    engine,
+                    commit_every=commit_every,
+                    resume=resume,
+                    summarize_audit_log=summarize_audit_log,
+                    journal_file=journal_file,
+                    reorder=event.params.get("reorder", False),
+                )
+            else:
+                applied = apply_ldif_files(
+                    ldif_files,
+                    engine,
+                    max_workers=self.config["database-pool-size"],
+                    summarize_audit_log=summarize_audit_log,
+                )
+                event.set_results({"applied-files": "\n".join(map(str, applied))})
+        except InvalidCheckpointError as e:
+            event.log("Failed to resume from the checkpoint. Re-run without resume.")
+            event.fail(f"The failed action is caused by: {e}")
         except (InvalidAttributeValueError, InvalidDistinguishedNameError) as e:
             event.log("Failed to parse the LDIF file. See more details using juju show-operation.")
             event.fail(f"The failed action is caused by: {e}")
+        except PartiallyAppliedError as e:
+            event.log("Failed to apply some LDIF files. The other files have been applied.")
+            event.set_results({"applied-files": "\n".join(e.applied)})
+            event.fail(f"The failed action is caused by: {e.__cause__}. {e}")
         except Exception as e:
             event.log("Failed to apply the LDIF file. See more details using juju show-operation.")
             event.fail(f"The failed action is caused by: {e}")
         else:
             event.log("Successfully applied the LDIF file.")
 
+    def _validate_ldif(self, event: ActionEvent, ldif_files: list[Path], engine: Engine) -> bool:
+        event.log(f"Validating {len(ldif_files)} LDIF file(s)...")
+        try:
+            report = validate_ldif(ldif_files, engine)
+        except Exception as e:
+            event.log(
+                "Failed to validate the LDIF file. See more details using juju show-operation."
+            )
+            event.fail(f"The failed action is caused by: {e}")
+            return False
+
+        if not report.is_valid:
+            event.set_results(report.to_dict())
+            event.fail(
+                f"The LDIF file has {len(report.issues)} error(s). "
+                "See more details using juju show-operation."
+            )
+            return False
+
+        event.log(f"Successfully validated {report.entries} LDIF entries.")
+        return True
+
+    def _plan_ldif(self, event: ActionEvent, ldif_files: list[Path], engine: Engine) -> None:
+        event.log(f"Planning {len(ldif_files)} LDIF file(s)...")
+        try:
+            plan = plan_ldif(ldif_files, engine, reorder=event.params.get("reorder", False))
+        except (InvalidAttributeValueError, InvalidDistinguishedNameError) as e:
+            event.log("Failed to parse the LDIF file. See more details using juju show-operation.")
+            event.fail(f"The failed action is caused by: {e}")
+        except Exception as e:
+            event.log("Failed to plan the LDIF file. See more details using juju show-operation.")
+            event.fail(f"The failed action is caused by: {e}")
+        else:
+            event.set_results(plan.to_dict())
+            event.log("Successfully planned the LDIF file. No changes were applied.")
+
+    def _sync_ldif(self, event: ActionEvent, ldif_files: list[Path], engine: Engine) -> None:
+        if self._single_file_params(event):
+            event.fail(
+                "The commit-every, resume and incremental parameters are not supported with sync."
+            )
+            return
+
+        if event.params.get("validate", False):
+            event.fail("The validate parameter is not supported with sync.")
+            return
+
+        dry_run = event.params.get("dry-run", False)
+        event.log(f"Synchronizing the database with {len(ldif_files)} LDIF file(s)...")
+        try:
+            operations = sync_ldif(
+                ldif_files,
+                engine,
+                dry_run=dry_run,
+                summarize_audit_log=event.params.get("summarize-audit-log", False),
+            )
+        except (InvalidAttributeValueError, InvalidDistinguishedNameError) as e:
+            event.log("Failed to parse the LDIF file. See more details using juju show-operation.")
+            event.fail(f"The failed action is caused by: {e}")
+        except Exception as e:
+            event.log(
+                "Failed to synchronize the database. See more details using juju show-operation."
+            )
+            event.fail(f"The failed action is caused by: {e}")
+        else:
+            event.set_results({"operations": {op.value: operations[op] for op in OperationType}})
+            if dry_run:
+                event.log("Successfully planned the synchronization. No changes were applied.")
+            else:
+                event.log("Successfully synchronized the database.")
+
+    def _bulk_load_ldif(self, event: ActionEvent, ldif_files: list[Path], engine: Engine) -> None:
+        if len(ldif_files) > 1 or self._single_file_params(event) or event.params.get("dry-run"):
+            event.fail(
+                "The bulk-load parameter requires a single LDIF file, without the "
+                "commit-every, resume, incremental and dry-run parameters."
+            )
+            return
+
+        event.log("Bulk loading the LDIF file...")
+        try:
+            operations = bulk_load_ldif(
+                ldif_files[0],
+                engine,
+                summarize_audit_log=event.params.get("summarize-audit-log", False),
+            )
+        except (InvalidAttributeValueError, InvalidDistinguishedNameError) as e:
+            event.log("Failed to parse the LDIF file. See more details using juju show-operation.")
+            event.fail(f"The failed action is caused by: {e}")
+        except Exception as e:
+            event.log("Failed to load the LDIF file. See more details using juju show-operation.")
+            event.fail(f"The failed action is caused by: {e}")
+        else:
+            event.set_results({"operations": {op.value: operations[op] for op in OperationType}})
+            event.log("Successfully loaded the LDIF file.")
+
+    def _on_export_ldif_action(self, event: ActionEvent) -> None:
+        if not isinstance(self.unit.status, ActiveStatus):
+            event.fail(f"The {self.app.name} is not ready yet.")
+            return
+
+        path = Path(event.params["path"])
+        if not path.parent.is_dir():
+            event.fail(f"The directory {path.parent} does not exist.")
+            return
+
+        auxiliary_data = self.auxiliary_requirer.consume_auxiliary_relation_data()
+        if not auxiliary_data:
+            event.fail("The auxiliary data is not ready yet.")
+            return
+
+        engine = engine_registry.get(
+            auxiliary_data,
+            pool_size=self.config["database-pool-size"],
+            pool_pre_ping=self.config["database-pool-pre-ping"],
+        )
+
+        event.log(f"Exporting the database to the LDIF file {path}...")
+        try:
+            summary = export_ldif(path, engine, event.params.get("base-dn", LDIF_BASE_DN))
+        except Exception as e:
+            event.log(
+                "Failed to export the LDIF file. See more details using juju show-operation."
+            )
+            event.fail(f"The failed action is caused by: {e}")
+        else:
+            event.set_results({"path": str(path), **summary.to_dict()})
+            event.log("Successfully exported the LDIF file.")
+
 
 if __name__ == "__main__":
     main(GLAuthUtilsCharm)
@@ -10,13 +10,77 @@ GLAUTH_UTILS_LOGGING_ID: Final[str] = "identity_platform.glauth_utils_operator"
 
 AUXILIARY_INTEGRATION_NAME = "glauth-auxiliary"
 
+DATABASE_POOL_SIZE: Final[int] = 5
+
+DATABASE_POOL_PRE_PING: Final[bool] = True
+
 USER_IDENTIFIER_ATTRIBUTE: Final[str] = "cn"
 
 GROUP_IDENTIFIER_ATTRIBUTE: Final[str] = "ou"
 
+LDIF_FILE_EXTENSION: Final[str] = ".ldif"
+
 LDIF_PARSER_IGNORED_ATTRIBUTES: Final[set[str]] = {"objectClass"}
 
+# Maximum number of parsed records waiting to be applied to the database
+LDIF_STREAM_BUFFER_SIZE: Final[int] = 1000
+
+# Maximum number of consecutive records applied with a single set-based statement
+LDIF_BATCH_SIZE: Final[int] = 1000
+
+# Maximum number of security events waiting to be written by the background writer
+SECURITY_LOG_QUEUE_SIZE: Final[int] = 10000
+
+# Maximum number of security events written, or summarized, together
+SECURITY_LOG_BATCH_SIZE: Final[int] = 1000
+
+# Maximum number of distinct sets of attribute names shared by the parsed records
+ATTRIBUTE_MAP_SHAPES_SIZE: Final[int] = 4096
+
+# Maximum number of distinguished names and suffixes kept in the parsing cache
+DN_CACHE_SIZE: Final[int] = 65536
+
+# Base DN of the distinguished names written by the LDIF export
+LDIF_BASE_DN: Final[str] = "dc=glauth,dc=com"
+
+# Number of rows fetched at a time when streaming a table with a server-side cursor
+DATABASE_FETCH_SIZE: Final[int] = 1000
+
+# Size in bytes of the hashes comparing the desired and the current state of entries
+FINGERPRINT_DIGEST_SIZE: Final[int] = 16
+
+# Journal of the content hashes of the LDIF entries applied incrementally
+LDIF_JOURNAL_FILE: Final[str] = "/var/lib/glauth-utils/ldif-journal.sqlite3"
+
+# Maximum number of content hashes kept in the journal, the least recently applied are evicted
+LDIF_JOURNAL_MAX_ENTRIES: Final[int] = 1_000_000
+
+# Maximum number of nested levels of groups created by moving a group under another group
+MAX_GROUP_HIERARCHY_DEPTH: Final[int] = 16
+
+# Number of LDIF entries checked at a time by a worker of the validation process pool
+VALIDATION_CHUNK_SIZE: Final[int] = 1000
+
+# Maximum number of validation errors listed in the action results
+VALIDATION_MAX_REPORTED_ERRORS: Final[int] = 100
+
+# Minimum size of the LDIF files parsed from a memory map instead of read line by line
+LDIF_MMAP_MIN_SIZE: Final[int] = 16 * 1024 * 1024
+
+# Size of the byte ranges of a memory-mapped LDIF file parsed by the workers of a process pool
+LDIF_SHARD_SIZE: Final[int] = 1024 * 1024
+
+# Start method of the process pools, which must not fork the threads and database connections
+PROCESS_POOL_START_METHOD: Final[str] = "spawn"
+
+# Suffix of the checkpoint file saved next to an LDIF file applied in chunks
+LDIF_CHECKPOINT_SUFFIX: Final[str] = ".checkpoint"
+
+# The line separating the changes of a modify record, parsed as an attribute without a value
+LDIF_CHANGE_SEPARATOR: Final[str] = "-"
+
 LDIF_SANITIZE_ATTRIBUTES: Final[set[str]] = {
+    LDIF_CHANGE_SEPARATOR,
     "changetype",
     "add",
     "replace",
@@ -27,6 +91,14 @@ LDIF_SANITIZE_ATTRIBUTES: Final[set[str]] = {
     "objectClass",
 }
 
+# Attributes read by the processing of LDIF entries, decoded as soon as they are parsed.
+# The values of the other attributes are decoded by the parsed records when read.
+LDIF_PROCESSED_ATTRIBUTES: Final[set[str]] = {
+    *(LDIF_SANITIZE_ATTRIBUTES - {LDIF_CHANGE_SEPARATOR}),
+    "userPassword",
+    "memberUid",
+}
+
 LDIF_TO_USER_MODEL_MAPPINGS: Final[dict[str, str]] = {
     "cn": "name",
     "uidNumber": "uid_number",
@@ -79,35 +151,12 @@ class OperationType(Enum):
     DETACH = "detach"
 
 
-# Match "cn" or "ou" in a DN
-# e.g. "cn=hackers,ou=superheros,dc=glauth,dc=com"
-# The "id_attribute" group is "cn" and the "identifier" group is "hackers"
-IDENTIFIER_REGEX: Final[Pattern] = re.compile(
-    r"""
-    ^(?P<id_attribute>cn|ou)
-    =
-    (?P<identifier>.+?)
-    ,
-    """,
-    re.IGNORECASE | re.VERBOSE,
-)
-
-
 # Match "newrdn" attribute in an LDIF record
 # e.g. "newrdn: cn=hackers"
 # The "newrdn" group is "hackers"
 NEWRDN_REGEX: Final[Pattern] = re.compile(r"^cn=(?P<newrdn>[^,]+)", re.IGNORECASE)
 
 
-# Match all "ou" in a DN
-# e.g. "ou=superheros,ou=caped,ou=human,dc=glauth,dc=com"
-# The "ou" group includes "superheros", "caped", and "human"
-GROUP_HIERARCHY_REGEX: Final[Pattern] = re.compile(
-    r"ou=([^,]+)",
-    re.IGNORECASE,
-)
-
-
 # Match "userPassword" attribute in an LDIF record
 # e.g. "userPassword: {SHA256}abc
 # The "prefix" group is "SHA256" and the "password" group is "abc"
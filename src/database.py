@@ -2,10 +2,31 @@
 # See LICENSE file for licensing details.
 
 import json
-from typing import List, Optional
-
-from sqlalchemy import Dialect, ForeignKey, Integer, SmallInteger, String
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+from typing import Any, List, Mapping, Optional, Sequence
+
+from sqlalchemy import (
+    ColumnElement,
+    Dialect,
+    ForeignKey,
+    Integer,
+    SmallInteger,
+    String,
+    any_,
+    bindparam,
+    case,
+    func,
+    literal,
+    type_coerce,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import (
+    DeclarativeBase,
+    InstrumentedAttribute,
+    Mapped,
+    Session,
+    mapped_column,
+    relationship,
+)
 from sqlalchemy.types import TEXT, VARCHAR, TypeDecorator
 
 
@@ -14,8 +35,8 @@ class JsonEncodeDict(TypeDecorator):
 
     cache_ok = True
 
-    def process_bind_param(self, value: Optional[dict], dialect: Dialect):
-        return json.dumps(value) if value is not None else "{}"
+    def process_bind_param(self, value: Optional[Mapping], dialect: Dialect):
+        return json.dumps(dict(value)) if value is not None else "{}"
 
     def process_result_value(self, value: Optional[str], dialect: Dialect):
         return json.loads(value) if value is not None else {}
@@ -99,3 +120,52 @@ class Capability(Base):
     user_id: Mapped[int] = mapped_column(name="userid")
     action: Mapped[str] = mapped_column(default="search")
     object: Mapped[str]
+
+
+def values_in(
+    session: Session, attribute: InstrumentedAttribute, values: Sequence[Any]
+) -> ColumnElement:
+    # PostgreSQL receives the values as a single array parameter, which is not
+    # bound by the limit on the number of parameters of a statement
+    if session.get_bind().dialect.name == "postgresql":
+        return attribute == any_(bindparam(None, list(values), type_=ARRAY(attribute.type)))
+    return attribute.in_(values)
+
+
+def param_in(dialect_name: str, attribute: InstrumentedAttribute, key: str) -> ColumnElement:
+    """Like `values_in`, with the values bound to the `key` parameter at execution time."""
+    if dialect_name == "postgresql":
+        return attribute == any_(bindparam(key, type_=ARRAY(attribute.type)))
+    return attribute.in_(bindparam(key, expanding=True))
+
+
+def _group_set(attribute: InstrumentedAttribute) -> ColumnElement:
+    return func.coalesce(type_coerce(attribute, String), "")
+
+
+def _delimited(value: str | ColumnElement) -> ColumnElement:
+    # Values are gid numbers, which contain no LIKE wildcards to escape
+    return "," + (literal(value, String) if isinstance(value, str) else value) + ","
+
+
+def group_set_contains(
+    attribute: InstrumentedAttribute, value: str | ColumnElement
+) -> ColumnElement:
+    """Match the rows whose `GroupSet` column contains the value."""
+    return ("," + _group_set(attribute) + ",").contains(_delimited(value))
+
+
+def group_set_add(attribute: InstrumentedAttribute, value: str | ColumnElement) -> ColumnElement:
+    """Append the value to a `GroupSet` column, which must not contain it yet."""
+    groups = _group_set(attribute)
+    value = literal(value, String) if isinstance(value, str) else value
+    return case((groups == "", value), else_=groups + "," + value)
+
+
+def group_set_remove(
+    dialect_name: str, attribute: InstrumentedAttribute, value: str | ColumnElement
+) -> ColumnElement:
+    """Remove the value from a `GroupSet` column."""
+    removed = func.replace("," + _group_set(attribute) + ",", _delimited(value), ",")
+    trim = func.btrim if dialect_name == "postgresql" else func.trim
+    return trim(removed, ",")
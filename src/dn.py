@@ -0,0 +1,87 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+import re
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+
+from constants import DN_CACHE_SIZE, GROUP_IDENTIFIER_ATTRIBUTE, USER_IDENTIFIER_ATTRIBUTE
+
+_IDENTIFIER_ATTRIBUTES = frozenset((USER_IDENTIFIER_ATTRIBUTE, GROUP_IDENTIFIER_ATTRIBUTE))
+
+# https://datatracker.ietf.org/doc/html/rfc4514#section-2.4
+_SPECIAL_CHARACTERS = re.compile(r'([\\,+"<>;=])')
+_ESCAPED_CHARACTERS = re.compile(r"\\(.)")
+
+
+def escape_dn_value(value: str) -> str:
+    """Escape an attribute value to be used in an RDN."""
+    escaped = _SPECIAL_CHARACTERS.sub(r"\\\1", value)
+    if escaped.startswith(("#", " ")):
+        escaped = "\\" + escaped
+    if escaped.endswith(" ") and not escaped.endswith("\\ "):
+        escaped = escaped[:-1] + "\\ "
+    return escaped
+
+
+def _split_rdn(rdn: str) -> tuple[str, str]:
+    attribute, _, value = rdn.partition("=")
+    if "\\" in value:
+        value = _ESCAPED_CHARACTERS.sub(r"\1", value)
+    return attribute.strip().casefold(), value
+
+
+@dataclass(frozen=True)
+class DistinguishedName:
+    """A distinguished name split into its RDN components.
+
+    e.g. "cn=hackers,ou=superheros,dc=glauth,dc=com" has the identifier
+    "hackers" and the parent group "superheros". The components are only
+    split into attributes and values when needed.
+    """
+
+    rdns: tuple[str, ...]
+
+    @cached_property
+    def _first(self) -> tuple[str, str]:
+        return _split_rdn(self.rdns[0])
+
+    @property
+    def id_attribute(self) -> str:
+        return self._first[0]
+
+    @cached_property
+    def is_valid(self) -> bool:
+        attribute, value = self._first
+        return len(self.rdns) > 1 and bool(value) and attribute in _IDENTIFIER_ATTRIBUTES
+
+    @property
+    def identifier(self) -> str:
+        return self._first[1] if self.is_valid else ""
+
+    @cached_property
+    def parent_group(self) -> str:
+        groups = (v for a, v in map(_split_rdn, self.rdns) if a == GROUP_IDENTIFIER_ATTRIBUTE)
+        next(groups, None)
+        return next(groups, "")
+
+
+def _split_rdns(dn: str) -> tuple[str, ...]:
+    if "\\" not in dn:
+        return tuple(dn.split(","))
+
+    # A comma preceded by an odd number of backslashes is escaped
+    rdns, start, escapes = [], 0, 0
+    for i, c in enumerate(dn):
+        if c == "," and escapes % 2 == 0:
+            rdns.append(dn[start:i])
+            start = i + 1
+        escapes = escapes + 1 if c == "\\" else 0
+    rdns.append(dn[start:])
+    return tuple(rdns)
+
+
+@lru_cache(maxsize=DN_CACHE_SIZE)
+def parse_dn(dn: str) -> DistinguishedName:
+    """Parse a distinguished name, splitting it on unescaped commas."""
+    return DistinguishedName(_split_rdns(dn))
@@ -0,0 +1,56 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+from charms.glauth_utils.v0.glauth_auxiliary import AuxiliaryData
+from sqlalchemy import Engine, create_engine
+
+from constants import DATABASE_POOL_PRE_PING, DATABASE_POOL_SIZE
+
+
+def database_url(auxiliary_data: AuxiliaryData) -> str:
+    return (
+        f"postgresql+psycopg://"
+        f"{auxiliary_data.username}:"
+        f"{auxiliary_data.password}@"
+        f"{auxiliary_data.endpoint}/"
+        f"{auxiliary_data.database}"
+    )
+
+
+class EngineRegistry:
+    """Cache SQLAlchemy engines keyed by the auxiliary data and the pool options.
+
+    An engine and its connection pool are reused by every call sharing the
+    same credentials. Requesting an engine with different credentials or pool
+    options disposes of the previously cached engine.
+    """
+
+    def __init__(self) -> None:
+        self._engines: dict[tuple[AuxiliaryData, int, bool], Engine] = {}
+
+    def get(
+        self,
+        auxiliary_data: AuxiliaryData,
+        pool_size: int = DATABASE_POOL_SIZE,
+        pool_pre_ping: bool = DATABASE_POOL_PRE_PING,
+    ) -> Engine:
+        key = (auxiliary_data, pool_size, pool_pre_ping)
+        if engine := self._engines.get(key):
+            return engine
+
+        self.dispose()
+        engine = create_engine(
+            database_url(auxiliary_data),
+            pool_size=pool_size,
+            pool_pre_ping=pool_pre_ping,
+        )
+        self._engines[key] = engine
+        return engine
+
+    def dispose(self) -> None:
+        for engine in self._engines.values():
+            engine.dispose()
+        self._engines.clear()
+
+
+engine_registry = EngineRegistry()
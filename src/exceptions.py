@@ -12,3 +12,24 @@ class InvalidDistinguishedNameError(UtilityError):
 
 class InvalidAttributeValueError(UtilityError):
     """Error for invalid attribute value."""
+
+
+class InvalidCheckpointError(UtilityError):
+    """Error for a checkpoint that does not match the LDIF file."""
+
+
+class InvalidGroupHierarchyError(UtilityError):
+    """Error for a group move creating a cycle or a too deep group hierarchy."""
+
+
+class PartiallyAppliedError(UtilityError):
+    """Error for multiple LDIF files of which only some were applied."""
+
+    def __init__(self, applied: list[str], failed: list[str]) -> None:
+        super().__init__(f"Failed to apply the LDIF file(s): {', '.join(failed)}")
+        self.applied = applied
+        self.failed = failed
+
+
+class CircularDependencyError(UtilityError):
+    """Error for LDIF records that depend on each other and cannot be reordered."""
@@ -0,0 +1,79 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+from itertools import groupby
+from parser import Record
+from typing import Callable, Type
+
+from sqlalchemy.orm import Session
+
+from constants import LDIF_BATCH_SIZE, OperationType
+from database import Base
+from hierarchy import GroupHierarchyIndex
+from index import IdentityIndex
+from operations import OPERATIONS, Operation
+
+
+def batch_key(record: Record) -> tuple[Type[Base], Callable | OperationType]:
+    """Consecutive records sharing a key are applied as one batch.
+
+    Records are keyed by model and by the bulk method applying them, or by
+    operation when there is none. Different operations sharing a bulk method,
+    such as attach and detach, end up in the same batch.
+    """
+    return record.model, OPERATIONS[record.model].get_bulk_registry(record.op) or record.op
+
+
+class BatchExecutor:
+    """Apply records in windows of at most `batch_size` records.
+
+    The users and groups referenced by a window are prefetched into an
+    identity index shared by the operations. The window is then split into
+    batches of consecutive records sharing a `batch_key`, and each
+    batch is handed to the bulk implementation of the operation when there
+    is one, so the number of emitted statements depends on the number of
+    batches rather than the number of records. Operations without a bulk
+    implementation are applied record by record.
+
+    The group hierarchy index is shared by the windows, so the group
+    hierarchy is loaded at most once.
+    """
+
+    def __init__(self, session: Session, batch_size: int = LDIF_BATCH_SIZE):
+        self.session = session
+        self.batch_size = batch_size
+        self.index = IdentityIndex()
+        self.hierarchy = GroupHierarchyIndex()
+        self._operations = {
+            model: op(self.index, self.hierarchy) for model, op in OPERATIONS.items()
+        }
+        self._window: list[Record] = []
+
+    def submit(self, record: Record) -> None:
+        self._window.append(record)
+        if len(self._window) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._window:
+            return
+
+        self.index.clear()
+        self.index.prefetch(self.session, self._window)
+
+        for (model, _), batch in groupby(self._window, key=batch_key):
+            batch = list(batch)
+            self._apply(model, batch[0].op, batch)
+
+        self._window = []
+        self.session.flush()
+
+    def _apply(self, model: Type[Base], op: OperationType, batch: list[Record]) -> None:
+        operation: Operation = self._operations[model]
+        if bulk_method := operation.get_bulk_registry(op):
+            bulk_method(operation, self.session, batch)
+            return
+
+        method = operation.get_registry(op)
+        for record in batch:
+            method(operation, self.session, record)
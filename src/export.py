@@ -0,0 +1,239 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator, TextIO
+
+from ldif import LDIFWriter
+from sqlalchemy import Engine, select
+from sqlalchemy.orm import Session
+
+from constants import (
+    DATABASE_FETCH_SIZE,
+    GROUP_IDENTIFIER_ATTRIBUTE,
+    LDIF_BASE_DN,
+    LDIF_TO_USER_MODEL_MAPPINGS,
+    PASSWORD_ALGORITHM_REGISTRY,
+    USER_IDENTIFIER_ATTRIBUTE,
+)
+from database import Group, IncludeGroup, User
+from dn import escape_dn_value
+
+Entry = dict[str, list[bytes]]
+
+# The password attributes are exported as a single `userPassword` attribute
+_PASSWORD_ATTRIBUTES = {
+    LDIF_TO_USER_MODEL_MAPPINGS[attr]: algorithm.upper()
+    for algorithm, attr in PASSWORD_ALGORITHM_REGISTRY.items()
+}
+
+_USER_ATTRIBUTES = {
+    ldif_attr: attr
+    for ldif_attr, attr in LDIF_TO_USER_MODEL_MAPPINGS.items()
+    if hasattr(User, attr) and attr not in _PASSWORD_ATTRIBUTES
+}
+
+
+@dataclass
+class ExportSummary:
+    """The number of entries written by an LDIF export."""
+
+    groups: int = 0
+    users: int = 0
+    memberships: int = 0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"groups": self.groups, "users": self.users, "memberships": self.memberships}
+
+
+def _values(value: Any) -> list[bytes]:
+    values = value if isinstance(value, list) else [value]
+    return [str(v).encode() for v in values if v is not None and v != ""]
+
+
+class GroupHierarchy:
+    """The groups and their parent groups, loaded in memory.
+
+    A group with several parent groups is placed under the parent group with
+    the lowest gid number. The other parent groups are exported as additional
+    moves, which apply-ldif records as additional `includegroups` rows.
+    """
+
+    def __init__(self, session: Session) -> None:
+        self.names: dict[int, str] = dict(
+            session.execute(select(Group.gid_number, Group.name).order_by(Group.gid_number)).all()
+        )
+        self.parents: dict[int, list[int]] = defaultdict(list)
+        for parent, child in session.execute(
+            select(IncludeGroup.parent_group_id, IncludeGroup.child_group_id).order_by(
+                IncludeGroup.parent_group_id
+            )
+        ):
+            if parent in self.names and child in self.names:
+                self.parents[child].append(parent)
+
+        self._dns: dict[int, str] = {}
+
+    def dn(self, gid_number: int, base_dn: str) -> str:
+        """Build the DN of a group from its first parent group, up to the base DN."""
+        if dn := self._dns.get(gid_number):
+            return dn
+
+        rdns, seen, current = [], set(), gid_number
+        while current not in seen:
+            seen.add(current)
+            rdns.append(f"{GROUP_IDENTIFIER_ATTRIBUTE}={escape_dn_value(self.names[current])}")
+            if not (parents := self.parents.get(current)):
+                break
+            current = parents[0]
+
+        dn = self._dns[gid_number] = ",".join([*rdns, base_dn])
+        return dn
+
+    def __iter__(self) -> Iterator[int]:
+        """Iterate over the gid numbers, each group after the parent group in its DN."""
+        children: dict[int, list[int]] = defaultdict(list)
+        for child, parents in self.parents.items():
+            children[parents[0]].append(child)
+
+        visited: set[int] = set()
+
+        def visit(gid_number: int) -> Iterator[int]:
+            stack = [gid_number]
+            while stack:
+                if (current := stack.pop()) in visited:
+                    continue
+                visited.add(current)
+                yield current
+                stack.extend(reversed(children[current]))
+
+        # Groups in a cycle of parent groups are not reachable from a root group
+        for gid_number in (*(g for g in self.names if g not in self.parents), *self.names):
+            if gid_number not in visited:
+                yield from visit(gid_number)
+
+
+class LDIFExporter:
+    """Write the groups, users and group memberships of the database as LDIF.
+
+    Groups are loaded in memory to build the distinguished names. Users are
+    streamed with `yield_per`, which uses a server-side cursor on PostgreSQL,
+    so the memory usage does not grow with the number of users. The users are
+    read twice: the group memberships are written after all the users, as
+    modify records that apply-ldif applies in bulk.
+    """
+
+    def __init__(self, session: Session, output: TextIO, base_dn: str = LDIF_BASE_DN) -> None:
+        self.session = session
+        self.base_dn = base_dn
+        self.writer = LDIFWriter(output)
+        self.summary = ExportSummary()
+        self.hierarchy = GroupHierarchy(session)
+
+    def export(self) -> ExportSummary:
+        self._export_groups()
+        self._export_users()
+        self._export_memberships()
+        return self.summary
+
+    def _stream_users(self, *columns: Any) -> Iterator[Any]:
+        stmt = select(*columns).order_by(User.id).execution_options(yield_per=DATABASE_FETCH_SIZE)
+        yield from self.session.execute(stmt)
+
+    def _export_groups(self) -> None:
+        hierarchy = self.hierarchy
+        for gid_number in hierarchy:
+            name = hierarchy.names[gid_number]
+            self.writer.unparse(
+                hierarchy.dn(gid_number, self.base_dn),
+                {
+                    "objectClass": [b"posixGroup"],
+                    GROUP_IDENTIFIER_ATTRIBUTE: [name.encode()],
+                    "gidNumber": [str(gid_number).encode()],
+                },
+            )
+            self.summary.groups += 1
+
+        for gid_number in hierarchy:
+            rdn = f"{GROUP_IDENTIFIER_ATTRIBUTE}={escape_dn_value(hierarchy.names[gid_number])}"
+            for parent in hierarchy.parents.get(gid_number, [])[1:]:
+                self.writer.unparse(
+                    f"{rdn},{self.base_dn}",
+                    {
+                        "changetype": [b"moddn"],
+                        "deleteoldrdn": [b"1"],
+                        "newsuperior": [hierarchy.dn(parent, self.base_dn).encode()],
+                    },
+                )
+
+    def _user_entry(self, user: Any) -> Entry:
+        entry: Entry = {"objectClass": [b"posixAccount"]}
+        for ldif_attr, attr in _USER_ATTRIBUTES.items():
+            if values := _values(getattr(user, attr)):
+                entry[ldif_attr] = values
+
+        for attr, algorithm in _PASSWORD_ATTRIBUTES.items():
+            if password := getattr(user, attr):
+                entry["userPassword"] = [f"{{{algorithm}}}{password}".encode()]
+                break
+
+        for key, value in (user.custom_attributes or {}).items():
+            if key not in entry and (values := _values(value)):
+                entry[key] = values
+
+        return entry
+
+    def _export_users(self) -> None:
+        columns = [getattr(User, attr) for attr in _USER_ATTRIBUTES.values()]
+        columns += [getattr(User, attr) for attr in _PASSWORD_ATTRIBUTES]
+        for user in self._stream_users(*columns, User.custom_attributes):
+            parent_dn = self.base_dn
+            if user.gid_number in self.hierarchy.names:
+                parent_dn = self.hierarchy.dn(user.gid_number, self.base_dn)
+
+            self.writer.unparse(
+                f"{USER_IDENTIFIER_ATTRIBUTE}={escape_dn_value(user.name)},{parent_dn}",
+                self._user_entry(user),
+            )
+            self.summary.users += 1
+
+    def _export_memberships(self) -> None:
+        names = self.hierarchy.names
+        for uid_number, other_groups in self._stream_users(User.uid_number, User.other_groups):
+            for gid_number in sorted(int(g) for g in other_groups or () if g.isdigit()):
+                if gid_number not in names:
+                    continue
+
+                self.writer.unparse(
+                    self.hierarchy.dn(gid_number, self.base_dn),
+                    {
+                        "changetype": [b"modify"],
+                        "add": [b"memberUid"],
+                        "memberUid": [str(uid_number).encode()],
+                    },
+                )
+                self.summary.memberships += 1
+
+
+def export_ldif(
+    output_file: str | Path, engine: Engine, base_dn: str = LDIF_BASE_DN
+) -> ExportSummary:
+    """Export the database to an LDIF file that apply-ldif can import.
+
+    The LDIF file is written to a temporary file next to `output_file`, and
+    renamed once complete. Capabilities have no LDIF representation in
+    apply-ldif and are not exported.
+    """
+    output_file = Path(output_file)
+    tmp = output_file.with_name(output_file.name + ".tmp")
+    try:
+        with open(tmp, "wt") as f, Session(engine) as session:
+            summary = LDIFExporter(session, f, base_dn).export()
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+    tmp.replace(output_file)
+    return summary
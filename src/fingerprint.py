@@ -0,0 +1,60 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+import hashlib
+import json
+from functools import reduce
+from operator import xor
+from typing import Any, Hashable, Iterable, Mapping
+
+from constants import FINGERPRINT_DIGEST_SIZE
+
+
+def canonical(value: Any) -> Any:
+    """Normalize a value read from an LDIF record or from the database.
+
+    Values are compared as strings, e.g. the uid number 5001 and "5001" are
+    equal. Empty values are dropped from mappings, as deleting an attribute
+    sets it to an empty string.
+    """
+    if isinstance(value, Mapping):
+        return {k: canonical(v) for k, v in value.items() if v is not None and v != ""}
+    if isinstance(value, (list, tuple)):
+        return [canonical(v) for v in value]
+    return str(value)
+
+
+def fingerprint(values: Mapping[str, Any]) -> bytes:
+    """Hash the canonical JSON of attribute values, e.g. the columns of a row."""
+    data = json.dumps(canonical(values), sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(data.encode(), digest_size=FINGERPRINT_DIGEST_SIZE).digest()
+
+
+def entry_fingerprint(dn: str, entry: Mapping[str, list[bytes]]) -> bytes:
+    """Hash a raw LDIF entry, as handed over by the LDIF parser.
+
+    The hash does not depend on the order of the attributes, but it does on
+    the order of the values of an attribute.
+    """
+    items = [dn.strip().encode()]
+    for attr in sorted(entry):
+        items += (attr.encode(), len(entry[attr]).to_bytes(4, "big"), *entry[attr])
+
+    digest = hashlib.blake2b(digest_size=FINGERPRINT_DIGEST_SIZE)
+    for item in items:
+        digest.update(len(item).to_bytes(4, "big") + item)
+    return digest.digest()
+
+
+def element_fingerprint(value: Hashable) -> int:
+    digest = hashlib.blake2b(str(value).encode(), digest_size=FINGERPRINT_DIGEST_SIZE).digest()
+    return int.from_bytes(digest, "big")
+
+
+def set_fingerprint(values: Iterable[Hashable]) -> int:
+    """Hash a set of distinct values regardless of their order.
+
+    The fingerprint is the XOR of the element fingerprints, so it can also be
+    accumulated one element at a time with `element_fingerprint`.
+    """
+    return reduce(xor, map(element_fingerprint, values), 0)
@@ -0,0 +1,113 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+from collections import defaultdict
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, aliased
+
+from constants import MAX_GROUP_HIERARCHY_DEPTH
+from database import Group, IncludeGroup
+from exceptions import InvalidGroupHierarchyError
+
+
+class GroupHierarchyIndex:
+    """In-memory adjacency index of the group hierarchy stored in `includegroups`.
+
+    The associations are loaded with one query the first time the index is
+    used, and kept up to date by the moves applied afterwards, so the
+    hierarchy is read once per import. Groups are keyed by name.
+
+    Moves are validated against the index before they are applied: a group
+    cannot be moved under itself or one of its descendants, and the
+    hierarchy cannot get deeper than `max_depth` nested levels, which GLAuth
+    would otherwise expand recursively at bind time.
+    """
+
+    def __init__(self, max_depth: int = MAX_GROUP_HIERARCHY_DEPTH) -> None:
+        self.max_depth = max_depth
+        self.loaded = False
+        # The parents of each group, with the association to each of them
+        self._parents: dict[str, dict[str, IncludeGroup]] = defaultdict(dict)
+        self._children: dict[str, set[str]] = defaultdict(set)
+
+    def load(self, session: Session) -> None:
+        if self.loaded:
+            return
+
+        parent, child = aliased(Group), aliased(Group)
+        stmt = (
+            select(IncludeGroup, parent.name, child.name)
+            .join(parent, IncludeGroup.parent_group_id == parent.gid_number)
+            .join(child, IncludeGroup.child_group_id == child.gid_number)
+        )
+        for association, parent_name, child_name in session.execute(stmt):
+            self.add(parent_name, child_name, association)
+
+        self.loaded = True
+
+    def get(self, parent: str, child: str) -> Optional[IncludeGroup]:
+        return self._parents.get(child, {}).get(parent)
+
+    def add(self, parent: str, child: str, association: IncludeGroup) -> None:
+        self._parents[child][parent] = association
+        self._children[parent].add(child)
+
+    def remove(self, parent: str, child: str) -> Optional[IncludeGroup]:
+        self._children[parent].discard(child)
+        return self._parents[child].pop(parent, None)
+
+    def rename(self, name: str, new_name: str) -> None:
+        parents = self._parents.pop(name, {})
+        children = self._children.pop(name, set())
+        for parent, association in parents.items():
+            self._children[parent].discard(name)
+            self.add(parent, new_name, association)
+        for child in children:
+            self.add(new_name, child, self._parents[child].pop(name))
+
+    def discard(self, name: str) -> None:
+        """Forget a deleted group and its associations."""
+        for parent in list(self._parents.get(name, ())):
+            self.remove(parent, name)
+        for child in list(self._children.get(name, ())):
+            self.remove(name, child)
+
+    def check_move(self, child: str, new_parent: str) -> None:
+        """Validate that the child group can be included in the new parent group.
+
+        Raises InvalidGroupHierarchyError if the move creates a cycle or a
+        hierarchy deeper than `max_depth`.
+        """
+        if child == new_parent or child in self._ancestors(new_parent):
+            raise InvalidGroupHierarchyError(
+                f"Moving group {child} under group {new_parent} creates a cycle"
+            )
+
+        depth = self._height(new_parent, self._parents) + 1 + self._height(child, self._children)
+        if depth > self.max_depth:
+            raise InvalidGroupHierarchyError(
+                f"Moving group {child} under group {new_parent} nests {depth} levels of "
+                f"groups, more than the maximum of {self.max_depth}"
+            )
+
+    def _ancestors(self, name: str) -> set[str]:
+        seen: set[str] = set()
+        stack = [name]
+        while stack:
+            for parent in self._parents.get(stack.pop(), ()):
+                if parent not in seen:
+                    seen.add(parent)
+                    stack.append(parent)
+        return seen
+
+    def _height(self, name: str, edges: dict) -> int:
+        # The number of levels reachable from a group, one level at a time. The
+        # walk stops past the maximum depth, e.g. on a cycle stored beforehand.
+        height, level = 0, {name}
+        while level := {n for group in level for n in edges.get(group, ())}:
+            height += 1
+            if height > self.max_depth:
+                break
+        return height
@@ -0,0 +1,95 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+from parser import Record
+from typing import Iterable, Optional, Type
+
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from constants import OperationType
+from database import Base, Group, User
+from statements import select_by_names, select_groups_by_gid_numbers
+
+_GROUP_REFERENCE_ATTRIBUTES = ("parentGroup", "newParentGroup")
+
+
+class IdentityIndex:
+    """In-memory index of the users and groups referenced by a window of records.
+
+    The index is keyed by name for both users and groups, and by gid number
+    for groups. A name mapped to `None` is known to be absent from the
+    database, so the lookup does not need a round trip either.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[Type[Base], dict[str, Optional[Base]]] = {User: {}, Group: {}}
+        self._groups_by_gid: dict[int, Group] = {}
+
+    def __contains__(self, key: tuple[Type[Base], str]) -> bool:
+        model, name = key
+        return name in self._entries[model]
+
+    def get(self, model: Type[Base], name: str) -> Optional[Base]:
+        return self._entries[model].get(name)
+
+    def get_group_by_gid(self, gid_number: int) -> Optional[Group]:
+        # The gid number of an indexed group may have been updated since
+        group = self._groups_by_gid.get(gid_number)
+        return group if group is not None and group.gid_number == gid_number else None
+
+    def add(self, model: Type[Base], name: str, obj: Optional[Base]) -> None:
+        self._entries[model][name] = obj
+        if model is Group and obj is not None:
+            self._groups_by_gid[obj.gid_number] = obj
+
+    def invalidate(self, model: Type[Base], *names: str) -> None:
+        entries = self._entries[model]
+        for name in names:
+            entries.pop(name, None)
+
+    def clear(self) -> None:
+        for entries in self._entries.values():
+            entries.clear()
+        self._groups_by_gid.clear()
+
+    def prefetch(self, session: Session, records: Iterable[Record]) -> None:
+        """Load every user and group referenced by the records with one query per model."""
+        names: dict[Type[Base], set[str]] = {User: set(), Group: set()}
+        moved_users: set[str] = set()
+        for record in records:
+            names[record.model].add(record.identifier)
+
+            if record.model is User and record.op is OperationType.MOVE:
+                names[Group].add(record.attributes.get("ou"))
+                moved_users.add(record.identifier)
+            elif record.model is Group:
+                names[Group].update(record.attributes.get(a) for a in _GROUP_REFERENCE_ATTRIBUTES)
+
+        for model, referenced in names.items():
+            entries = self._entries[model]
+            if not (missing := [n for n in referenced if n and n not in entries]):
+                continue
+
+            entries.update(dict.fromkeys(missing))
+            stmt = select_by_names(model, session.get_bind().dialect.name)
+            for obj in session.scalars(stmt, {"names": missing}):
+                self.add(model, obj.name, obj)
+
+        self._prefetch_primary_groups(session, moved_users)
+
+    def prefetch_groups_by_gid(self, session: Session, gid_numbers: Iterable[int]) -> None:
+        """Load the groups of the gid numbers that are not indexed yet with one query."""
+        if gid_numbers := set(gid_numbers) - self._groups_by_gid.keys():
+            stmt = select_groups_by_gid_numbers(session.get_bind().dialect.name)
+            for group in session.scalars(stmt, {"gid_numbers": list(gid_numbers)}):
+                self.add(Group, group.name, group)
+
+    def _prefetch_primary_groups(self, session: Session, names: Iterable[str]) -> None:
+        # Reassigning the group of a user loads its current group first, which
+        # would otherwise take one query per moved user
+        users = [user for name in names if (user := self.get(User, name)) is not None]
+        self.prefetch_groups_by_gid(session, {u.gid_number for u in users})
+
+        for user in users:
+            set_committed_value(user, "group", self.get_group_by_gid(user.gid_number))
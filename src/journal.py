@@ -0,0 +1,96 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+import sqlite3
+from collections import deque
+from pathlib import Path
+from threading import Lock
+from typing import Optional
+
+from constants import LDIF_JOURNAL_MAX_ENTRIES
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    digest BLOB PRIMARY KEY,
+    used_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_used_at ON entries (used_at);
+"""
+
+
+class ApplyJournal:
+    """A local journal of the content hashes of the applied LDIF entries.
+
+    Entries found in the journal are skipped by the parser. The hashes of
+    the other entries are staged in parsing order with the offset of their
+    record in the LDIF file, and only written to the journal once the
+    records up to that offset are committed, so an entry is never skipped
+    before it reaches the database. The journal keeps at most
+    `max_entries` hashes, evicting the least recently applied ones.
+
+    The journal is read from the parsing thread, hence the lock around the
+    SQLite connection.
+    """
+
+    def __init__(self, path: str | Path, max_entries: int = LDIF_JOURNAL_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self.skipped = 0
+        self._staged: deque[tuple[int, bytes]] = deque()
+        self._hits: list[bytes] = []
+        self._lock = Lock()
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        # Each commit is a tick of a logical clock ordering the entries by recency
+        (self._clock,) = self._conn.execute(
+            "SELECT coalesce(max(used_at), 0) FROM entries"
+        ).fetchone()
+
+    def __enter__(self) -> "ApplyJournal":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def seen(self, digest: bytes, offset: int) -> bool:
+        """Whether an entry was applied before, or stage it at the offset of its record otherwise."""
+        with self._lock:
+            hit = self._conn.execute(
+                "SELECT 1 FROM entries WHERE digest = ?", (digest,)
+            ).fetchone()
+            if hit:
+                self.skipped += 1
+                self._hits.append(digest)
+            else:
+                self._staged.append((offset, digest))
+        return hit is not None
+
+    def commit(self, offset: Optional[int] = None) -> None:
+        """Record the staged entries up to the record `offset`, or all of them, as applied."""
+        with self._lock:
+            digests, self._hits = self._hits, []
+            while self._staged and (offset is None or self._staged[0][0] <= offset):
+                digests.append(self._staged.popleft()[1])
+
+            self._clock += 1
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO entries (digest, used_at) VALUES (?, ?) "
+                    "ON CONFLICT (digest) DO UPDATE SET used_at = excluded.used_at",
+                    ((digest, self._clock) for digest in digests),
+                )
+                self._evict()
+
+    def _evict(self) -> None:
+        (size,) = self._conn.execute("SELECT count(*) FROM entries").fetchone()
+        if size > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM entries WHERE digest IN "
+                "(SELECT digest FROM entries ORDER BY used_at LIMIT ?)",
+                (size - self.max_entries,),
+            )
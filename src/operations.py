@@ -2,23 +2,45 @@
 # See LICENSE file for licensing details.
 
 from abc import ABC, abstractmethod
+from collections import defaultdict
 from dataclasses import replace
 from logging import WARN
 from parser import Record
-from typing import Callable, Final, Optional, Type, TypeVar
-
-from sqlalchemy import ColumnExpressionArgument, ScalarResult, select
+from typing import Any, Callable, Final, Optional, Sequence, Type, TypeVar
+
+from sqlalchemy import (
+    String,
+    column,
+    delete,
+    insert,
+    or_,
+    select,
+    update,
+    values,
+)
 from sqlalchemy.orm import Session
 
 from constants import (
     GLAUTH_UTILS_LOGGING_ID,
+    GROUP_IDENTIFIER_ATTRIBUTE,
     LDIF_TO_GROUP_MODEL_MAPPINGS,
     LDIF_TO_INCLUDE_GROUP_MODEL_MAPPINGS,
     LDIF_TO_USER_MODEL_MAPPINGS,
+    USER_IDENTIFIER_ATTRIBUTE,
     OperationType,
 )
-from database import Base, Group, IncludeGroup, User
+from database import (
+    Base,
+    Group,
+    IncludeGroup,
+    User,
+    values_in,
+)
+from fingerprint import fingerprint
+from hierarchy import GroupHierarchyIndex
+from index import IdentityIndex
 from security_logging import OWASPLogger
+from statements import attach_members, detach_members, select_by_name
 
 security_logger = OWASPLogger(appid=GLAUTH_UTILS_LOGGING_ID)
 
@@ -31,17 +53,38 @@ LDIF_MODEL_MAPPINGS = {
 Method = TypeVar("Method", bound=Callable)
 
 
+def is_noop_update(obj: Base, record: Record) -> bool:
+    """Whether an update record leaves the row as it is.
+
+    The fingerprint of the updated columns, and of the merged custom
+    attributes, is compared before and after applying the record.
+    """
+    attribute_mapping = LDIF_MODEL_MAPPINGS[record.model]
+    target = {
+        attribute_mapping[k]: v for k, v in record.attributes.items() if k in attribute_mapping
+    }
+    current = {attr: getattr(obj, attr) for attr in target}
+
+    if record.custom_attributes:
+        current["custom_attributes"] = obj.custom_attributes or {}
+        target["custom_attributes"] = {**current["custom_attributes"], **record.custom_attributes}
+
+    return fingerprint(current) == fingerprint(target)
+
+
 def op_method_register(cls: Type["Operation"]) -> Type["Operation"]:
     for method_name in dir(cls):
         method = getattr(cls, method_name)
-        if hasattr(method, "_op"):
-            cls._op_registry[method._op] = method
+        if hasattr(method, "_ops"):
+            registry = cls._bulk_op_registry if method._bulk else cls._op_registry
+            registry.update(dict.fromkeys(method._ops, method))
     return cls
 
 
-def op_label(op: OperationType) -> Callable[[Method], Method]:
+def op_label(*ops: OperationType, bulk: bool = False) -> Callable[[Method], Method]:
     def decorator(func: Method) -> Method:
-        func._op = op
+        func._ops = ops
+        func._bulk = bulk
         return func
 
     return decorator
@@ -51,20 +94,37 @@ def op_label(op: OperationType) -> Callable[[Method], Method]:
 # https://docs.sqlalchemy.org/en/20/glossary.html#term-unit-of-work
 class Operation(ABC):
     _op_registry: dict[OperationType, Callable] = {}
+    _bulk_op_registry: dict[OperationType, Callable] = {}
+
+    def __init__(
+        self,
+        index: Optional[IdentityIndex] = None,
+        hierarchy: Optional[GroupHierarchyIndex] = None,
+    ):
+        self.index = index if index is not None else IdentityIndex()
+        self.hierarchy = hierarchy if hierarchy is not None else GroupHierarchyIndex()
 
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
         cls._op_registry = {}
+        cls._bulk_op_registry = {}
 
     @classmethod
     def get_registry(cls, op: OperationType) -> Optional[Callable]:
         return cls._op_registry.get(op)
 
-    def select(
-        self, session: Session, model: Type[Base], *criteria: ColumnExpressionArgument
-    ) -> ScalarResult[Base]:
-        res = session.scalars(select(model).filter(*criteria))
-        return res
+    @classmethod
+    def get_bulk_registry(cls, op: OperationType) -> Optional[Callable]:
+        return cls._bulk_op_registry.get(op)
+
+    def lookup(self, session: Session, model: Type[Base], name: Optional[str]) -> Optional[Base]:
+        """Look up a user or a group by name, serving hits from the identity index."""
+        if (model, name) in self.index:
+            return self.index.get(model, name)
+
+        obj = session.scalars(select_by_name(model), {"name": name}).first()
+        self.index.add(model, name, obj)
+        return obj
 
     def create(self, session: Session, record: Record) -> None:
         attribute_mapping = LDIF_MODEL_MAPPINGS[record.model]
@@ -74,30 +134,109 @@ class Operation(ABC):
         }
         obj = record.model(**attributes)
         session.add(obj)
+        if record.model is not IncludeGroup:
+            self.index.add(record.model, obj.name, obj)
 
-    def update(self, session: Session, record: Record) -> None:
-        if not (
-            obj := self.select(
-                session, record.model, record.model.name == record.identifier
-            ).first()
-        ):
-            return
+    def update(self, session: Session, record: Record) -> bool:
+        """Apply an update record, returning whether the row was changed."""
+        obj = self.lookup(session, record.model, record.identifier)
+        if obj is None or is_noop_update(obj, record):
+            return False
 
         attribute_mapping = LDIF_MODEL_MAPPINGS[record.model]
         for attr, value in record.attributes.items():
             if mapped_attr := attribute_mapping.get(attr):
                 setattr(obj, mapped_attr, value)
 
+        if obj.name != record.identifier:
+            self.index.invalidate(record.model, record.identifier, obj.name)
+        return True
+
     def delete(self, session: Session, record: Record) -> None:
-        if obj := self.select(
-            session, record.model, record.model.name == record.identifier
-        ).first():
+        if obj := self.lookup(session, record.model, record.identifier):
             session.delete(obj)
+            self.index.add(record.model, record.identifier, None)
 
     @abstractmethod
     def move(self, session: Session, record: Record) -> None:
         pass
 
+    def bulk_create(self, session: Session, records: Sequence[Record]) -> None:
+        attribute_mapping = LDIF_MODEL_MAPPINGS[records[0].model]
+
+        rows = [
+            {
+                attribute_mapping[k]: v
+                for k, v in record.attributes.items()
+                if k in attribute_mapping
+            }
+            for record in records
+        ]
+        session.execute(insert(records[0].model), rows)
+        self.index.invalidate(records[0].model, *(record.identifier for record in records))
+
+    def bulk_update(self, session: Session, records: Sequence[Record]) -> set[str]:
+        """Apply the updates of multiple records with `UPDATE ... FROM (VALUES ...)`.
+
+        Records sharing an identifier are merged in order, so the last value
+        wins just like applying them one by one. Records are grouped by the
+        set of updated columns, and one statement is emitted per group. Rows
+        whose columns already hold the new values are left untouched.
+
+        Returns the identifiers of the updated rows.
+        """
+        model = records[0].model
+        attribute_mapping = LDIF_MODEL_MAPPINGS[model]
+
+        changes: dict[str, dict[str, Any]] = defaultdict(dict)
+        for record in records:
+            changes[record.identifier].update(
+                (attribute_mapping[k], v)
+                for k, v in record.attributes.items()
+                if k in attribute_mapping
+            )
+
+        rows_by_columns: dict[tuple[str, ...], list[tuple]] = defaultdict(list)
+        for identifier, change in changes.items():
+            columns = tuple(sorted(change))
+            rows_by_columns[columns].append((identifier, *(change[c] for c in columns)))
+
+        updated: set[str] = set()
+        for columns, rows in rows_by_columns.items():
+            if not columns:
+                continue
+
+            mapped_columns = model.__mapper__.columns
+            changeset = (
+                values(
+                    column("identifier", String),
+                    *(column(c, mapped_columns[c].type) for c in columns),
+                    name="changeset",
+                )
+                .data(rows)
+                .cte("changeset")
+            )
+            stmt = (
+                update(model)
+                .where(
+                    model.name == changeset.c.identifier,
+                    or_(*(getattr(model, c).is_distinct_from(changeset.c[c]) for c in columns)),
+                )
+                .values({c: changeset.c[c] for c in columns})
+                .returning(model.name)
+            )
+            res = session.execute(stmt, execution_options={"synchronize_session": "fetch"})
+            updated.update(res.scalars())
+
+        return updated
+
+    def bulk_delete(self, session: Session, records: Sequence[Record]) -> None:
+        model = records[0].model
+        names = list(dict.fromkeys(record.identifier for record in records))
+        session.execute(delete(model).where(values_in(session, model.name, names)))
+        for name in names:
+            self.index.add(model, name, None)
+
 
 @op_method_register
 class UserOperation(Operation):
@@ -121,16 +260,21 @@ class UserOperation(Operation):
         )
 
         session.add(obj)
+        self.index.add(User, obj.name, obj)
 
     @op_label(OperationType.UPDATE)
-    def update(self, session: Session, record: Record) -> None:
-        if not (obj := self.select(session, User, User.name == record.identifier).first()):
-            return
+    def update(self, session: Session, record: Record) -> bool:
+        obj = self.lookup(session, User, record.identifier)
+        if obj is None or is_noop_update(obj, record):
+            return False
 
         for attr, value in record.attributes.items():
             if mapped_attr := LDIF_TO_USER_MODEL_MAPPINGS.get(attr):
                 setattr(obj, mapped_attr, value)
 
+        if obj.name != record.identifier:
+            self.index.invalidate(User, record.identifier, obj.name)
+
         if record.custom_attributes:
             obj.custom_attributes = {
                 **obj.custom_attributes,
@@ -143,6 +287,7 @@ class UserOperation(Operation):
             description=f"User `{record.identifier}` was updated",
             user=record.identifier,
         )
+        return True
 
     @op_label(OperationType.DELETE)
     def delete(self, session: Session, record: Record) -> None:
@@ -156,10 +301,10 @@ class UserOperation(Operation):
 
     @op_label(OperationType.MOVE)
     def move(self, session: Session, record: Record) -> None:
-        if not (obj := self.select(session, User, User.name == record.identifier).first()):
+        if not (obj := self.lookup(session, User, record.identifier)):
             return
 
-        group = self.select(session, Group, Group.name == record.attributes.get("ou")).first()
+        group = self.lookup(session, Group, record.attributes.get("ou"))
         obj.group = group
         security_logger.log_event(
             event=f"authz_admin:user_moved:{record.identifier}",
@@ -169,12 +314,93 @@ class UserOperation(Operation):
             user=record.identifier,
         )
 
+    @op_label(OperationType.CREATE, bulk=True)
+    def bulk_create(self, session: Session, records: Sequence[Record]) -> None:
+        rows = []
+        for record in records:
+            row = {
+                LDIF_TO_USER_MODEL_MAPPINGS[k]: v
+                for k, v in record.attributes.items()
+                if k in LDIF_TO_USER_MODEL_MAPPINGS
+            }
+            if record.custom_attributes:
+                row["custom_attributes"] = record.custom_attributes
+            rows.append(row)
+
+            security_logger.log_event(
+                event=f"authz_admin:user_created:{record.identifier}",
+                level=WARN,
+                description=f"User `{record.identifier}` was created",
+                user=record.identifier,
+            )
+
+        session.execute(insert(User), rows)
+        self.index.invalidate(User, *(record.identifier for record in records))
+
+    @op_label(OperationType.UPDATE, bulk=True)
+    def bulk_update(self, session: Session, records: Sequence[Record]) -> set[str]:
+        # Custom attributes are merged with the stored ones, and renames change
+        # the identifier later records refer to, so both go through `update`
+        updated: set[str] = set()
+        pending: list[Record] = []
+        for record in records:
+            if self._is_bulk_updatable(record):
+                pending.append(record)
+                continue
+
+            updated |= self._bulk_update_and_log(session, pending)
+            pending = []
+            if self.update(session, record):
+                updated.add(record.identifier)
+
+        updated |= self._bulk_update_and_log(session, pending)
+        return updated
+
+    @op_label(OperationType.DELETE, bulk=True)
+    def bulk_delete(self, session: Session, records: Sequence[Record]) -> None:
+        super().bulk_delete(session, records)
+        for record in records:
+            security_logger.log_event(
+                event=f"authz_admin:user_deleted:{record.identifier}",
+                level=WARN,
+                description=f"User `{record.identifier}` was deleted",
+                user=record.identifier,
+            )
+
+    @staticmethod
+    def _is_bulk_updatable(record: Record) -> bool:
+        mapped_attributes = record.attributes.keys() & LDIF_TO_USER_MODEL_MAPPINGS.keys()
+        return bool(mapped_attributes) and not (
+            record.custom_attributes or USER_IDENTIFIER_ATTRIBUTE in mapped_attributes
+        )
+
+    def _bulk_update_and_log(self, session: Session, records: Sequence[Record]) -> set[str]:
+        if not records:
+            return set()
+
+        updated = super().bulk_update(session, records)
+        for record in records:
+            if record.identifier not in updated:
+                continue
+
+            security_logger.log_event(
+                event=f"authz_admin:user_updated:{record.identifier}",
+                level=WARN,
+                description=f"User `{record.identifier}` was updated",
+                user=record.identifier,
+            )
+
+        return updated
+
 
 @op_method_register
 class GroupOperation(Operation):
     @op_label(OperationType.CREATE)
     def create(self, session: Session, record: Record) -> None:
         super().create(session, record)
+        self.create_association(session, record)
+
+    def create_association(self, session: Session, record: Record) -> None:
         match record.attributes:
             case {"parentGroup": parent_group} if parent_group:
                 association_record = replace(record)
@@ -193,18 +419,26 @@ class GroupOperation(Operation):
         )
 
     @op_label(OperationType.UPDATE)
-    def update(self, session: Session, record: Record) -> None:
-        super().update(session, record)
+    def update(self, session: Session, record: Record) -> bool:
+        if not super().update(session, record):
+            return False
+
+        name = record.attributes.get(GROUP_IDENTIFIER_ATTRIBUTE, record.identifier)
+        if name != record.identifier:
+            self.hierarchy.rename(record.identifier, name)
+
         security_logger.log_event(
             event=f"authz_admin:group_updated:{record.identifier}",
             level=WARN,
             description=f"Group `{record.identifier}` was updated",
             group=record.identifier,
         )
+        return True
 
     @op_label(OperationType.DELETE)
     def delete(self, session: Session, record: Record) -> None:
         super().delete(session, record)
+        self.hierarchy.discard(record.identifier)
         security_logger.log_event(
             event=f"authz_admin:group_deleted:{record.identifier}",
             level=WARN,
@@ -214,21 +448,23 @@ class GroupOperation(Operation):
 
     @op_label(OperationType.MOVE)
     def move(self, session: Session, record: Record) -> None:
-        group = self.select(session, Group, Group.name == record.identifier).first()
-        parent_group = self.select(
-            session, Group, Group.name == record.attributes.get("parentGroup")
-        ).first()
-        new_parent_group = self.select(
-            session, Group, Group.name == record.attributes.get("newParentGroup")
-        ).first()
-
-        if association := self.select(
-            session,
-            IncludeGroup,
-            IncludeGroup.parent_group == parent_group,
-            IncludeGroup.child_group == group,
-        ).first():
+        group = self.lookup(session, Group, record.identifier)
+        parent_group = self.lookup(session, Group, record.attributes.get("parentGroup"))
+        new_parent_group = self.lookup(session, Group, record.attributes.get("newParentGroup"))
+
+        self.hierarchy.load(session)
+        if group is not None and new_parent_group is not None:
+            self.hierarchy.check_move(group.name, new_parent_group.name)
+
+        if (
+            group is not None
+            and parent_group is not None
+            and (association := self.hierarchy.remove(parent_group.name, group.name))
+        ):
             association.parent_group = new_parent_group
+            if new_parent_group is not None:
+                self.hierarchy.add(new_parent_group.name, group.name, association)
+
             security_logger.log_event(
                 event=f"authz_admin:group_updated:{record.identifier}",
                 level=WARN,
@@ -238,53 +474,142 @@ class GroupOperation(Operation):
             )
             return
 
-        include_group_record = Record(
-            identifier="ou",
-            model=IncludeGroup,
-            attributes={"parentGroup": new_parent_group, "childGroup": group},
+        association = IncludeGroup(parent_group=new_parent_group, child_group=group)
+        session.add(association)
+        if group is not None and new_parent_group is not None:
+            self.hierarchy.add(new_parent_group.name, group.name, association)
+
+    @op_label(OperationType.CREATE, bulk=True)
+    def bulk_create(self, session: Session, records: Sequence[Record]) -> None:
+        super().bulk_create(session, records)
+        for record in records:
+            self.create_association(session, record)
+
+    @op_label(OperationType.UPDATE, bulk=True)
+    def bulk_update(self, session: Session, records: Sequence[Record]) -> set[str]:
+        # Group renames change the identifier later records refer to
+        if any(GROUP_IDENTIFIER_ATTRIBUTE in record.attributes for record in records):
+            return {record.identifier for record in records if self.update(session, record)}
+
+        updated = super().bulk_update(session, records)
+        for record in records:
+            if record.identifier not in updated:
+                continue
+
+            security_logger.log_event(
+                event=f"authz_admin:group_updated:{record.identifier}",
+                level=WARN,
+                description=f"Group `{record.identifier}` was updated",
+                group=record.identifier,
+            )
+        return updated
+
+    @op_label(OperationType.DELETE, bulk=True)
+    def bulk_delete(self, session: Session, records: Sequence[Record]) -> None:
+        # Mirror the ORM which detaches the users of a deleted group
+        names = list(dict.fromkeys(record.identifier for record in records))
+        gid_numbers = select(Group.gid_number).where(values_in(session, Group.name, names))
+        session.execute(
+            update(User).where(User.gid_number.in_(gid_numbers)).values(gid_number=None),
+            execution_options={"synchronize_session": "fetch"},
         )
-        super().create(session, include_group_record)
+
+        super().bulk_delete(session, records)
+        for record in records:
+            self.hierarchy.discard(record.identifier)
+            security_logger.log_event(
+                event=f"authz_admin:group_deleted:{record.identifier}",
+                level=WARN,
+                description=f"Group `{record.identifier}` was deleted",
+                group=record.identifier,
+            )
 
     @op_label(OperationType.ATTACH)
     def attach(self, session: Session, record: Record) -> None:
-        if not (group := self.select(session, Group, Group.name == record.identifier).first()):
+        if not (group := self.lookup(session, Group, record.identifier)):
             return
 
-        member_uid = record.attributes["memberUid"]
-        if not isinstance(member_uid, list):
-            member_uid = [member_uid]
-
-        uid_numbers = [int(uid) for uid in member_uid]
-        users = self.select(session, User, User.uid_number.in_(uid_numbers)).all()
-        for user in users:
-            user.other_groups = user.other_groups | {str(group.gid_number)}
-
-        security_logger.log_event(
-            event=f"authz_admin:group_attached:{record.identifier}",
-            level=WARN,
-            description=f"Attached users to group `{record.identifier}`",
-            group=record.identifier,
-            uids=",".join(map(str, uid_numbers)),
-        )
+        uid_numbers = self._member_uids(record)
+        self._attach_members(session, group, uid_numbers)
+        self._log_membership(record, uid_numbers)
 
     @op_label(OperationType.DETACH)
     def detach(self, session: Session, record: Record) -> None:
-        if not (group := self.select(session, Group, Group.name == record.identifier).first()):
+        if not (group := self.lookup(session, Group, record.identifier)):
             return
 
+        uid_numbers = self._member_uids(record)
+        self._detach_members(session, group, uid_numbers)
+        self._log_membership(record, uid_numbers)
+
+    @op_label(OperationType.ATTACH, OperationType.DETACH, bulk=True)
+    def bulk_update_members(self, session: Session, records: Sequence[Record]) -> None:
+        """Coalesce consecutive attach and detach records into two updates per group.
+
+        When a user is attached to and detached from the same group by
+        multiple records, the last record wins just like applying them one by
+        one.
+        """
+        memberships: dict[str, dict[int, OperationType]] = defaultdict(dict)
+        for record in records:
+            memberships[record.identifier].update(
+                dict.fromkeys(self._member_uids(record), record.op)
+            )
+
+        for name, members in memberships.items():
+            if not (group := self.lookup(session, Group, name)):
+                continue
+
+            attached = [uid for uid, op in members.items() if op is OperationType.ATTACH]
+            detached = [uid for uid, op in members.items() if op is OperationType.DETACH]
+            self._attach_members(session, group, attached)
+            self._detach_members(session, group, detached)
+
+        for record in records:
+            if self.index.get(Group, record.identifier) is not None:
+                self._log_membership(record, self._member_uids(record))
+
+    @staticmethod
+    def _member_uids(record: Record) -> list[int]:
         member_uid = record.attributes["memberUid"]
         if not isinstance(member_uid, list):
             member_uid = [member_uid]
 
-        uid_numbers = [int(uid) for uid in member_uid]
-        users = self.select(session, User, User.uid_number.in_(uid_numbers)).all()
-        for user in users:
-            user.other_groups = user.other_groups - {str(group.gid_number)}
+        return [int(uid) for uid in member_uid]
+
+    @staticmethod
+    def _attach_members(session: Session, group: Group, uid_numbers: Sequence[int]) -> None:
+        if not uid_numbers:
+            return
+
+        session.execute(
+            attach_members(session.get_bind().dialect.name),
+            {"uid_numbers": list(uid_numbers), "gid_number": str(group.gid_number)},
+            execution_options={"synchronize_session": "fetch"},
+        )
+
+    @staticmethod
+    def _detach_members(session: Session, group: Group, uid_numbers: Sequence[int]) -> None:
+        if not uid_numbers:
+            return
+
+        session.execute(
+            detach_members(session.get_bind().dialect.name),
+            {"uid_numbers": list(uid_numbers), "gid_number": str(group.gid_number)},
+            execution_options={"synchronize_session": "fetch"},
+        )
 
+    @staticmethod
+    def _log_membership(record: Record, uid_numbers: Sequence[int]) -> None:
+        attached = record.op is OperationType.ATTACH
         security_logger.log_event(
-            event=f"authz_admin:group_detached:{record.identifier}",
+            event=f"authz_admin:group_{'attached' if attached else 'detached'}:{record.identifier}",
             level=WARN,
-            description=f"Detached users from group `{record.identifier}`",
+            description=(
+                f"Attached users to group `{record.identifier}`"
+                if attached
+                else f"Detached users from group `{record.identifier}`"
+            ),
             group=record.identifier,
             uids=",".join(map(str, uid_numbers)),
         )
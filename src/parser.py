@@ -1,80 +1,113 @@
 # Copyright 2023 Canonical Ltd.
 # See LICENSE file for licensing details.
 
+import mmap
+import multiprocessing
 import operator
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import dataclass, field
-from functools import wraps
-from typing import Any, Callable, Iterable, List, Optional, TextIO, Type
+from functools import partial
+from pathlib import Path
+from queue import Full, Queue
+from threading import Event, Thread
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    MutableMapping,
+    Optional,
+    Sequence,
+    TextIO,
+    Type,
+)
 
-from ldif import LDIFRecordList
+from ldif import LDIFParser, LDIFRecordList
 
+from attributes import AttributeMap
 from constants import (
-    GROUP_HIERARCHY_REGEX,
-    IDENTIFIER_REGEX,
+    LDIF_PROCESSED_ATTRIBUTES,
     LDIF_SANITIZE_ATTRIBUTES,
+    LDIF_SHARD_SIZE,
+    LDIF_STREAM_BUFFER_SIZE,
     NEWRDN_REGEX,
     PASSWORD_ALGORITHM_REGISTRY,
     PASSWORD_REGEX,
+    PROCESS_POOL_START_METHOD,
     SUPPORTED_LDIF_ATTRIBUTES,
     USER_IDENTIFIER_ATTRIBUTE,
     OperationType,
 )
 from database import Base, Group, User
+from dn import parse_dn
 from exceptions import InvalidAttributeValueError, InvalidDistinguishedNameError
+from fingerprint import entry_fingerprint
+from journal import ApplyJournal
+from reader import MappedLDIFParser, split_ranges
 
 Processor = Callable[[str, dict, "Record"], None]
 
 processor_chain: List[Processor] = []
+_compiled_chain: Callable[[str, dict], "Record"]
 
 
-@dataclass
+@dataclass(slots=True)
 class Record:
     identifier: str = USER_IDENTIFIER_ATTRIBUTE
     model: Type[Base] = User
     op: OperationType = OperationType.CREATE
-    attributes: dict[str, Any] = field(default_factory=dict)
-    custom_attributes: dict[str, Any] = field(default_factory=dict)
+    attributes: MutableMapping[str, Any] = field(default_factory=AttributeMap)
+    custom_attributes: MutableMapping[str, Any] = field(default_factory=AttributeMap)
 
 
-def _extract_identifier(haystack: str) -> str:
-    matched = IDENTIFIER_REGEX.search(haystack)
-    return matched.group("identifier") if matched else ""
+def _extract_newrdn(haystack: str) -> str:
+    matched = NEWRDN_REGEX.search(haystack)
+    return matched.group("newrdn") if matched else ""
 
 
-def _extract_group(haystack: str) -> str:
-    _, *parents = GROUP_HIERARCHY_REGEX.findall(haystack)[:2]
-    return parents[0] if parents else ""
+def _compile_chain(processors: Sequence[Processor]) -> Callable[[str, dict], Record]:
+    chain = tuple(processors)
 
+    def process(dn: str, entry: dict) -> Record:
+        record = Record()
+        for processor in chain:
+            processor(dn, entry, record)
+        return record
 
-def _extract_newrdn(haystack: str) -> str:
-    matched = NEWRDN_REGEX.search(haystack)
-    return matched.group("newrdn") if matched else ""
+    return process
 
 
 def chain_order(order: int) -> Callable[[Processor], Processor]:
     def decorator(func: Processor) -> Processor:
-        @wraps(func)
-        def wrapper(*args: Any, **kwargs: Any) -> Any:
-            return func(*args, **kwargs)
+        global _compiled_chain
 
-        wrapper.order = order
-        processor_chain.append(wrapper)
+        func.order = order
+        processor_chain.append(func)
         processor_chain.sort(key=operator.attrgetter("order"))
-        return wrapper
+        _compiled_chain = _compile_chain(processor_chain)
+        return func
 
     return decorator
 
 
 @chain_order(order=1)
 def stringify_processor(dn: str, entry: dict, record: Record) -> None:
+    # Only the attributes read by the processors are decoded here. The other
+    # values are kept as bytes and decoded by the record attributes when read.
     for k, v in entry.items():
-        decoded = [i.decode("utf-8") for i in v]
-        entry[k] = decoded if len(v) > 1 else decoded[0]
+        if k in LDIF_PROCESSED_ATTRIBUTES:
+            entry[k] = v[0].decode("utf-8") if len(v) == 1 else [i.decode("utf-8") for i in v]
+        else:
+            entry[k] = v[0] if len(v) == 1 else v
 
 
 @chain_order(order=2)
 def entry_validation_processor(dn: str, entry: dict, record: Record):
-    if not IDENTIFIER_REGEX.search(dn):
+    if not parse_dn(dn).is_valid:
         raise InvalidDistinguishedNameError(f"Invalid DN: {dn}")
 
     if password := entry.get("userPassword"):
@@ -82,7 +115,7 @@ def entry_validation_processor(dn: str, entry: dict, record: Record):
             raise InvalidAttributeValueError(f"Invalid password for DN: {dn}")
 
     if new_superior := entry.get("newsuperior"):
-        if not IDENTIFIER_REGEX.search(new_superior):
+        if not parse_dn(new_superior).is_valid:
             raise InvalidAttributeValueError(f"Invalid newsuperior for DN: {dn}")
 
     if newrdn := entry.get("newrdn"):
@@ -96,11 +129,9 @@ def entry_validation_processor(dn: str, entry: dict, record: Record):
 
 @chain_order(order=3)
 def dn_processor(dn: str, entry: dict, record: Record) -> None:
-    matched = IDENTIFIER_REGEX.search(dn)
-    record.model = (
-        User if matched.group("id_attribute").casefold() == USER_IDENTIFIER_ATTRIBUTE else Group
-    )
-    record.identifier = matched.group("identifier")
+    parsed = parse_dn(dn)
+    record.model = User if parsed.id_attribute == USER_IDENTIFIER_ATTRIBUTE else Group
+    record.identifier = parsed.identifier
 
 
 @chain_order(order=4)
@@ -121,13 +152,13 @@ def operation_processor(dn: str, entry: dict, record: Record) -> None:
     match entry.get("changetype"):
         case "modrdn" | "moddn" if ("newsuperior" in entry and record.model is User):
             record.op = OperationType.MOVE
-            entry["ou"] = _extract_identifier(entry["newsuperior"])
+            entry["ou"] = parse_dn(entry["newsuperior"]).identifier
             return
 
         case "modrdn" | "moddn" if ("newsuperior" in entry and record.model is Group):
             record.op = OperationType.MOVE
-            entry["newParentGroup"] = _extract_identifier(entry["newsuperior"])
-            entry["parentGroup"] = _extract_group(dn)
+            entry["newParentGroup"] = parse_dn(entry["newsuperior"]).identifier
+            entry["parentGroup"] = parse_dn(dn).parent_group
             return
 
         case "modrdn" | "moddn" if "newrdn" in entry:
@@ -153,26 +184,31 @@ def operation_processor(dn: str, entry: dict, record: Record) -> None:
             record.op = OperationType.CREATE
             if record.model is not Group:
                 return
-            entry["parentGroup"] = _extract_group(dn)
+            entry["parentGroup"] = parse_dn(dn).parent_group
 
 
 @chain_order(order=6)
 def attribute_processor(dn: str, entry: dict, record: Record) -> None:
-    for sanitized_attribute in LDIF_SANITIZE_ATTRIBUTES:
-        entry.pop(sanitized_attribute, None)
+    keys, values, custom_keys, custom_values = [], [], [], []
+    keep_custom_attributes = record.model is User
+    for k, v in entry.items():
+        if k in SUPPORTED_LDIF_ATTRIBUTES:
+            keys.append(k)
+            values.append(v)
+        elif keep_custom_attributes and k not in LDIF_SANITIZE_ATTRIBUTES:
+            custom_keys.append(k)
+            custom_values.append(v)
 
-    supported_attributes = {k: v for k, v in entry.items() if k in SUPPORTED_LDIF_ATTRIBUTES}
+    record.attributes = AttributeMap.from_lists(keys, values)
+    record.custom_attributes = AttributeMap.from_lists(custom_keys, custom_values)
 
-    record.attributes = supported_attributes
 
+def process_entry(dn: str, entry: dict) -> Record:
+    return _compiled_chain(dn, entry)
 
-@chain_order(order=7)
-def custom_attribute_processor(dn: str, entry: dict, record: Record) -> None:
-    if record.model is not User:
-        return
 
-    unsupported_attributes = {k: v for k, v in entry.items() if k not in SUPPORTED_LDIF_ATTRIBUTES}
-    record.custom_attributes = unsupported_attributes
+def is_group_creation(record: Record) -> bool:
+    return record.model is Group and record.op is OperationType.CREATE
 
 
 class Parser(LDIFRecordList):
@@ -180,8 +216,219 @@ class Parser(LDIFRecordList):
         super().__init__(input_file, ignored_attr_types)
 
     def handle(self, dn: str, entry: dict) -> None:
-        record = Record()
-        for processor in processor_chain:
-            processor(dn, entry, record)
+        self.all_records.append(process_entry(dn, entry))
+
+
+class _StreamClosed(Exception):
+    """Raised in the parsing thread when the consumer stops iterating."""
+
+
+_END_OF_STREAM = object()
+
+
+class StreamParser(LDIFParser):
+    """Parse LDIF records in a background thread and yield them one by one.
+
+    At most `buffer_size` processed records are held in memory at any time,
+    so the memory footprint does not depend on the size of the LDIF file.
+    The first `skip` records are read but neither processed nor yielded.
+    With a `journal`, the entries applied by a previous run are skipped too.
+    `offset` is the number of records of the file read up to the last
+    yielded record, the skipped ones included.
+    """
+
+    def __init__(
+        self,
+        input_file: TextIO,
+        ignored_attr_types: Optional[Iterable[str]] = None,
+        buffer_size: int = LDIF_STREAM_BUFFER_SIZE,
+        skip: int = 0,
+        journal: Optional[ApplyJournal] = None,
+    ):
+        super().__init__(input_file, ignored_attr_types)
+        self._buffer: Queue = Queue(maxsize=buffer_size)
+        self._closed = Event()
+        self._skip = skip
+        self._journal = journal
+        self.offset = skip
+
+    def handle(self, dn: str, entry: dict) -> None:
+        if (offset := self.records_read + 1) <= self._skip:
+            return
+
+        if self._journal is not None and self._journal.seen(entry_fingerprint(dn, entry), offset):
+            return
+
+        if not self._put((offset, process_entry(dn, entry))):
+            raise _StreamClosed()
+
+    def _put(self, item: Any) -> bool:
+        while not self._closed.is_set():
+            try:
+                self._buffer.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def _produce(self) -> None:
+        try:
+            self.parse()
+        except _StreamClosed:
+            return
+        except Exception as e:
+            self._put(e)
+            return
+
+        self._put(_END_OF_STREAM)
+
+    def __iter__(self) -> Iterator[Record]:
+        producer = Thread(target=self._produce, name="ldif-stream-parser", daemon=True)
+        producer.start()
+        try:
+            while (item := self._buffer.get()) is not _END_OF_STREAM:
+                if isinstance(item, Exception):
+                    raise item
+                self.offset, record = item
+                yield record
+        finally:
+            self._closed.set()
+            producer.join()
 
-        self.all_records.append(record)
+
+class MappedParser(Parser, MappedLDIFParser):
+    """A `Parser` reading a memory-mapped LDIF file, opened in binary mode."""
+
+
+# A record parsed by a worker, with the fingerprint of its entry if requested. The records
+# are sent back as plain tuples, which pickle much faster than the records themselves.
+_ParsedRecord = tuple[Optional[bytes], str, Type[Base], OperationType, tuple, list, tuple, list]
+
+
+def _attribute_parts(attributes: MutableMapping[str, Any]) -> tuple[tuple[str, ...], list[Any]]:
+    if not isinstance(attributes, AttributeMap):
+        attributes = AttributeMap(attributes)
+    return attributes.parts()
+
+
+class _ShardParser(MappedLDIFParser):
+    def __init__(
+        self, input_file: BinaryIO, ignored_attr_types: Optional[Iterable[str]], fingerprints: bool
+    ) -> None:
+        super().__init__(input_file, ignored_attr_types)
+        self.fingerprints = fingerprints
+        self.records: list[_ParsedRecord] = []
+
+    def handle(self, dn: str, entry: dict) -> None:
+        fingerprint = entry_fingerprint(dn, entry) if self.fingerprints else None
+        record = process_entry(dn, entry)
+        self.records.append(
+            (
+                fingerprint,
+                record.identifier,
+                record.model,
+                record.op,
+                *_attribute_parts(record.attributes),
+                *_attribute_parts(record.custom_attributes),
+            )
+        )
+
+
+def _parse_shard(
+    ldif_file: Path,
+    shard: range,
+    ignored_attr_types: Optional[Iterable[str]] = None,
+    fingerprints: bool = False,
+) -> list[_ParsedRecord]:
+    with open(ldif_file, "rb") as f:
+        parser = _ShardParser(f, ignored_attr_types, fingerprints)
+        parser.parse_range(shard.start, shard.stop)
+    return parser.records
+
+
+class ShardedParser:
+    """Parse an LDIF file in shards across a process pool, and yield the records.
+
+    The memory-mapped file is split into shards of about `shard_size` bytes,
+    aligned on record boundaries. The shards are parsed and processed by the
+    workers, with at most one shard per worker waiting to be consumed, and
+    the records are merged back in file order. Like with `StreamParser`, the
+    first `skip` records and the entries applied before according to the
+    `journal` are not yielded, and `offset` is the number of records of the
+    file read up to the last yielded record.
+
+    With `groups_first`, the group creations are yielded first, and the other
+    records are held until the whole file is parsed, in file order, so that
+    users can reference groups created further down the file.
+    """
+
+    def __init__(
+        self,
+        ldif_file: str | Path,
+        ignored_attr_types: Optional[Iterable[str]] = None,
+        max_workers: Optional[int] = None,
+        shard_size: int = LDIF_SHARD_SIZE,
+        skip: int = 0,
+        journal: Optional[ApplyJournal] = None,
+        groups_first: bool = False,
+    ):
+        self.ldif_file = Path(ldif_file)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.shard_size = shard_size
+        self.records_read = 0
+        self.offset = skip
+        self._parse = partial(
+            _parse_shard,
+            self.ldif_file,
+            ignored_attr_types=ignored_attr_types,
+            fingerprints=journal is not None,
+        )
+        self._skip = skip
+        self._journal = journal
+        self._groups_first = groups_first
+
+    def shards(self) -> list[range]:
+        with open(self.ldif_file, "rb") as f:
+            if not (size := os.fstat(f.fileno()).st_size):
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                return split_ranges(buf, -(-size // self.shard_size))
+
+    def _parsed_shards(self) -> Iterator[list[_ParsedRecord]]:
+        shards = iter(self.shards())
+        pending: deque[Future] = deque()
+        # The parser runs next to the audit log writer thread and the database connections
+        mp_context = multiprocessing.get_context(PROCESS_POOL_START_METHOD)
+        with ProcessPoolExecutor(max_workers=self.max_workers, mp_context=mp_context) as pool:
+            try:
+                for shard in shards:
+                    pending.append(pool.submit(self._parse, shard))
+                    if len(pending) > self.max_workers:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def __iter__(self) -> Iterator[Record]:
+        held: list[tuple[int, Record]] = []
+        from_lists = AttributeMap.from_lists
+        for parsed in self._parsed_shards():
+            for fingerprint, identifier, model, op, keys, values, *custom in parsed:
+                self.records_read += 1
+                if self.records_read <= self._skip:
+                    continue
+                if fingerprint is not None and self._journal.seen(fingerprint, self.records_read):
+                    continue
+
+                record = Record(identifier, model, op, from_lists(keys, values), from_lists(*custom))
+                if self._groups_first and not is_group_creation(record):
+                    held.append((self.records_read, record))
+                    continue
+                self.offset = self.records_read
+                yield record
+
+        for offset, record in held:
+            self.offset = offset
+            yield record
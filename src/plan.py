@@ -0,0 +1,235 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from itertools import groupby
+from parser import Record, StreamParser
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional, Sequence, Type
+
+from sqlalchemy import Engine, event
+from sqlalchemy.orm import Session
+
+from constants import (
+    GROUP_IDENTIFIER_ATTRIBUTE,
+    LDIF_BATCH_SIZE,
+    LDIF_PARSER_IGNORED_ATTRIBUTES,
+    USER_IDENTIFIER_ATTRIBUTE,
+    OperationType,
+)
+from database import Base, Group, User
+from executor import batch_key
+from index import IdentityIndex
+from operations import is_noop_update
+from scheduler import DependencyScheduler
+
+_IDENTIFIER_ATTRIBUTES = {User: USER_IDENTIFIER_ATTRIBUTE, Group: GROUP_IDENTIFIER_ATTRIBUTE}
+
+
+@dataclass
+class Plan:
+    """The changes an LDIF import would make to the database."""
+
+    operations: Counter = field(default_factory=Counter)
+    # The names of the missing groups, and the gid numbers of the missing primary groups
+    missing_groups: set[str] = field(default_factory=set)
+    noop_updates: int = 0
+    estimated_statements: int = 0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "operations": {op.value: self.operations[op] for op in OperationType},
+            "missing-groups": ",".join(sorted(self.missing_groups)),
+            "no-op-updates": self.noop_updates,
+            "estimated-statements": self.estimated_statements,
+        }
+
+
+class Planner:
+    """Compute the plan of the records without writing to the database.
+
+    Records are consumed in windows like `BatchExecutor`. The users and groups
+    referenced by a window are bulk-loaded into an identity index, and the
+    effect of each record is then evaluated in memory against the index and
+    the records planned before it. The estimated statements are the prefetch
+    queries plus one statement per batch of records applied in bulk and one
+    per record otherwise.
+    """
+
+    def __init__(self, session: Session, batch_size: int = LDIF_BATCH_SIZE):
+        self.session = session
+        self.batch_size = batch_size
+        self.plan = Plan()
+        self.index = IdentityIndex()
+        self._created: dict[Type[Base], set[str]] = defaultdict(set)
+        self._deleted: dict[Type[Base], set[str]] = defaultdict(set)
+        self._gid_numbers: dict[str, Optional[int]] = {}
+        self._created_gid_numbers: set[int] = set()
+        self._deleted_gid_numbers: set[int] = set()
+        self._window: list[Record] = []
+
+    def submit(self, record: Record) -> None:
+        self._window.append(record)
+        if len(self._window) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._window:
+            return
+
+        self.index.clear()
+        self.index.prefetch(self.session, self._window)
+        self.index.prefetch_groups_by_gid(
+            self.session,
+            {
+                gid_number
+                for record in self._window
+                if record.model is User and (gid_number := _gid_number(record))
+            },
+        )
+
+        for (_, method), batch in groupby(self._window, key=batch_key):
+            batch = list(batch)
+            bulk = not isinstance(method, OperationType)
+            self.plan.estimated_statements += 1 if bulk else len(batch)
+            for record in batch:
+                self._plan(record)
+
+        self._window = []
+
+    def _exists(self, model: Type[Base], name: Optional[str]) -> bool:
+        if not name or name in self._deleted[model]:
+            return False
+        return name in self._created[model] or self.index.get(model, name) is not None
+
+    def _require_group(self, name: Optional[str]) -> None:
+        if name and not self._exists(Group, name):
+            self.plan.missing_groups.add(name)
+
+    def _require_primary_group(self, gid_number: Optional[int]) -> None:
+        if not gid_number or gid_number in self._created_gid_numbers:
+            return
+        if gid_number in self._deleted_gid_numbers or not self.index.get_group_by_gid(gid_number):
+            self.plan.missing_groups.add(str(gid_number))
+
+    def _set_exists(self, model: Type[Base], name: str, exists: bool) -> None:
+        (self._created if exists else self._deleted)[model].add(name)
+        (self._deleted if exists else self._created)[model].discard(name)
+
+    def _group_gid_number(self, name: str) -> Optional[int]:
+        if name in self._gid_numbers:
+            return self._gid_numbers[name]
+        return getattr(self.index.get(Group, name), "gid_number", None)
+
+    def _set_gid_number(self, name: str, gid_number: Optional[int]) -> None:
+        """Track the gid number of a group created, updated or deleted earlier in the plan."""
+        if (old := self._group_gid_number(name)) is not None:
+            self._deleted_gid_numbers.add(old)
+            self._created_gid_numbers.discard(old)
+        if gid_number is not None:
+            self._created_gid_numbers.add(gid_number)
+            self._deleted_gid_numbers.discard(gid_number)
+        self._gid_numbers[name] = gid_number
+
+    def _plan(self, record: Record) -> None:
+        self.plan.operations[record.op] += 1
+        model, name, attributes = record.model, record.identifier, record.attributes
+
+        match record.op:
+            case OperationType.CREATE if model is User:
+                self._set_exists(model, name, True)
+                self._require_primary_group(_gid_number(record))
+
+            case OperationType.CREATE:
+                self._set_exists(model, name, True)
+                self._set_gid_number(name, _gid_number(record))
+                self._require_group(attributes.get("parentGroup"))
+
+            case OperationType.UPDATE:
+                if self._is_noop_update(record):
+                    self.plan.noop_updates += 1
+                else:
+                    self._plan_update(record)
+
+            case OperationType.DELETE:
+                self._set_exists(model, name, False)
+                if model is Group:
+                    self._set_gid_number(name, None)
+
+            case OperationType.MOVE if model is User:
+                self._require_group(attributes.get("ou"))
+
+            case OperationType.MOVE:
+                self._require_group(attributes.get("parentGroup"))
+                self._require_group(attributes.get("newParentGroup"))
+
+    def _plan_update(self, record: Record) -> None:
+        model, name = record.model, record.identifier
+        if (new_name := record.attributes.get(_IDENTIFIER_ATTRIBUTES[model], name)) != name:
+            self._set_exists(model, name, False)
+            self._set_exists(model, new_name, True)
+
+        if model is User:
+            self._require_primary_group(_gid_number(record))
+        else:
+            gid_number = _gid_number(record) or self._group_gid_number(name)
+            self._set_gid_number(name, None)
+            self._set_gid_number(new_name, gid_number)
+
+    def _is_noop_update(self, record: Record) -> bool:
+        if not self._exists(record.model, record.identifier):
+            return True
+
+        # Entries created earlier in the plan are not loaded to compare with
+        if (obj := self.index.get(record.model, record.identifier)) is None:
+            return False
+
+        return is_noop_update(obj, record)
+
+
+def _gid_number(record: Record) -> Optional[int]:
+    gid_number = record.attributes.get("gidNumber")
+    return int(gid_number) if gid_number else None
+
+
+def _read_records(ldif_files: Sequence[str | Path]) -> Iterator[Record]:
+    for ldif_file in ldif_files:
+        with open(ldif_file, "rt") as f:
+            yield from StreamParser(f, ignored_attr_types=LDIF_PARSER_IGNORED_ATTRIBUTES)
+
+
+def plan_ldif(ldif_files: Sequence[str | Path], engine: Engine, reorder: bool = False) -> Plan:
+    """Plan the changes of LDIF files, in order, against a snapshot of the database.
+
+    The plan is computed in a transaction that is always rolled back. On
+    PostgreSQL, the transaction is read-only and uses a repeatable read
+    snapshot. With `reorder`, the records are planned in dependency order,
+    as applied by `apply_ldif` with `reorder`.
+    """
+    records: Iterable[Record] = _read_records(ldif_files)
+    if reorder:
+        records = DependencyScheduler(records)
+
+    with Session(engine) as session:
+        options = {}
+        if engine.dialect.name == "postgresql":
+            options = {"isolation_level": "REPEATABLE READ", "postgresql_readonly": True}
+        connection = session.connection(execution_options=options)
+
+        planner = Planner(session)
+
+        def count_statement(*args: Any) -> None:
+            planner.plan.estimated_statements += 1
+
+        event.listen(connection, "before_cursor_execute", count_statement)
+        try:
+            for record in records:
+                planner.submit(record)
+
+            planner.flush()
+        finally:
+            event.remove(connection, "before_cursor_execute", count_statement)
+            session.rollback()
+
+    return planner.plan
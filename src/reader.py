@@ -0,0 +1,155 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+import mmap
+import os
+import re
+from base64 import b64decode
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+from ldif import LDIFParser, is_dn
+
+# The empty lines separating two LDIF records, starting with the line break ending a record.
+# Like in LDIFParser, a line holding a single space after an empty line is folded into it.
+_SEPARATOR = re.compile(rb"\n(?:\r?\n(?: (?:\r?\n|\Z))*)+")
+
+_VERSION = re.compile(rb"version:\s*(\d+)[ \t]*(?:\r?\n|$)")
+
+Buffer = bytes | mmap.mmap
+
+
+def record_boundaries(buf: Buffer, start: int = 0, end: Optional[int] = None) -> Iterator[range]:
+    """Find the byte ranges of the LDIF records of a buffer, e.g. a mapped file.
+
+    Records are separated by empty lines. Folded lines start with a space, and
+    comments with a `#`, so neither of them separates records.
+    """
+    end = len(buf) if end is None else end
+    for separator in _SEPARATOR.finditer(buf, start, end):
+        stop = separator.start()
+        if buf[stop - 1 : stop] == b"\r":
+            stop -= 1
+        if stop > start:
+            yield range(start, stop)
+        start = separator.end()
+
+    if start < end:
+        yield range(start, end)
+
+
+def split_ranges(buf: Buffer, parts: int) -> list[range]:
+    """Split a buffer into at most `parts` byte ranges of about the same size.
+
+    The ranges are aligned on record boundaries, so that each of them can be
+    parsed on its own, e.g. by `MappedLDIFParser.parse_range`.
+    """
+    bounds = [0]
+    for part in range(1, parts):
+        target = max(len(buf) * part // parts, bounds[-1])
+        if (separator := _SEPARATOR.search(buf, max(target - 1, 0))) is None:
+            break
+        if separator.end() > bounds[-1]:
+            bounds.append(separator.end())
+
+    bounds.append(len(buf))
+    return [range(start, stop) for start, stop in zip(bounds, bounds[1:]) if stop > start]
+
+
+def _value(value: bytes) -> Optional[bytes]:
+    # The value following the colon of an attribute type, as in LDIFParser
+    match value[:1]:
+        case b" ":
+            return value.lstrip()
+        case b":":
+            return b64decode(value[1:])
+        case b"<":
+            # Values fetched from a URL are not supported, like in LDIFParser by default
+            return None
+        case _:
+            return value
+
+
+def parse_record(
+    data: bytes, ignored_attr_types: Iterable[str] = ()
+) -> Optional[tuple[str, dict[str, list[Optional[bytes]]]]]:
+    """Parse the bytes of one LDIF record into its DN and its entry.
+
+    The entry maps each attribute type to its values, as bytes, like the
+    entries handed over by `LDIFParser`. Attribute types are matched against
+    `ignored_attr_types` in lower case. Returns None if the record only has
+    comments.
+    """
+    dn: Optional[str] = None
+    entry: dict[str, list[Optional[bytes]]] = {}
+
+    # The lines of the whole record are unfolded and split at once
+    for line in data.replace(b"\r\n", b"\n").replace(b"\n ", b"").split(b"\n"):
+        if not line or line.startswith(b"#"):
+            continue
+
+        key, colon, value = line.partition(b":")
+        if not colon and line != b"-":
+            raise ValueError(f"no value-spec in {line.decode('utf-8')!r}")
+
+        attr_type = key.decode("utf-8")
+        attr_value = _value(value) if colon else None
+        if dn is None:
+            dn = _dn(attr_type, attr_value)
+        elif attr_type.lower() not in ignored_attr_types:
+            try:
+                entry[attr_type].append(attr_value)
+            except KeyError:
+                entry[attr_type] = [attr_value]
+
+    return None if dn is None else (dn, entry)
+
+
+def _dn(attr_type: str, value: Optional[bytes]) -> str:
+    if attr_type != "dn":
+        raise ValueError(f'First line of record does not start with "dn:": {attr_type!r}')
+
+    dn = (value or b"").decode("utf-8")
+    if not is_dn(dn):
+        raise ValueError(f"Not a valid string-representation for dn: {dn!r}")
+    return dn
+
+
+class MappedLDIFParser(LDIFParser):
+    """Parse an LDIF file mapped in memory instead of reading it line by line.
+
+    The record boundaries are found with a byte-level scan of the mapped
+    file, and each record is parsed from its bytes: the lines of a record
+    are unfolded and split at once, and the values are handed to `handle`
+    as bytes, without decoding the lines. Errors are reported with the line
+    of the record they are found in.
+
+    The input file must be a regular file opened in binary mode.
+    """
+
+    _input_file: BinaryIO
+
+    def parse_entry_records(self) -> None:
+        self.parse_range(0)
+
+    def parse_range(self, start: int, end: Optional[int] = None) -> None:
+        """Parse the records of a byte range of the file, aligned on record boundaries."""
+        fileno = self._input_file.fileno()
+        if not os.fstat(fileno).st_size:
+            return
+
+        with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as buf:
+            for boundary in record_boundaries(buf, start, end):
+                data = buf[boundary.start : boundary.stop]
+                if not (start or self.records_read) and (version := _VERSION.match(data)):
+                    self.version = int(version.group(1))
+                    data = data[version.end() :]
+
+                try:
+                    parsed = parse_record(data, self._ignored_attr_types)
+                except ValueError as e:
+                    line = buf[: boundary.start].count(b"\n") + 1
+                    raise ValueError(f"Line {line}: {e}") from e
+
+                if parsed is not None:
+                    self.handle(*parsed)
+                    self.records_read += 1
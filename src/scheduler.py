@@ -0,0 +1,226 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from parser import Record
+from typing import Any, Hashable, Iterable, Iterator
+
+from constants import OperationType
+from database import User
+from exceptions import CircularDependencyError
+from executor import batch_key
+
+# A user, a group, a uid or gid number, a group membership or the group hierarchy. A uid or
+# gid number of None stands for any number, e.g. the unknown number changed by an update.
+Key = tuple[Hashable, ...]
+
+_HIERARCHY: Key = ("hierarchy",)
+
+
+def _values(value: Any) -> list[str]:
+    values = value if isinstance(value, list) else [value]
+    return [str(v) for v in values if v is not None and v != ""]
+
+
+@dataclass
+class Access:
+    """The keys read and written by a record, and the keys it creates or removes."""
+
+    reads: set[Key] = field(default_factory=set)
+    writes: set[Key] = field(default_factory=set)
+    creates: set[Key] = field(default_factory=set)
+    removes: set[Key] = field(default_factory=set)
+
+    def read(self, *key: Hashable) -> None:
+        if key[-1]:
+            self.reads.add(key)
+
+    def write(self, *key: Hashable) -> None:
+        self.writes.add(key)
+
+    def create(self, *key: Hashable) -> None:
+        self.writes.add(key)
+        self.creates.add(key)
+
+    def remove(self, *key: Hashable) -> None:
+        self.writes.add(key)
+        self.removes.add(key)
+
+    def number(self, family: str, value: Any, create: bool = False) -> None:
+        """Access a uid or gid number, which conflicts with the updates of any number."""
+        for number in _values(value):
+            if create:
+                self.create(family, number)
+            else:
+                self.read(family, number)
+            self.reads.add((family, None))
+
+
+def _user_access(record: Record, access: Access) -> None:
+    name, attributes = record.identifier, record.attributes
+    match record.op:
+        case OperationType.CREATE:
+            access.create("user", name)
+            access.number("uid", attributes.get("uidNumber"), create=True)
+            access.number("gid", attributes.get("gidNumber"))
+        case OperationType.UPDATE:
+            access.write("user", name)
+            if (new_name := attributes.get("cn")) and new_name != name:
+                access.write("user", new_name)
+            if attributes.get("uidNumber"):
+                access.write("uid", None)
+            access.number("gid", attributes.get("gidNumber"))
+        case OperationType.MOVE:
+            access.write("user", name)
+            access.read("group", attributes.get("ou"))
+        case OperationType.DELETE:
+            access.remove("user", name)
+            access.write("uid", None)
+
+
+def _group_access(record: Record, access: Access) -> None:
+    name, attributes = record.identifier, record.attributes
+    match record.op:
+        case OperationType.CREATE:
+            access.create("group", name)
+            access.number("gid", attributes.get("gidNumber"), create=True)
+            if parent_group := attributes.get("parentGroup"):
+                access.read("group", parent_group)
+                access.read(*_HIERARCHY)
+        case OperationType.UPDATE:
+            access.write("group", name)
+            if (new_name := attributes.get("ou")) and new_name != name:
+                access.write("group", new_name)
+            if attributes.get("gidNumber"):
+                access.write("gid", None)
+        case OperationType.MOVE:
+            access.write("group", name)
+            access.read("group", attributes.get("parentGroup"))
+            access.read("group", attributes.get("newParentGroup"))
+            access.write(*_HIERARCHY)
+        case OperationType.DELETE:
+            access.remove("group", name)
+            access.write("gid", None)
+            access.write(*_HIERARCHY)
+        case OperationType.ATTACH | OperationType.DETACH:
+            access.read("group", name)
+            for uid_number in _values(attributes.get("memberUid")):
+                access.number("uid", uid_number)
+                access.write("member", name, uid_number)
+
+
+def record_access(record: Record) -> Access:
+    access = Access()
+    (_user_access if record.model is User else _group_access)(record, access)
+    access.reads -= access.writes
+    return access
+
+
+def _hoisted(key: Key, indexes: list[int], accesses: list[Access]) -> list[int]:
+    """Move the accesses to a key before its creation right after it, unless it is removed first."""
+    for position, i in enumerate(indexes):
+        if key in accesses[i].removes:
+            break
+        if key in accesses[i].creates:
+            return [i, *indexes[:position], *indexes[position + 1 :]]
+    return indexes
+
+
+class DependencyScheduler:
+    """Order records by their dependencies instead of their position in the LDIF file.
+
+    Each record reads and writes keys: users, groups, uid and gid numbers,
+    group memberships and the group hierarchy. Records accessing the same
+    key keep their file order when one of them writes it. The records
+    accessing a key that the LDIF file only creates further down are moved
+    after that creation instead, e.g. a user after the creation of its
+    primary group, an attach after the creation of its members, or a group
+    move after the creation of its new parent group.
+
+    The records are emitted in topological waves. The records of a wave do
+    not depend on each other, and are ordered so that the records applied by
+    the same batch are next to each other. If the dependencies have a cycle,
+    a `CircularDependencyError` naming the records of the cycle is raised
+    before any record is emitted.
+    """
+
+    def __init__(self, records: Iterable[Record] = ()) -> None:
+        self.records: list[Record] = list(records)
+
+    def __iter__(self) -> Iterator[Record]:
+        for wave in self.waves():
+            yield from wave
+
+    def dependencies(self) -> list[set[int]]:
+        """Return the indexes of the records each record depends on."""
+        accesses = [record_access(record) for record in self.records]
+        accessors: dict[Key, list[int]] = defaultdict(list)
+        for i, access in enumerate(accesses):
+            for key in access.reads | access.writes:
+                accessors[key].append(i)
+
+        dependencies: list[set[int]] = [set() for _ in accesses]
+        for key, indexes in accessors.items():
+            writer, readers = None, []
+            for i in _hoisted(key, indexes, accesses):
+                if writer is not None:
+                    dependencies[i].add(writer)
+                if key in accesses[i].writes:
+                    dependencies[i].update(readers)
+                    writer, readers = i, []
+                else:
+                    readers.append(i)
+
+        return dependencies
+
+    def waves(self) -> Iterator[list[Record]]:
+        dependencies = self.dependencies()
+        dependents: list[list[int]] = [[] for _ in dependencies]
+        for i, indexes in enumerate(dependencies):
+            for j in indexes:
+                dependents[j].append(i)
+
+        remaining = [len(indexes) for indexes in dependencies]
+        waves, wave = [], [i for i, count in enumerate(remaining) if not count]
+        while wave:
+            waves.append(wave)
+            wave = sorted(j for i in wave for j in dependents[i] if not _decrement(remaining, j))
+
+        if sum(map(len, waves)) < len(self.records):
+            cycle = _cycle(dependencies, {i for i, count in enumerate(remaining) if count})
+            raise CircularDependencyError(
+                "The LDIF records have circular dependencies, each record depending on the "
+                "next one: "
+                + " -> ".join(
+                    f"{self.records[i].op.value} {self.records[i].identifier}" for i in cycle
+                )
+            )
+
+        for wave in waves:
+            yield self._batched(wave)
+
+    def _batched(self, wave: list[int]) -> list[Record]:
+        batches: dict[Hashable, list[Record]] = defaultdict(list)
+        for i in wave:
+            batches[batch_key(self.records[i])].append(self.records[i])
+        return [record for batch in batches.values() for record in batch]
+
+
+def _cycle(dependencies: list[set[int]], unresolved: set[int]) -> list[int]:
+    """Find a cycle of records, each depending on the next one, among the unresolved records.
+
+    An unresolved record always depends on another unresolved record, so following
+    these dependencies from any of them ends up in a cycle.
+    """
+    path: dict[int, int] = {}
+    i = min(unresolved)
+    while i not in path:
+        path[i] = len(path)
+        i = min(dependencies[i] & unresolved)
+    return [*list(path)[path[i] :], i]
+
+
+def _decrement(counts: list[int], i: int) -> int:
+    counts[i] -= 1
+    return counts[i]
@@ -3,18 +3,23 @@
 
 import json
 import logging
-from dataclasses import asdict, dataclass, field
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields
 from datetime import datetime, timezone
-from typing import Dict, Optional
+from queue import Queue
+from threading import Lock, Thread
+from typing import Dict, Iterator, Optional
 
 # Taken from https://github.com/lucabello/owasp-logger
 
 NESTED_JSON_KEY = "owasp_event"
 
+logger = logging.getLogger(__name__)
+
 
 @dataclass
 class OWASPLogEvent:
-    datetime: str  # ISO8601 timestamp with timezone
+    datetime: Optional[str]  # ISO8601 timestamp with timezone, set by the writer if batched
     appid: str
     event: str  # The type of event being logged (i.e. sys_crash)
     level: str  # Log level reflecting the importance of the event
@@ -26,19 +31,133 @@ class OWASPLogEvent:
         return json.dumps(self.to_dict(), ensure_ascii=False)
 
     def to_dict(self) -> Dict:
-        log_event = dict(
-            asdict(self),
+        log_event = {
+            "datetime": self.datetime,
+            "appid": self.appid,
+            "event": self.event,
+            "level": self.level,
+            "description": self.description,
+            "type": self.type,
             **self.labels,
-        )
-        log_event.pop("labels", None)
+        }
         return {k: v for k, v in log_event.items() if v is not None}
 
 
+_STOP = object()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).astimezone().isoformat()
+
+
+# The fields of every event, the other keys of a serialized event are its labels
+_EVENT_FIELDS = frozenset(f.name for f in fields(OWASPLogEvent) if f.name != "labels")
+
+
+class _BatchedSink:
+    """Hand the events over to a background writer thread in batches.
+
+    The events are collected into batches of `batch_size` consecutive events,
+    which the writer serializes and writes. At most `queue_size` events wait
+    for the writer, so producers block rather than buffering an unbounded
+    number of events when the writer falls behind. The events of a batch are
+    timestamped once, when the writer takes the batch. In summarized mode,
+    the events of a batch sharing an event type, e.g.
+    `authz_admin:user_created`, are merged into one event listing their
+    identifiers, in the order the event types first occur in the batch. The
+    other labels of the merged events, e.g. the `uids` of group attachments,
+    are listed in the same order as the identifiers.
+
+    A batch failing to be written is logged and dropped, so that the writer
+    keeps consuming the queue and producers never wait on a dead writer.
+    """
+
+    def __init__(
+        self, owasp_logger: "OWASPLogger", summarize: bool, batch_size: int, queue_size: int
+    ):
+        self.owasp_logger = owasp_logger
+        self.summarize = summarize
+        self.batch_size = batch_size
+        self._batch: list[tuple[int, Dict]] = []
+        self._lock = Lock()
+        self._queue: Queue = Queue(maxsize=max(1, queue_size // batch_size))
+        self._thread = Thread(target=self._run, name="owasp-log-writer", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._batch:
+                self._queue.put(self._batch)
+            self._batch = []
+            self._queue.put(_STOP)
+        self._thread.join()
+
+    def put(self, level: int, log_event: Dict) -> None:
+        with self._lock:
+            self._batch.append((level, log_event))
+            if len(self._batch) >= self.batch_size:
+                self._queue.put(self._batch)
+                self._batch = []
+
+    def _run(self) -> None:
+        while (batch := self._queue.get()) is not _STOP:
+            try:
+                self._write(batch)
+            except Exception:
+                logger.exception("Failed to write %d security events", len(batch))
+
+    def _write(self, batch: list[tuple[int, Dict]]) -> None:
+        now = _now()
+        if not self.summarize:
+            for level, log_event in batch:
+                self.owasp_logger.emit(level, {"datetime": now, **log_event})
+            return
+
+        groups: dict[str, list[tuple[int, Dict]]] = {}
+        for level, log_event in batch:
+            event_type = log_event["event"].rpartition(":")[0]
+            groups.setdefault(event_type, []).append((level, log_event))
+
+        for event_type, group in groups.items():
+            if len(group) == 1:
+                level, log_event = group[0]
+                self.owasp_logger.emit(level, {"datetime": now, **log_event})
+                continue
+
+            level = max(level for level, _ in group)
+            first = group[0][1]
+            identifiers = [e["event"].rpartition(":")[2] for _, e in group]
+            self.owasp_logger.emit(
+                level,
+                {
+                    "datetime": now,
+                    "appid": first["appid"],
+                    "event": event_type,
+                    "level": logging.getLevelName(level),
+                    "description": f"{len(group)} `{event_type}` events",
+                    "type": first["type"],
+                    "count": len(group),
+                    "identifiers": ",".join(identifiers),
+                    **_summarize_labels([e for _, e in group], identifiers),
+                },
+            )
+
+
+def _summarize_labels(log_events: list[Dict], identifiers: list[str]) -> Dict:
+    """List the values of each label of the events, skipping the labels repeating identifiers."""
+    keys = dict.fromkeys(k for e in log_events for k in e if k not in _EVENT_FIELDS)
+    labels = {key: [e.get(key) for e in log_events] for key in keys}
+    return {key: values for key, values in labels.items() if values != identifiers}
+
+
 class OWASPLogger:
     def __init__(self, appid: str, logger: Optional[logging.Logger] = None):
         """OWASP-compliant logger."""
         self.appid = appid
         self.logger = logger or logging.getLogger(__name__)
+        self._sink: Optional[_BatchedSink] = None
 
     def __getattr__(self, item):
         """Delegate standard logging functions to the internal logger."""
@@ -46,12 +165,48 @@ class OWASPLogger:
 
     def log_event(self, event: str, level: int, description: str, **labels):
         """Emit an OWASP-compliant log."""
+        if not self.logger.isEnabledFor(level):
+            return
+
+        sink = self._sink
         log = OWASPLogEvent(
-            datetime=datetime.now(timezone.utc).astimezone().isoformat(),
+            datetime=None if sink else _now(),
             appid=self.appid,
             event=event,
             level=logging.getLevelName(level),
             description=description,
             labels=labels,
         )
-        self.logger.log(level, log.to_json(), extra={NESTED_JSON_KEY: log.to_dict()})
+        if sink:
+            sink.put(level, log.to_dict())
+        else:
+            self.emit(level, log.to_dict())
+
+    def emit(self, level: int, log_event: Dict) -> None:
+        """Write a serialized OWASP event."""
+        self.logger.log(
+            level,
+            json.dumps(log_event, ensure_ascii=False),
+            extra={NESTED_JSON_KEY: log_event},
+        )
+
+    @contextmanager
+    def batched(
+        self, summarize: bool = False, batch_size: int = 1000, queue_size: int = 10000
+    ) -> Iterator[None]:
+        """Queue the events and write them from a background thread in batches.
+
+        The queued events are all written when the context exits. Nested
+        contexts reuse the outer one.
+        """
+        if self._sink:
+            yield
+            return
+
+        self._sink = _BatchedSink(self, summarize, batch_size, queue_size)
+        self._sink.start()
+        try:
+            yield
+        finally:
+            sink, self._sink = self._sink, None
+            sink.stop()
@@ -0,0 +1,66 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+from functools import cache
+from typing import Type
+
+from sqlalchemy import Select, String, Update, bindparam, select, update
+
+from database import (
+    Base,
+    Group,
+    User,
+    group_set_add,
+    group_set_contains,
+    group_set_remove,
+    param_in,
+)
+
+# The statements of the hot lookups and updates are built once, per model or per
+# dialect, and executed with bound parameters instead of being built per record
+
+
+@cache
+def select_by_name(model: Type[Base]) -> Select:
+    """Select a user or a group by the `name` parameter."""
+    return select(model).where(model.name == bindparam("name"))
+
+
+@cache
+def select_by_names(model: Type[Base], dialect_name: str) -> Select:
+    """Select the users or the groups named in the `names` parameter."""
+    return select(model).where(param_in(dialect_name, model.name, "names"))
+
+
+@cache
+def select_groups_by_gid_numbers(dialect_name: str) -> Select:
+    """Select the groups whose gid number is in the `gid_numbers` parameter."""
+    return select(Group).where(param_in(dialect_name, Group.gid_number, "gid_numbers"))
+
+
+@cache
+def attach_members(dialect_name: str) -> Update:
+    """Add the `gid_number` parameter to the groups of the users in `uid_numbers`."""
+    gid_number = bindparam("gid_number", type_=String)
+    return (
+        update(User)
+        .where(
+            param_in(dialect_name, User.uid_number, "uid_numbers"),
+            ~group_set_contains(User.other_groups, gid_number),
+        )
+        .values(other_groups=group_set_add(User.other_groups, gid_number))
+    )
+
+
+@cache
+def detach_members(dialect_name: str) -> Update:
+    """Remove the `gid_number` parameter from the groups of the users in `uid_numbers`."""
+    gid_number = bindparam("gid_number", type_=String)
+    return (
+        update(User)
+        .where(
+            param_in(dialect_name, User.uid_number, "uid_numbers"),
+            group_set_contains(User.other_groups, gid_number),
+        )
+        .values(other_groups=group_set_remove(dialect_name, User.other_groups, gid_number))
+    )
@@ -0,0 +1,260 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+from collections import defaultdict
+from parser import Record
+from typing import Any, Iterator, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from constants import (
+    DATABASE_FETCH_SIZE,
+    LDIF_BATCH_SIZE,
+    LDIF_TO_USER_MODEL_MAPPINGS,
+    USER_IDENTIFIER_ATTRIBUTE,
+    OperationType,
+)
+from database import Group, IncludeGroup, User, group_set_contains, values_in
+from exceptions import InvalidAttributeValueError
+from fingerprint import canonical, element_fingerprint, fingerprint, set_fingerprint
+
+# The user columns compared by the sync mode, keyed by LDIF attribute
+_USER_ATTRIBUTES = {
+    ldif_attr: attr
+    for ldif_attr, attr in LDIF_TO_USER_MODEL_MAPPINGS.items()
+    if ldif_attr != USER_IDENTIFIER_ATTRIBUTE and hasattr(User, attr)
+}
+
+_REQUIRED_USER_ATTRIBUTES = ("uidNumber", "gidNumber")
+
+_USER_COLUMNS = [getattr(User, attr) for attr in _USER_ATTRIBUTES.values()]
+
+
+def _user_state(row: Any) -> dict[str, Any]:
+    state = {attr: getattr(row, attr) for attr in _USER_ATTRIBUTES.values()}
+    state["custom_attributes"] = row.custom_attributes or {}
+    return state
+
+
+def _desired_user_state(record: Record) -> dict[str, Any]:
+    state = {
+        attr: record.attributes.get(ldif_attr) for ldif_attr, attr in _USER_ATTRIBUTES.items()
+    }
+    state["custom_attributes"] = record.custom_attributes
+    return state
+
+
+class Snapshot:
+    """The users, groups and group hierarchy of the database, loaded in memory.
+
+    Users are streamed from the database and only their fingerprint is kept.
+    The group memberships, stored in the `othergroups` column of the users,
+    are reduced to a fingerprint of the member uid numbers per group.
+    """
+
+    def __init__(self, session: Session) -> None:
+        self.users: dict[str, bytes] = {}
+        self.members: dict[int, int] = defaultdict(int)
+
+        stmt = select(
+            User.name, *_USER_COLUMNS, User.custom_attributes, User.other_groups
+        ).execution_options(yield_per=DATABASE_FETCH_SIZE)
+        for row in session.execute(stmt):
+            self.users[row.name] = fingerprint(_user_state(row))
+            uid = element_fingerprint(row.uid_number)
+            for gid_number in row.other_groups or ():
+                if gid_number.isdigit():
+                    self.members[int(gid_number)] ^= uid
+
+        self.groups: dict[str, int] = dict(
+            session.execute(select(Group.name, Group.gid_number)).all()
+        )
+
+        names = {gid_number: name for name, gid_number in self.groups.items()}
+        self.parents: dict[str, list[str]] = defaultdict(list)
+        for parent, child in session.execute(
+            select(IncludeGroup.parent_group_id, IncludeGroup.child_group_id).order_by(
+                IncludeGroup.parent_group_id
+            )
+        ):
+            if parent in names and child in names:
+                self.parents[names[child]].append(names[parent])
+
+
+class Synchronizer:
+    """Compute the records turning the database into a desired state.
+
+    The desired state lists every user and group as content records, i.e.
+    LDIF entries without a `changetype`. Group memberships are the
+    `memberUid` values of the groups or additional `memberUid` modify
+    records, and additional parent groups are group moves, as written by the
+    LDIF export. Each record is compared with the snapshot of the database
+    taken beforehand:
+
+    - missing users and groups are created
+    - users whose fingerprint differs are updated, with only the changed
+      attributes, and attributes absent from the desired state are cleared
+    - groups with a different gid number are updated
+    - groups are moved to the desired parent groups they are not in yet,
+      replacing a parent group absent from the desired state if any
+    - group members are attached and detached, for the groups whose members
+      fingerprint differs
+    - users and groups absent from the desired state are deleted
+
+    Only the users that differ and the desired group memberships are held in
+    memory, so an unchanged desired state costs a few scans and no writes.
+    """
+
+    def __init__(self, session: Session, batch_size: int = LDIF_BATCH_SIZE) -> None:
+        self.session = session
+        self.batch_size = batch_size
+        self.snapshot = Snapshot(session)
+        self._group_records: list[Record] = []
+        self._user_creates: list[Record] = []
+        self._user_updates: dict[str, dict[str, Any]] = {}
+        self._gid_numbers: dict[str, Optional[int]] = {}
+        self._parents: dict[str, list[str]] = defaultdict(list)
+        self._members: dict[str, set[int]] = {}
+
+    def add(self, record: Record) -> None:
+        match record.op:
+            case OperationType.CREATE if record.model is User:
+                self._add_user(record)
+            case OperationType.CREATE:
+                self._add_group(record)
+            case OperationType.MOVE if record.model is Group:
+                self._parents[record.identifier].append(record.attributes["newParentGroup"])
+            case OperationType.ATTACH if record.identifier in self._members:
+                self._members[record.identifier].update(self._member_uids(record))
+            case _:
+                raise InvalidAttributeValueError(
+                    f"The sync mode does not support the {record.op.value} of {record.identifier}"
+                )
+
+    @staticmethod
+    def _member_uids(record: Record) -> set[int]:
+        if isinstance(member_uid := record.attributes.pop("memberUid", None) or [], str):
+            member_uid = [member_uid]
+        return {int(uid) for uid in member_uid}
+
+    def _add_user(self, record: Record) -> None:
+        if missing := [a for a in _REQUIRED_USER_ATTRIBUTES if not record.attributes.get(a)]:
+            raise InvalidAttributeValueError(
+                f"Missing {', '.join(missing)} for user: {record.identifier}"
+            )
+
+        state = _desired_user_state(record)
+        if (current := self.snapshot.users.pop(record.identifier, None)) is None:
+            self._user_creates.append(record)
+        elif current != fingerprint(state):
+            self._user_updates[record.identifier] = state
+
+    def _add_group(self, record: Record) -> None:
+        name, attributes = record.identifier, record.attributes
+        if not (gid_number := attributes.get("gidNumber")):
+            raise InvalidAttributeValueError(f"Missing gidNumber for group: {name}")
+
+        self._members[name] = self._member_uids(record)
+        current_gid_number = self._gid_numbers[name] = self.snapshot.groups.pop(name, None)
+        parent = attributes.get("parentGroup")
+
+        if current_gid_number is None:
+            # The group is created under the parent group of its DN
+            self._group_records.append(record)
+            self.snapshot.parents[name] = [parent] if parent else []
+        elif str(current_gid_number) != str(gid_number):
+            self._group_records.append(
+                Record(
+                    identifier=name,
+                    model=Group,
+                    op=OperationType.UPDATE,
+                    attributes={"gidNumber": gid_number},
+                )
+            )
+
+        if parent:
+            self._parents[name].append(parent)
+
+    def records(self) -> Iterator[Record]:
+        """Yield the records to apply, groups first and deletions last."""
+        yield from self._group_records
+        yield from self._move_records()
+        yield from self._user_creates
+        yield from self._user_update_records()
+        yield from self._membership_records()
+
+        for name in self.snapshot.users:
+            yield Record(identifier=name, model=User, op=OperationType.DELETE)
+        for name in self.snapshot.groups:
+            yield Record(identifier=name, model=Group, op=OperationType.DELETE)
+
+    def _move_records(self) -> Iterator[Record]:
+        for name, parents in self._parents.items():
+            current = self.snapshot.parents.get(name, [])
+            stale = [p for p in current if p not in parents]
+            for parent in dict.fromkeys(parents):
+                if parent in current:
+                    continue
+
+                yield Record(
+                    identifier=name,
+                    model=Group,
+                    op=OperationType.MOVE,
+                    attributes={
+                        "parentGroup": stale.pop(0) if stale else "",
+                        "newParentGroup": parent,
+                    },
+                )
+
+    def _user_update_records(self) -> Iterator[Record]:
+        names = list(self._user_updates)
+        for i in range(0, len(names), self.batch_size):
+            stmt = select(User.name, *_USER_COLUMNS, User.custom_attributes).where(
+                values_in(self.session, User.name, names[i : i + self.batch_size])
+            )
+            for row in self.session.execute(stmt).all():
+                yield self._user_update_record(row.name, _user_state(row))
+
+    def _user_update_record(self, name: str, current: dict[str, Any]) -> Record:
+        desired = self._user_updates[name]
+        record = Record(identifier=name, model=User, op=OperationType.UPDATE)
+        for ldif_attr, attr in _USER_ATTRIBUTES.items():
+            if canonical(current[attr] or "") != canonical(desired[attr] or ""):
+                record.attributes[ldif_attr] = desired[attr] or ""
+
+        current_custom = canonical(current["custom_attributes"])
+        desired_custom = canonical(desired["custom_attributes"])
+        for key in sorted(current_custom.keys() | desired_custom.keys()):
+            if current_custom.get(key) != desired_custom.get(key):
+                record.custom_attributes[key] = desired["custom_attributes"].get(key) or ""
+
+        return record
+
+    def _membership_records(self) -> Iterator[Record]:
+        for name, members in self._members.items():
+            gid_number = self._gid_numbers[name]
+            if set_fingerprint(members) == self.snapshot.members.get(gid_number, 0):
+                continue
+
+            current: set[int] = set()
+            if gid_number is not None:
+                current = set(
+                    self.session.scalars(
+                        select(User.uid_number).where(
+                            group_set_contains(User.other_groups, str(gid_number))
+                        )
+                    )
+                )
+
+            for op, uid_numbers in (
+                (OperationType.DETACH, current - members),
+                (OperationType.ATTACH, members - current),
+            ):
+                if uid_numbers:
+                    yield Record(
+                        identifier=name,
+                        model=Group,
+                        op=op,
+                        attributes={"memberUid": [str(uid) for uid in sorted(uid_numbers)]},
+                    )
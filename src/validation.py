@@ -0,0 +1,252 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+import mmap
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from io import StringIO
+from itertools import islice
+from parser import Record, process_entry
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional, Sequence, TextIO
+
+from ldif import LDIFParser
+from sqlalchemy import Engine, select
+from sqlalchemy.orm import Session
+
+from constants import (
+    LDIF_PARSER_IGNORED_ATTRIBUTES,
+    PROCESS_POOL_START_METHOD,
+    VALIDATION_CHUNK_SIZE,
+    VALIDATION_MAX_REPORTED_ERRORS,
+    OperationType,
+)
+from database import Group, User
+from exceptions import UtilityError
+from reader import Buffer, record_boundaries
+
+# An entry of an LDIF file, as the line number of its DN and its lines
+Entry = tuple[int, list[str]]
+
+
+@dataclass(frozen=True)
+class Issue:
+    path: str
+    line: int
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.path}:{self.line}: {self.message}"
+
+
+@dataclass
+class ValidationReport:
+    """The errors found in LDIF files before applying them."""
+
+    entries: int = 0
+    issues: list[Issue] = field(default_factory=list)
+
+    @property
+    def is_valid(self) -> bool:
+        return not self.issues
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "entries": self.entries,
+            "errors": len(self.issues),
+            "issues": "\n".join(map(str, self.issues[:VALIDATION_MAX_REPORTED_ERRORS])),
+        }
+
+
+def split_entries(buf: Buffer) -> Iterator[Entry]:
+    """Split an LDIF file, e.g. a mapped one, into the lines of each entry, without parsing them.
+
+    The entries are delimited by `record_boundaries`, and only decoded one at
+    a time. Entries are numbered by the line of their DN.
+    """
+    line, position = 1, 0
+    for entry in record_boundaries(buf):
+        line += buf[position : entry.start].count(b"\n")
+        lines = (buf[entry.start : entry.stop] + b"\n").decode().splitlines(keepends=True)
+        dn = next((i for i, text in enumerate(lines) if text.startswith("dn:")), 0)
+        yield line + dn, lines
+        line, position = line + len(lines) - 1, entry.stop
+
+
+class _EntryParser(LDIFParser):
+    def __init__(self, input_file: TextIO) -> None:
+        super().__init__(input_file, LDIF_PARSER_IGNORED_ATTRIBUTES)
+        self.records: list[Record] = []
+
+    def handle(self, dn: str, entry: dict) -> None:
+        self.records.append(process_entry(dn, entry))
+
+
+def check_syntax(entries: Sequence[Entry]) -> list[tuple[int, Record | str]]:
+    """Parse and process entries, returning the record or the error of each entry."""
+    results: list[tuple[int, Record | str]] = []
+    for line, lines in entries:
+        parser = _EntryParser(StringIO("".join(lines)))
+        try:
+            parser.parse()
+        except (UtilityError, ValueError, KeyError) as e:
+            results.append((line, str(e)))
+        else:
+            results.extend((line, record) for record in parser.records)
+    return results
+
+
+def _chunks(entries: Iterable[Entry], size: int) -> Iterator[list[Entry]]:
+    entries = iter(entries)
+    while chunk := list(islice(entries, size)):
+        yield chunk
+
+
+def _checked_entries(
+    pool: ProcessPoolExecutor, ldif_file: str | Path, chunk_size: int, pending_chunks: int
+) -> Iterator[tuple[int, Record | str]]:
+    """Check the syntax of the entries of an LDIF file in chunks across a process pool.
+
+    The chunks are read from a memory map as the pool checks them, with at
+    most `pending_chunks` chunks submitted ahead, so the memory usage does not
+    depend on the size of the file.
+    """
+    with open(ldif_file, "rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            pending: deque[Future] = deque()
+            for chunk in _chunks(split_entries(buf), chunk_size):
+                pending.append(pool.submit(check_syntax, chunk))
+                if len(pending) > pending_chunks:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+
+def _numbers(value: Any) -> list[int]:
+    values = value if isinstance(value, list) else [value]
+    if not all(str(v).isdigit() for v in values):
+        raise ValueError(f"Invalid number: {value}")
+    return [int(v) for v in values]
+
+
+class ReferenceChecker:
+    """Check the references of records against the keys of the database.
+
+    The names of the users and groups, the uid numbers and the gid numbers
+    are loaded with one query per table. Records are then checked in order,
+    taking into account the entries created, renamed and deleted by the
+    records checked before them.
+    """
+
+    def __init__(self, session: Session) -> None:
+        self.groups: dict[str, int] = dict(
+            session.execute(select(Group.name, Group.gid_number)).all()
+        )
+        self.users: dict[str, int] = dict(
+            session.execute(select(User.name, User.uid_number)).all()
+        )
+        self.gid_numbers = set(self.groups.values())
+        self.uid_numbers = set(self.users.values())
+
+    def check(self, record: Record) -> list[str]:
+        check = self._check_user if record.model is User else self._check_group
+        try:
+            return check(record, record.identifier, record.attributes)
+        except ValueError as e:
+            return [f"{e} for {record.identifier}"]
+
+    def _check_user(self, record: Record, name: str, attributes: dict) -> list[str]:
+        errors = []
+        if record.op in (OperationType.CREATE, OperationType.UPDATE) and (
+            gid_number := attributes.get("gidNumber")
+        ):
+            if _numbers(gid_number)[0] not in self.gid_numbers:
+                errors.append(f"The primary group {gid_number} of user {name} does not exist")
+
+        match record.op:
+            case OperationType.CREATE if name in self.users:
+                errors.append(f"The user {name} already exists")
+            case OperationType.CREATE:
+                self.users[name] = _numbers(attributes.get("uidNumber") or 0)[0]
+                self.uid_numbers.add(self.users[name])
+            case OperationType.UPDATE if (new_name := attributes.get("cn", name)) != name:
+                self.users[new_name] = self.users.pop(name, 0)
+            case OperationType.DELETE:
+                self.users.pop(name, None)
+            case OperationType.MOVE if (group := attributes.get("ou")) not in self.groups:
+                errors.append(f"The group {group} of user {name} does not exist")
+        return errors
+
+    def _check_group(self, record: Record, name: str, attributes: dict) -> list[str]:
+        match record.op:
+            case OperationType.CREATE if name in self.groups:
+                return [f"The group {name} already exists"]
+            case OperationType.CREATE:
+                self.groups[name] = _numbers(attributes.get("gidNumber") or 0)[0]
+                self.gid_numbers.add(self.groups[name])
+                return self._check_parent_group(name, attributes.get("parentGroup"))
+            case OperationType.UPDATE:
+                self._update_group(name, attributes)
+            case OperationType.DELETE:
+                self.gid_numbers.discard(self.groups.pop(name, None))
+            case OperationType.MOVE if name not in self.groups:
+                return [f"The group {name} does not exist"]
+            case OperationType.MOVE:
+                return self._check_parent_group(name, attributes.get("newParentGroup"))
+            case OperationType.ATTACH | OperationType.DETACH:
+                return self._check_members(name, attributes.get("memberUid"))
+        return []
+
+    def _update_group(self, name: str, attributes: dict) -> None:
+        if (gid_number := attributes.get("gidNumber")) is not None:
+            self.groups[name] = _numbers(gid_number)[0]
+            self.gid_numbers.add(self.groups[name])
+        if (new_name := attributes.get("ou", name)) != name:
+            self.groups[new_name] = self.groups.pop(name, 0)
+
+    def _check_parent_group(self, name: str, parent: Optional[str]) -> list[str]:
+        if parent and parent not in self.groups:
+            return [f"The parent group {parent} of group {name} does not exist"]
+        return []
+
+    def _check_members(self, name: str, member_uid: Any) -> list[str]:
+        if missing := [uid for uid in _numbers(member_uid) if uid not in self.uid_numbers]:
+            return [f"The members {', '.join(map(str, missing))} of group {name} do not exist"]
+        return []
+
+
+def validate_ldif(
+    ldif_files: Sequence[str | Path],
+    engine: Engine,
+    max_workers: Optional[int] = None,
+    chunk_size: int = VALIDATION_CHUNK_SIZE,
+) -> ValidationReport:
+    """Validate LDIF files, in order, before applying them.
+
+    The syntax of the entries is checked in chunks across a process pool,
+    streamed from a memory map, with the same processing as the LDIF import. The references of the
+    records are then checked against the keys of the database. Every error
+    is reported with the line of the entry, and nothing is written to the
+    database.
+    """
+    report = ValidationReport()
+    max_workers = max_workers or os.cpu_count() or 1
+    # The validation runs next to the database connections, which must not be forked
+    mp_context = multiprocessing.get_context(PROCESS_POOL_START_METHOD)
+    with (
+        Session(engine) as session,
+        ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as pool,
+    ):
+        checker = ReferenceChecker(session)
+        for ldif_file in ldif_files:
+            for line, result in _checked_entries(pool, ldif_file, chunk_size, max_workers):
+                report.entries += 1
+                messages = [result] if isinstance(result, str) else checker.check(result)
+                report.issues.extend(Issue(str(ldif_file), line, m) for m in messages)
+
+    return report
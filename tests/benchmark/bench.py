@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Measure the throughput of the LDIF parser and of apply-ldif.
+
+Each benchmark runs in a fresh process against a synthetic LDIF file, so the
+peak RSS it reports belongs to that benchmark only. The memory per record is
+the growth of the peak RSS during the benchmark divided by the number of
+records, which for the parse benchmark is the footprint of a parsed record:
+
+- process: the processor chain on in-memory entries, excluding tokenization
+- parse: `Parser.parse` on the LDIF file
+- mapped: `MappedParser.parse` on the LDIF file, memory-mapped
+- sharded: `ShardedParser` on the LDIF file, across a process pool of `--workers`
+- apply: `apply_ldif` on the LDIF file, against an empty database
+
+The apply benchmark uses a temporary SQLite database by default. Pass
+`--database-url` to run it against a PostgreSQL database instead, which is
+emptied and recreated from the test schema.
+
+    tox -e benchmark -- --records 100000 --mix create=4,modify=3,move=1,attach=1,detach=1
+    tox -e benchmark -- --save baseline.json
+    tox -e benchmark -- --compare baseline.json
+    tox -e benchmark -- --benchmark parse --max-bytes-per-record 1500
+"""
+
+import argparse
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from sqlalchemy import Engine, create_engine, event, text
+from synthetic import LdifGenerator, Mix, synthetic_entries
+
+SCHEMA = Path(__file__).parents[1] / "schema.sql"
+TABLES = ("capabilities", "includegroups", "users", "ldapgroups")
+
+Result = dict[str, Any]
+
+
+def _peak_rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _create_schema(engine: Engine) -> None:
+    ddl = SCHEMA.read_text()
+    if engine.dialect.name == "postgresql":
+        ddl = ddl.replace("INTEGER PRIMARY KEY", "SERIAL PRIMARY KEY")
+
+    with engine.begin() as conn:
+        for table in TABLES:
+            conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+        for statement in filter(str.strip, ddl.split(";")):
+            conn.exec_driver_sql(statement)
+
+
+def bench_process(records: int, **kwargs: Any) -> Result:
+    from parser import process_entry
+
+    start = time.perf_counter()
+    for _ in synthetic_entries(records):
+        pass
+    generation = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for dn, entry in synthetic_entries(records):
+        process_entry(dn, entry)
+    elapsed = time.perf_counter() - start - generation
+
+    return {"seconds": elapsed, "statements": 0}
+
+
+def bench_parse(ldif_file: Path, **kwargs: Any) -> Result:
+    from parser import Parser
+
+    from constants import LDIF_PARSER_IGNORED_ATTRIBUTES
+
+    start = time.perf_counter()
+    with open(ldif_file, "rt") as f:
+        Parser(f, ignored_attr_types=LDIF_PARSER_IGNORED_ATTRIBUTES).parse()
+    return {"seconds": time.perf_counter() - start, "statements": 0}
+
+
+def bench_mapped(ldif_file: Path, **kwargs: Any) -> Result:
+    from parser import MappedParser
+
+    from constants import LDIF_PARSER_IGNORED_ATTRIBUTES
+
+    start = time.perf_counter()
+    with open(ldif_file, "rb") as f:
+        MappedParser(f, ignored_attr_types=LDIF_PARSER_IGNORED_ATTRIBUTES).parse()
+    return {"seconds": time.perf_counter() - start, "statements": 0}
+
+
+def bench_sharded(ldif_file: Path, workers: Optional[int] = None, **kwargs: Any) -> Result:
+    from parser import ShardedParser
+
+    from constants import LDIF_PARSER_IGNORED_ATTRIBUTES
+
+    start = time.perf_counter()
+    parser = ShardedParser(
+        ldif_file, ignored_attr_types=LDIF_PARSER_IGNORED_ATTRIBUTES, max_workers=workers
+    )
+    list(parser)
+    return {"seconds": time.perf_counter() - start, "statements": 0}
+
+
+def bench_apply(ldif_file: Path, database_url: str, **kwargs: Any) -> Result:
+    from action import apply_ldif
+
+    engine = create_engine(database_url)
+    _create_schema(engine)
+
+    statements = 0
+
+    def count_statement(*args: Any) -> None:
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine, "before_cursor_execute", count_statement)
+
+    start = time.perf_counter()
+    apply_ldif(ldif_file, engine)
+    elapsed = time.perf_counter() - start
+
+    engine.dispose()
+    return {"seconds": elapsed, "statements": statements}
+
+
+BENCHMARKS: dict[str, Callable[..., Result]] = {
+    "process": bench_process,
+    "parse": bench_parse,
+    "mapped": bench_mapped,
+    "sharded": bench_sharded,
+    "apply": bench_apply,
+}
+
+
+def _run(name: str, records: int, **kwargs: Any) -> Result:
+    # Security events are still formatted, but not written to the terminal
+    logging.basicConfig(stream=open(os.devnull, "w"))
+
+    baseline_rss_mib = _peak_rss_mib()
+    result = BENCHMARKS[name](records=records, **kwargs)
+    result["records_per_second"] = records / result["seconds"]
+    result["peak_rss_mib"] = _peak_rss_mib()
+    result["bytes_per_record"] = (result["peak_rss_mib"] - baseline_rss_mib) * 2**20 / records
+    return result
+
+
+def run(name: str, records: int, **kwargs: Any) -> Result:
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(_run, name, records, **kwargs).result()
+
+
+def report(results: dict[str, Result], baseline: Optional[dict[str, Result]] = None) -> None:
+    print(
+        f"{'benchmark':<10}{'records/s':>14}{'peak RSS MiB':>14}{'bytes/record':>14}"
+        f"{'statements':>12}"
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<10}{result['records_per_second']:>14,.0f}"
+            f"{result['peak_rss_mib']:>14.1f}{result.get('bytes_per_record', 0):>14,.0f}"
+            f"{result['statements']:>12}"
+        )
+        if baseline and (previous := baseline.get(name)):
+            changes = (
+                result.get(k, 0) / previous[k] - 1 if previous.get(k) else 0.0
+                for k in ("records_per_second", "peak_rss_mib", "bytes_per_record", "statements")
+            )
+            print(f"{'':<10}" + "".join(f"{c:>+13.1%}" + " " for c in changes))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument(
+        "--mix",
+        type=Mix.parse,
+        default=Mix(),
+        help="Weights of the generated records, e.g. create=4,modify=3,move=1,attach=1,detach=1",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--benchmark",
+        action="append",
+        choices=BENCHMARKS,
+        help="Benchmark to run, can be repeated. All benchmarks run by default.",
+    )
+    parser.add_argument("--database-url", help="Database used by the apply benchmark")
+    parser.add_argument("--workers", type=int, help="Workers of the sharded benchmark")
+    parser.add_argument("--save", type=Path, help="Save the results to a JSON file")
+    parser.add_argument("--compare", type=Path, help="Compare with results saved by --save")
+    parser.add_argument(
+        "--max-bytes-per-record",
+        type=float,
+        help="Fail if a parsed record takes more memory, as measured by the parse benchmark",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ldif_file = Path(tmp) / "synthetic.ldif"
+        with open(ldif_file, "wt") as f:
+            LdifGenerator(args.mix, seed=args.seed).write(f, args.records)
+
+        database_url = args.database_url or f"sqlite:///{Path(tmp) / 'glauth.db'}"
+        results = {
+            name: run(
+                name,
+                args.records,
+                ldif_file=ldif_file,
+                database_url=database_url,
+                workers=args.workers,
+            )
+            for name in args.benchmark or BENCHMARKS
+        }
+
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    report(results, baseline)
+
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2))
+
+    if args.max_bytes_per_record and (parse := results.get("parse")):
+        if parse["bytes_per_record"] > args.max_bytes_per_record:
+            print(
+                f"A parsed record takes {parse['bytes_per_record']:,.0f} bytes, more than the "
+                f"target of {args.max_bytes_per_record:,.0f} bytes"
+            )
+            return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
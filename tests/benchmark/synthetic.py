@@ -0,0 +1,201 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Generate synthetic LDIF data for the benchmarks."""
+
+import random
+from dataclasses import dataclass, field
+from typing import Iterator, TextIO
+
+Entry = tuple[str, dict[str, list[bytes]]]
+
+BASE_DN = "dc=glauth,dc=com"
+FIRST_ID = 100000
+
+
+@dataclass
+class Mix:
+    """The relative weights of the generated change records."""
+
+    create: int = 4
+    modify: int = 3
+    move: int = 1
+    attach: int = 1
+    detach: int = 1
+
+    @classmethod
+    def parse(cls, value: str) -> "Mix":
+        """Parse a mix such as `create=4,modify=3,move=1`. Omitted weights are 0."""
+        weights = dict.fromkeys(cls.__dataclass_fields__, 0)
+        for item in filter(None, value.split(",")):
+            name, _, weight = item.partition("=")
+            if name not in weights:
+                raise ValueError(f"Unknown record kind: {name}")
+            weights[name] = int(weight)
+        return cls(**weights)
+
+
+@dataclass
+class _State:
+    groups: list[tuple[str, int]] = field(default_factory=list)
+    users: list[tuple[str, int, str]] = field(default_factory=list)
+    members: list[tuple[str, int]] = field(default_factory=list)
+    next_id: int = FIRST_ID
+
+
+class LdifGenerator:
+    """Generate change records that apply cleanly to an empty database.
+
+    Each record is drawn from the mix, falling back to a creation while the
+    entries it needs do not exist yet, e.g. moving a user needs two groups.
+    The output is deterministic for a given seed.
+    """
+
+    def __init__(self, mix: Mix, seed: int = 0):
+        self.mix = mix
+        self._random = random.Random(seed)
+        self._state = _State()
+        self._kinds = [k for k in mix.__dataclass_fields__ if getattr(mix, k)]
+        self._weights = [getattr(mix, k) for k in self._kinds]
+
+    def records(self, count: int) -> Iterator[str]:
+        for _ in range(count):
+            kind = self._random.choices(self._kinds, self._weights)[0]
+            yield getattr(self, f"_{kind}")()
+
+    def write(self, f: TextIO, count: int) -> None:
+        for record in self.records(count):
+            f.write(record)
+            f.write("\n")
+
+    def _next_id(self) -> int:
+        self._state.next_id += 1
+        return self._state.next_id
+
+    def _create(self) -> str:
+        state = self._state
+        if len(state.groups) < 2 or self._random.random() < 0.1:
+            name, gid = f"group{self._next_id()}", state.next_id
+            state.groups.append((name, gid))
+            return (
+                f"dn: ou={name},{BASE_DN}\nobjectClass: posixGroup\nou: {name}\ngidNumber: {gid}\n"
+            )
+
+        group, gid = self._random.choice(state.groups)
+        name, uid = f"user{self._next_id()}", state.next_id
+        state.users.append((name, uid, group))
+        return (
+            f"dn: cn={name},ou={group},{BASE_DN}\n"
+            "objectClass: posixAccount\n"
+            f"cn: {name}\n"
+            f"uidNumber: {uid}\n"
+            f"gidNumber: {gid}\n"
+            "givenName: John\n"
+            "sn: Doe\n"
+            f"mail: {name}@glauth.com\n"
+            f"homeDirectory: /home/{name}\n"
+            "loginShell: /bin/bash\n"
+            f"userPassword: {{SHA256}}{'0' * 64}\n"
+            f"uid: {name}\n"
+        )
+
+    def _modify(self) -> str:
+        if not self._state.users:
+            return self._create()
+
+        name, _, group = self._random.choice(self._state.users)
+        return (
+            f"dn: cn={name},ou={group},{BASE_DN}\n"
+            "changetype: modify\n"
+            "replace: mail\n"
+            f"mail: {name}@example.com\n"
+        )
+
+    def _move(self) -> str:
+        state = self._state
+        if not state.users or len(state.groups) < 2:
+            return self._create()
+
+        i = self._random.randrange(len(state.users))
+        name, uid, group = state.users[i]
+        while (new_group := self._random.choice(state.groups)[0]) == group:
+            continue
+        state.users[i] = (name, uid, new_group)
+        return (
+            f"dn: cn={name},ou={group},{BASE_DN}\n"
+            "changetype: modrdn\n"
+            f"newrdn: cn={name}\n"
+            "deleteoldrdn: 1\n"
+            f"newsuperior: ou={new_group},{BASE_DN}\n"
+        )
+
+    def _attach(self) -> str:
+        state = self._state
+        if not state.users:
+            return self._create()
+
+        group, _ = self._random.choice(state.groups)
+        _, uid, _ = self._random.choice(state.users)
+        state.members.append((group, uid))
+        return f"dn: ou={group},{BASE_DN}\nchangetype: modify\nadd: memberUid\nmemberUid: {uid}\n"
+
+    def _detach(self) -> str:
+        state = self._state
+        if not state.members:
+            return self._attach()
+
+        group, uid = state.members.pop(self._random.randrange(len(state.members)))
+        return (
+            f"dn: ou={group},{BASE_DN}\nchangetype: modify\ndelete: memberUid\nmemberUid: {uid}\n"
+        )
+
+
+def synthetic_entries(count: int) -> Iterator[Entry]:
+    """Generate parsed entries, as handed over by python-ldap, cycling through the mix."""
+    for i in range(count):
+        match i % 4:
+            case 0:
+                yield (
+                    f"ou=group{i},ou=parent,{BASE_DN}",
+                    {
+                        "objectClass": [b"top", b"posixGroup"],
+                        "ou": [f"group{i}".encode()],
+                        "gidNumber": [str(FIRST_ID + i).encode()],
+                    },
+                )
+            case 1:
+                yield (
+                    f"cn=user{i},ou=group{i - 1},ou=users,{BASE_DN}",
+                    {
+                        "objectClass": [b"top", b"posixAccount"],
+                        "cn": [f"user{i}".encode()],
+                        "uidNumber": [str(FIRST_ID + i).encode()],
+                        "gidNumber": [str(FIRST_ID + i - 1).encode()],
+                        "givenName": [b"John"],
+                        "sn": [b"Doe"],
+                        "mail": [f"user{i}@glauth.com".encode()],
+                        "homeDirectory": [f"/home/user{i}".encode()],
+                        "loginShell": [b"/bin/bash"],
+                        "userPassword": [b"{SHA256}" + b"0" * 64],
+                        "uid": [f"user{i}".encode()],
+                    },
+                )
+            case 2:
+                yield (
+                    f"cn=user{i - 1},ou=group{i - 2},ou=users,{BASE_DN}",
+                    {
+                        "changetype": [b"modify"],
+                        "replace": [b"mail"],
+                        "mail": [f"user{i}@example.com".encode()],
+                    },
+                )
+            case 3:
+                yield (
+                    f"cn=user{i - 2},ou=group{i - 3},ou=users,{BASE_DN}",
+                    {
+                        "changetype": [b"moddn"],
+                        "newrdn": [f"cn=user{i - 2}".encode()],
+                        "deleteoldrdn": [b"1"],
+                        "newsuperior": [f"ou=other,ou=users,{BASE_DN}".encode()],
+                    },
+                )
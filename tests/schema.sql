@@ -0,0 +1,39 @@
+-- https://github.com/glauth/glauth-postgres/blob/main/postgres.go
+CREATE TABLE ldapgroups (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    gidnumber INTEGER NOT NULL
+);
+
+CREATE TABLE users (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    uidnumber INTEGER NOT NULL,
+    primarygroup INTEGER NOT NULL,
+    othergroups TEXT DEFAULT '',
+    givenname TEXT DEFAULT '',
+    sn TEXT DEFAULT '',
+    mail TEXT DEFAULT '',
+    loginshell TEXT DEFAULT '',
+    homedirectory TEXT DEFAULT '',
+    disabled SMALLINT DEFAULT 0,
+    passsha256 TEXT DEFAULT '',
+    passbcrypt TEXT DEFAULT '',
+    otpsecret TEXT DEFAULT '',
+    yubikey TEXT DEFAULT '',
+    sshkeys TEXT DEFAULT '',
+    custattr TEXT DEFAULT '{}'
+);
+
+CREATE TABLE includegroups (
+    id INTEGER PRIMARY KEY,
+    parentgroupid INTEGER NOT NULL,
+    includegroupid INTEGER NOT NULL
+);
+
+CREATE TABLE capabilities (
+    id INTEGER PRIMARY KEY,
+    userid INTEGER NOT NULL,
+    action TEXT NOT NULL,
+    object TEXT NOT NULL
+);
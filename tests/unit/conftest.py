@@ -2,12 +2,15 @@
 # See LICENSE file for licensing details.
 
 from parser import Record, stringify_processor
-from typing import Callable
+from pathlib import Path
+from typing import Callable, Iterator
 from unittest.mock import MagicMock
 
 import pytest
 from ops.testing import Harness
 from pytest_mock import MockerFixture
+from sqlalchemy import Engine, create_engine, select
+from sqlalchemy.orm import Session
 
 from charm import GLAuthUtilsCharm
 from constants import (
@@ -15,11 +18,31 @@ from constants import (
     GROUP_IDENTIFIER_ATTRIBUTE,
     USER_IDENTIFIER_ATTRIBUTE,
 )
-from database import Group, User
+from database import Group, IncludeGroup, User
 from lib.charms.glauth_utils.v0.glauth_auxiliary import AuxiliaryData
 
 LDIF_FILE_PATH = "foo"
 REMOTE_APP = "glauth-k8s"
+INTEGRATION_TEST_DIR = Path(__file__).parents[1] / "integration"
+
+DATABASE_SCHEMA = Path(__file__).parents[1] / "schema.sql"
+
+
+def dump_database(engine: Engine) -> tuple[list, list, list]:
+    with Session(engine) as session:
+        groups = session.execute(select(Group.name, Group.gid_number).order_by(Group.name)).all()
+        users = [
+            (u.name, u.uid_number, u.gid_number, u.other_groups, u.surname, u.email)
+            + (u.password_sha256, u.custom_attributes)
+            for u in session.scalars(select(User).order_by(User.name))
+        ]
+        include_groups = session.execute(
+            select(IncludeGroup.parent_group_id, IncludeGroup.child_group_id).order_by(
+                IncludeGroup.parent_group_id, IncludeGroup.child_group_id
+            )
+        ).all()
+
+    return groups, users, include_groups
 
 
 @pytest.fixture
@@ -57,6 +80,29 @@ def auxiliary_data_ready(harness: Harness, auxiliary_integration: int) -> Auxili
     return auxiliary_data
 
 
+@pytest.fixture
+def database(tmp_path: Path) -> Iterator[Engine]:
+    engine = create_engine(f"sqlite:///{tmp_path / 'glauth.db'}")
+    with engine.begin() as conn:
+        for sql_file in (DATABASE_SCHEMA, INTEGRATION_TEST_DIR / "db.sql"):
+            for statement in filter(str.strip, sql_file.read_text().split(";")):
+                conn.exec_driver_sql(statement)
+
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def empty_database(tmp_path: Path) -> Iterator[Engine]:
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+    with engine.begin() as conn:
+        for statement in filter(str.strip, DATABASE_SCHEMA.read_text().split(";")):
+            conn.exec_driver_sql(statement)
+
+    yield engine
+    engine.dispose()
+
+
 @pytest.fixture
 def ldif_file_mock(mocker: MockerFixture) -> MagicMock:
     return mocker.patch("pathlib.Path.is_file", return_value=True)
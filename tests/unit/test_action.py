@@ -0,0 +1,362 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+from contextlib import nullcontext
+from pathlib import Path
+
+import pytest
+from conftest import INTEGRATION_TEST_DIR
+from pytest_mock import MockerFixture
+from sqlalchemy import Engine, delete, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from action import Checkpoint, apply_ldif, apply_ldif_files, find_ldif_files
+from database import Group, IncludeGroup, User
+from exceptions import (
+    InvalidCheckpointError,
+    InvalidGroupHierarchyError,
+    PartiallyAppliedError,
+)
+
+LDIF_DIR = INTEGRATION_TEST_DIR / "ldif"
+
+
+def get_user(session: Session, name: str) -> User:
+    return session.scalars(select(User).where(User.name == name)).one_or_none()
+
+
+def get_group(session: Session, name: str) -> Group:
+    return session.scalars(select(Group).where(Group.name == name)).one_or_none()
+
+
+class TestApplyLdif:
+    def test_add(self, database: Engine) -> None:
+        apply_ldif(LDIF_DIR / "add.ldif", database)
+
+        with Session(database) as session:
+            assert 5502 == get_group(session, "superheros").gid_number
+            assert 5503 == get_group(session, "caped").gid_number
+
+            association = session.scalars(select(IncludeGroup)).one()
+            assert (5502, 5503) == (association.parent_group_id, association.child_group_id)
+
+            user = get_user(session, "johndoe")
+            assert (5002, 5502) == (user.uid_number, user.gid_number)
+            assert "john@glauth.com" == user.email
+            assert user.password_sha256.startswith("6478579e")
+            assert {"uid": "john"} == user.custom_attributes
+
+    def test_add_memory_mapped(self, database: Engine, mocker: MockerFixture) -> None:
+        mocker.patch("action.LDIF_MMAP_MIN_SIZE", 0)
+        apply_ldif(LDIF_DIR / "add.ldif", database)
+
+        with Session(database) as session:
+            assert session.scalars(select(IncludeGroup)).one()
+            assert {"uid": "john"} == get_user(session, "johndoe").custom_attributes
+
+    def test_modify(self, database: Engine) -> None:
+        apply_ldif(LDIF_DIR / "modify.ldif", database)
+
+        with Session(database) as session:
+            assert 5514 == get_group(session, "svcaccts").gid_number
+
+            user = get_user(session, "modify")
+            assert ("wick", "/bin/bash", "") == (user.surname, user.login_shell, user.email)
+
+    def test_rename(self, database: Engine) -> None:
+        apply_ldif(LDIF_DIR / "rename.ldif", database)
+
+        with Session(database) as session:
+            assert not get_user(session, "rename")
+            assert get_user(session, "new_rename")
+
+    def test_move(self, database: Engine) -> None:
+        apply_ldif(LDIF_DIR / "move.ldif", database)
+
+        with Session(database) as session:
+            association = session.scalars(select(IncludeGroup)).one()
+            assert (5507, 5508) == (association.parent_group_id, association.child_group_id)
+            assert 5508 == get_user(session, "move").gid_number
+
+    def test_attach(self, database: Engine) -> None:
+        apply_ldif(LDIF_DIR / "attach.ldif", database)
+
+        with Session(database) as session:
+            assert {"5510"} == get_user(session, "attach").other_groups
+            assert set() == get_user(session, "detach").other_groups
+
+    def test_delete(self, database: Engine) -> None:
+        apply_ldif(LDIF_DIR / "delete.ldif", database)
+
+        with Session(database) as session:
+            assert not get_user(session, "delete")
+            assert not get_group(session, "delete")
+
+
+class TestReorderedApplyLdif:
+    @pytest.fixture
+    def ldif_file(self, tmp_path: Path) -> Path:
+        ldif_file = tmp_path / "reorder.ldif"
+        ldif_file.write_text(
+            "dn: ou=reordered,dc=glauth,dc=com\n"
+            "changetype: modify\n"
+            "add: memberUid\n"
+            "memberUid: 6301\n"
+            "\n"
+            "dn: ou=child,dc=glauth,dc=com\n"
+            "changetype: modrdn\n"
+            "deleteoldrdn: 1\n"
+            "newsuperior: ou=reordered,dc=glauth,dc=com\n"
+            "\n"
+            "dn: cn=reordered,ou=reordered,dc=glauth,dc=com\n"
+            "cn: reordered\n"
+            "uidNumber: 6301\n"
+            "gidNumber: 6300\n"
+            "\n"
+            "dn: ou=child,dc=glauth,dc=com\n"
+            "ou: child\n"
+            "gidNumber: 6302\n"
+            "\n"
+            "dn: ou=reordered,dc=glauth,dc=com\n"
+            "ou: reordered\n"
+            "gidNumber: 6300\n"
+        )
+        return ldif_file
+
+    def test_apply_in_dependency_order(self, database: Engine, ldif_file: Path) -> None:
+        apply_ldif(ldif_file, database, reorder=True)
+
+        with Session(database) as session:
+            user = get_user(session, "reordered")
+            assert (6300, {"6300"}) == (user.gid_number, user.other_groups)
+
+            association = session.scalars(select(IncludeGroup)).one()
+            assert (6300, 6302) == (association.parent_group_id, association.child_group_id)
+
+    def test_apply_in_file_order(self, database: Engine, ldif_file: Path) -> None:
+        with pytest.raises(IntegrityError):
+            apply_ldif(ldif_file, database)
+
+        with Session(database) as session:
+            assert not get_user(session, "reordered")
+
+
+class TestChunkedApplyLdif:
+    @pytest.fixture
+    def ldif_file(self, tmp_path: Path) -> Path:
+        ldif_file = tmp_path / "groups.ldif"
+        ldif_file.write_text(
+            "".join(
+                f"dn: ou={name},dc=glauth,dc=com\nou: {name}\ngidNumber: {gid}\n\n"
+                for name, gid in (("first", 6001), ("second", 6002), ("juju", 6003))
+            )
+        )
+        return ldif_file
+
+    @pytest.fixture(params=[False, True], ids=["stream", "mapped"])
+    def mapped(self, request: pytest.FixtureRequest, mocker: MockerFixture) -> bool:
+        if request.param:
+            mocker.patch("action.LDIF_MMAP_MIN_SIZE", 0)
+        return request.param
+
+    def test_failure_keeps_committed_chunks(
+        self, database: Engine, ldif_file: Path, mapped: bool
+    ) -> None:
+        with pytest.raises(IntegrityError):
+            apply_ldif(ldif_file, database, commit_every=1)
+
+        with Session(database) as session:
+            assert get_group(session, "first")
+            assert get_group(session, "second")
+
+        assert 2 == Checkpoint.load(ldif_file).offset
+
+    def test_resume(self, database: Engine, ldif_file: Path, mapped: bool) -> None:
+        Checkpoint.create(ldif_file, offset=2).save(ldif_file)
+        with Session(database) as session:
+            session.execute(delete(Group).where(Group.name == "juju"))
+            session.commit()
+
+        apply_ldif(ldif_file, database, commit_every=1, resume=True)
+
+        with Session(database) as session:
+            assert not get_group(session, "first")
+            assert not get_group(session, "second")
+            assert 6003 == get_group(session, "juju").gid_number
+
+        assert not Checkpoint.path(ldif_file).exists()
+
+    def test_resume_after_journal_skips(
+        self, database: Engine, tmp_path: Path, mapped: bool
+    ) -> None:
+        journal_file = tmp_path / "journal.sqlite3"
+        ldif_file = tmp_path / "groups.ldif"
+        groups = [("first", 6001), ("second", 6002), ("third", 6003), ("juju", 6004)]
+        for count in (2, 4):
+            ldif_file.write_text(
+                "".join(
+                    f"dn: ou={name},dc=glauth,dc=com\nou: {name}\ngidNumber: {gid}\n\n"
+                    for name, gid in groups[:count]
+                )
+            )
+            with pytest.raises(IntegrityError) if count == 4 else nullcontext():
+                apply_ldif(ldif_file, database, commit_every=1, journal_file=journal_file)
+
+        assert 3 == Checkpoint.load(ldif_file).offset, (
+            "The checkpoint should count the records skipped by the journal."
+        )
+
+        with Session(database) as session:
+            session.execute(delete(Group).where(Group.name == "juju"))
+            session.commit()
+
+        apply_ldif(ldif_file, database, commit_every=1, resume=True)
+
+        with Session(database) as session:
+            assert 6003 == get_group(session, "third").gid_number
+            assert 6004 == get_group(session, "juju").gid_number
+
+    def test_resume_skips_committed_records(
+        self, database: Engine, ldif_file: Path, mapped: bool
+    ) -> None:
+        with pytest.raises(IntegrityError):
+            apply_ldif(ldif_file, database, commit_every=1)
+        with Session(database) as session:
+            session.execute(delete(Group).where(Group.name == "juju"))
+            session.commit()
+
+        apply_ldif(ldif_file, database, commit_every=1, resume=True)
+
+        with Session(database) as session:
+            assert 3 == session.scalar(
+                select(func.count()).select_from(Group).where(Group.gid_number.between(6001, 6003))
+            ), "Resuming should apply each record of the file exactly once"
+
+    def test_resume_with_changed_file(self, database: Engine, ldif_file: Path) -> None:
+        Checkpoint.create(ldif_file, offset=2).save(ldif_file)
+        ldif_file.write_text("")
+
+        with pytest.raises(InvalidCheckpointError):
+            apply_ldif(ldif_file, database, commit_every=1, resume=True)
+
+
+class TestIncrementalApplyLdif:
+    @pytest.fixture
+    def ldif_file(self, tmp_path: Path) -> Path:
+        ldif_file = tmp_path / "groups.ldif"
+        ldif_file.write_text(
+            "".join(
+                f"dn: ou={name},dc=glauth,dc=com\nou: {name}\ngidNumber: {gid}\n\n"
+                for name, gid in (("first", 6001), ("second", 6002), ("juju", 6003))
+            )
+        )
+        return ldif_file
+
+    def test_skip_applied_entries(self, database: Engine, ldif_file: Path, tmp_path: Path) -> None:
+        journal_file = tmp_path / "journal.sqlite3"
+        ldif_file.write_text(ldif_file.read_text().replace("juju", "third"))
+        apply_ldif(ldif_file, database, journal_file=journal_file)
+
+        with Session(database) as session:
+            session.execute(delete(Group).where(Group.name.in_(["first", "third"])))
+            session.commit()
+
+        ldif_file.write_text(ldif_file.read_text().replace("6003", "6004"))
+        apply_ldif(ldif_file, database, journal_file=journal_file)
+
+        with Session(database) as session:
+            assert not get_group(session, "first")
+            assert 6004 == get_group(session, "third").gid_number
+
+    def test_failure_keeps_committed_entries(
+        self, database: Engine, ldif_file: Path, tmp_path: Path
+    ) -> None:
+        journal_file = tmp_path / "journal.sqlite3"
+        with pytest.raises(IntegrityError):
+            apply_ldif(ldif_file, database, commit_every=1, journal_file=journal_file)
+
+        with Session(database) as session:
+            session.execute(delete(Group).where(Group.name.in_(["first", "juju"])))
+            session.commit()
+
+        apply_ldif(ldif_file, database, journal_file=journal_file)
+
+        with Session(database) as session:
+            assert not get_group(session, "first")
+            assert 6003 == get_group(session, "juju").gid_number
+
+
+class TestApplyLdifFiles:
+    @pytest.fixture
+    def ldif_files(self, tmp_path: Path) -> list[Path]:
+        users = tmp_path / "users.ldif"
+        users.write_text(
+            "dn: cn=parallel,ou=parallel,ou=users,dc=glauth,dc=com\n"
+            "cn: parallel\nuidNumber: 6101\ngidNumber: 6100\n\n"
+        )
+        groups = tmp_path / "groups.ldif"
+        groups.write_text("dn: ou=parallel,dc=glauth,dc=com\nou: parallel\ngidNumber: 6100\n\n")
+        return [users, groups]
+
+    def test_find_ldif_files(self, tmp_path: Path, ldif_files: list[Path]) -> None:
+        (tmp_path / "notes.txt").write_text("")
+
+        assert [ldif_files[0]] == find_ldif_files(str(ldif_files[0]))
+        assert sorted(ldif_files) == find_ldif_files(str(tmp_path))
+        assert [ldif_files[1]] == find_ldif_files(str(tmp_path / "group*"))
+        assert [] == find_ldif_files(str(tmp_path / "missing.ldif"))
+
+    def test_apply_ldif_files(self, database: Engine, ldif_files: list[Path]) -> None:
+        apply_ldif_files(ldif_files, database, max_workers=2)
+
+        with Session(database) as session:
+            assert 6100 == get_group(session, "parallel").gid_number
+            assert 6100 == get_user(session, "parallel").gid_number
+
+    def test_failure_in_one_file(
+        self, tmp_path: Path, database: Engine, ldif_files: list[Path]
+    ) -> None:
+        invalid = tmp_path / "invalid.ldif"
+        invalid.write_text(
+            "dn: cn=serviceuser,ou=juju,ou=users,dc=glauth,dc=com\n"
+            "cn: serviceuser\nuidNumber: 5001\ngidNumber: 5501\n\n"
+        )
+
+        with pytest.raises(PartiallyAppliedError) as exc:
+            apply_ldif_files([*ldif_files, invalid], database)
+
+        assert isinstance(exc.value.__cause__, IntegrityError)
+        assert [str(invalid)] == exc.value.failed
+        assert [str(ldif_file) for ldif_file in ldif_files] == exc.value.applied
+        with Session(database) as session:
+            assert get_user(session, "parallel")
+
+    def test_moves_against_the_same_hierarchy(self, tmp_path: Path, database: Engine) -> None:
+        groups = tmp_path / "groups.ldif"
+        groups.write_text(
+            "dn: ou=first,dc=glauth,dc=com\nou: first\ngidNumber: 6201\n\n"
+            "dn: ou=second,dc=glauth,dc=com\nou: second\ngidNumber: 6202\n\n"
+        )
+        moves = []
+        for name, parent in (("first", "second"), ("second", "first")):
+            moves.append(tmp_path / f"move-{name}.ldif")
+            moves[-1].write_text(
+                f"dn: ou={name},dc=glauth,dc=com\n"
+                "changetype: modrdn\n"
+                "deleteoldrdn: 1\n"
+                f"newsuperior: ou={parent},dc=glauth,dc=com\n"
+            )
+
+        with pytest.raises(PartiallyAppliedError) as exc:
+            apply_ldif_files([groups, *moves], database)
+
+        assert isinstance(exc.value.__cause__, InvalidGroupHierarchyError)
+        assert [str(groups), str(moves[0])] == exc.value.applied
+        with Session(database) as session:
+            include_groups = session.execute(
+                select(IncludeGroup.parent_group_id, IncludeGroup.child_group_id).where(
+                    IncludeGroup.child_group_id > 6200
+                )
+            ).all()
+        assert [(6202, 6201)] == include_groups
@@ -0,0 +1,51 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+import pickle
+
+import pytest
+
+from attributes import AttributeMap
+
+
+class TestAttributeMap:
+    def test_mapping(self) -> None:
+        attributes = AttributeMap({"cn": "foo", "sn": "bar"})
+        attributes["mail"] = "foo@glauth.com"
+        attributes["sn"] = "baz"
+        del attributes["cn"]
+
+        assert {"sn": "baz", "mail": "foo@glauth.com"} == attributes
+        assert ["sn", "mail"] == list(attributes)
+        assert [("sn", "baz"), ("mail", "foo@glauth.com")] == list(attributes.items())
+        assert "baz" == attributes.pop("sn")
+        assert attributes.get("sn") is None
+        with pytest.raises(KeyError):
+            attributes["sn"]
+
+    def test_shared_keys(self) -> None:
+        first = AttributeMap.from_lists(["cn", "uidNumber"], ["foo", "5001"])
+        second = AttributeMap.from_lists(["cn", "uidNumber"], ["bar", "5002"])
+
+        assert first._keys is second._keys
+        second["cn"] = "baz"
+        assert first._keys is second._keys
+
+    def test_mapping_pattern(self) -> None:
+        match AttributeMap({"parentGroup": "top"}):
+            case {"parentGroup": parent_group}:
+                assert "top" == parent_group
+            case _:
+                pytest.fail("The mapping pattern does not match")
+
+    def test_pickle(self) -> None:
+        attributes = AttributeMap({"memberUid": ["5001", "5002"]})
+
+        assert attributes == pickle.loads(pickle.dumps(attributes))
+
+    def test_decode_values_when_read(self) -> None:
+        attributes = AttributeMap.from_lists(["cn", "ssh"], [b"hackers", [b"ssh-ed25519 A"]])
+
+        assert "hackers" == attributes["cn"]
+        assert [("cn", "hackers"), ("ssh", ["ssh-ed25519 A"])] == list(attributes.items())
+        assert attributes["ssh"] is attributes.get("ssh")
@@ -0,0 +1,104 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+from pathlib import Path
+
+from conftest import dump_database
+from sqlalchemy import Engine, select
+from sqlalchemy.orm import Session
+
+from action import bulk_load_ldif
+from constants import OperationType
+from database import IncludeGroup, User
+from export import export_ldif
+
+
+class TestBulkLoadLdif:
+    def test_bulk_load_export(
+        self, database: Engine, empty_database: Engine, tmp_path: Path
+    ) -> None:
+        ldif_file = tmp_path / "export.ldif"
+        export_ldif(ldif_file, database)
+
+        operations = bulk_load_ldif(ldif_file, empty_database)
+
+        assert {OperationType.CREATE: 16, OperationType.ATTACH: 1} == operations
+        assert dump_database(database) == dump_database(empty_database)
+
+    def test_bulk_load_with_defaults(self, empty_database: Engine, tmp_path: Path) -> None:
+        ldif_file = tmp_path / "load.ldif"
+        ldif_file.write_text(
+            "dn: ou=top,dc=glauth,dc=com\n"
+            "objectClass: posixGroup\n"
+            "ou: top\n"
+            "gidNumber: 5501\n\n"
+            "dn: cn=john,ou=top,dc=glauth,dc=com\n"
+            "objectClass: posixAccount\n"
+            "cn: john\n"
+            "uidNumber: 5001\n"
+            "gidNumber: 5501\n"
+            "employeeNumber: 42\n"
+        )
+
+        bulk_load_ldif(ldif_file, empty_database)
+
+        with Session(empty_database) as session:
+            user = session.scalars(select(User)).one()
+        assert (5001, 5501) == (user.uid_number, user.gid_number)
+        assert {"employeeNumber": "42"} == user.custom_attributes
+        assert 0 == user.disabled
+
+    def test_bulk_load_with_existing_parent_group(self, database: Engine, tmp_path: Path) -> None:
+        ldif_file = tmp_path / "load.ldif"
+        ldif_file.write_text(
+            "dn: ou=child,ou=top,dc=glauth,dc=com\n"
+            "objectClass: posixGroup\n"
+            "ou: child\n"
+            "gidNumber: 6001\n\n"
+            "dn: ou=grandchild,ou=child,ou=top,dc=glauth,dc=com\n"
+            "objectClass: posixGroup\n"
+            "ou: grandchild\n"
+            "gidNumber: 6002\n\n"
+            "dn: cn=serviceuser,ou=juju,dc=glauth,dc=com\n"
+            "changetype: delete\n"
+        )
+
+        operations = bulk_load_ldif(ldif_file, database)
+
+        assert 1 == operations[OperationType.DELETE]
+        with Session(database) as session:
+            include_groups = set(
+                session.execute(
+                    select(IncludeGroup.parent_group_id, IncludeGroup.child_group_id).where(
+                        IncludeGroup.child_group_id > 6000
+                    )
+                ).all()
+            )
+            assert session.scalar(select(User).where(User.name == "serviceuser")) is None
+        assert {(5507, 6001), (6001, 6002)} == include_groups
+
+    def test_bulk_load_keeps_file_order(self, database: Engine, tmp_path: Path) -> None:
+        ldif_file = tmp_path / "load.ldif"
+        ldif_file.write_text(
+            "dn: cn=john,ou=juju,dc=glauth,dc=com\n"
+            "objectClass: posixAccount\n"
+            "cn: john\n"
+            "uidNumber: 6001\n"
+            "gidNumber: 5501\n\n"
+            "dn: cn=serviceuser,ou=juju,dc=glauth,dc=com\n"
+            "changetype: delete\n\n"
+            "dn: cn=serviceuser,ou=juju,dc=glauth,dc=com\n"
+            "objectClass: posixAccount\n"
+            "cn: serviceuser\n"
+            "uidNumber: 6002\n"
+            "gidNumber: 5501\n"
+        )
+
+        operations = bulk_load_ldif(ldif_file, database)
+
+        assert {OperationType.CREATE: 2, OperationType.DELETE: 1} == operations
+        with Session(database) as session:
+            users = session.execute(
+                select(User.name, User.uid_number).where(User.name.in_(["john", "serviceuser"]))
+            ).all()
+        assert {("john", 6001), ("serviceuser", 6002)} == set(users)
@@ -1,6 +1,8 @@
 # Copyright 2023 Canonical Ltd.
 # See LICENSE file for licensing details.
 
+from collections import Counter
+from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -8,8 +10,15 @@ from conftest import LDIF_FILE_PATH
 from ops.model import ActiveStatus, BlockedStatus, WaitingStatus
 from ops.testing import ActionFailed, Harness
 
-from exceptions import InvalidAttributeValueError, InvalidDistinguishedNameError
+from constants import LDIF_JOURNAL_FILE, OperationType
+from exceptions import (
+    InvalidAttributeValueError,
+    InvalidCheckpointError,
+    InvalidDistinguishedNameError,
+    PartiallyAppliedError,
+)
 from lib.charms.glauth_utils.v0.glauth_auxiliary import AuxiliaryData
+from validation import Issue, ValidationReport
 
 GLAUTH_APP_NAME = "glauth-k8s"
 GLAUTH_UNIT_NAME = "/".join([GLAUTH_APP_NAME, "0"])
@@ -56,6 +65,17 @@ class TestAuxiliaryUnavailableEvent:
         harness.remove_relation(auxiliary_integration)
         assert isinstance(harness.model.unit.status, BlockedStatus)
 
+    @patch("charm.engine_registry")
+    def test_dispose_database_engine(
+        self,
+        mocked_engine_registry: MagicMock,
+        harness: Harness,
+        auxiliary_integration: int,
+        auxiliary_data_ready: AuxiliaryData,
+    ) -> None:
+        harness.remove_relation(auxiliary_integration)
+        mocked_engine_registry.dispose.assert_called_once()
+
 
 class TestApplyLdifAction:
     def test_charm_not_ready(self, harness: Harness) -> None:
@@ -145,3 +165,396 @@ class TestApplyLdifAction:
 
         output = harness.run_action("apply-ldif", {"path": LDIF_FILE_PATH})
         assert any(log.find("Successfully applied the LDIF file.") > -1 for log in output.logs)
+
+    @patch("charm.apply_ldif")
+    @patch("charm.engine_registry")
+    def test_run_action_with_pool_config(
+        self,
+        mocked_engine_registry: MagicMock,
+        mocked_apply_ldif: MagicMock,
+        harness: Harness,
+        auxiliary_integration: int,
+        auxiliary_data_ready: AuxiliaryData,
+        ldif_file_mock: MagicMock,
+    ) -> None:
+        harness.update_config({"database-pool-size": 10, "database-pool-pre-ping": False})
+        harness.model.unit.status = ActiveStatus()
+
+        harness.run_action("apply-ldif", {"path": LDIF_FILE_PATH})
+
+        mocked_engine_registry.get.assert_called_once()
+        assert {"pool_size": 10, "pool_pre_ping": False} == (
+            mocked_engine_registry.get.call_args.kwargs
+        )
+        assert mocked_engine_registry.get.return_value == mocked_apply_ldif.call_args.args[1]
+
+    @patch("charm.apply_ldif")
+    def test_run_action_in_chunks(
+        self,
+        mocked_apply_ldif: MagicMock,
+        harness: Harness,
+        auxiliary_integration: int,
+        auxiliary_data_ready: AuxiliaryData,
+        ldif_file_mock: MagicMock,
+    ) -> None:
+        harness.model.unit.status = ActiveStatus()
+
+        harness.run_action(
+            "apply-ldif", {"path": LDIF_FILE_PATH, "commit-every": 100, "resume": True}
+        )
+
+        mocked_apply_ldif.assert_called_once()
+        assert {
+            "commit_every": 100,
+            "resume": True,
+            "summarize_audit_log": False,
+            "journal_file": None,
+            "reorder": False,
+        } == mocked_apply_ldif.call_args.kwargs
+
+    @patch("charm.apply_ldif")
+    def test_run_action_incrementally(
+        self,
+        mocked_apply_ldif: MagicMock,
+        harness: Harness,
+        auxiliary_integration: int,
+        auxiliary_data_ready: AuxiliaryData,
+        ldif_file_mock: MagicMock,
+    ) -> None:
+        harness.model.unit.status = ActiveStatus()
+
+        harness.run_action("apply-ldif", {"path": LDIF_FILE_PATH, "incremental": True})
+
+        assert LDIF_JOURNAL_FILE == mocked_apply_ldif.call_args.kwargs["journal_file"]
+
+    @patch("charm.apply_ldif", side_effect=InvalidCheckpointError)
+    def test_with_invalid_checkpoint(
+        self,
+        mocked_apply_ldif: MagicMock,
+        harness: Harness,
+        auxiliary_integration: int,
+        auxiliary_data_ready: AuxiliaryData,
+        ldif_file_mock: MagicMock,
+    ) -> None:
+        harness.model.unit.status = ActiveStatus()
+
+        with pytest.raises(ActionFailed) as exc:
+            harness.run_action("apply-ldif", {"path": LDIF_FILE_PATH, "resume": True})
+
+        assert any(
+            log.find("Failed to resume from the checkpoint.") > -1 for log in exc.value.output.logs
+        )
+
+    @patch("charm.apply_ldif_files")
+    @patch("charm.find_ldif_files", return_value=[Path("a.ldif"), Path("b.ldif")])
+    def test_run_action_with_multiple_files(
+        self,
+        mocked_find_ldif_files: MagicMock,
+        mocked_apply_ldif_files: MagicMock,
+        harness: Harness,
+        auxiliary_integration: int,
+        auxiliary_data_ready: AuxiliaryData,
+    ) -> None:
+        harness.update_config({"database-pool-size": 3})
+        harness.model.unit.status = ActiveStatus()
+        mocked_apply_ldif_files.return_value = mocked_find_ldif_files.return_value
+
+        output = harness.run_action("apply-ldif", {"path": "/ldif", "summarize-audit-log": True})
+
+        assert any(log.find("Successfully applied the LDIF file.") > -1 for log in output.logs)
+        assert mocked_find_ldif_files.return_value == mocked_apply_ldif_files.call_args.args[0]
+        assert {
+            "max_workers": 3,
+            "summarize_audit_log": True,
+        } == mocked_apply_ldif_files.call_args.kwargs
+        assert {"applied-files": "a.ldif\nb.ldif"} == output.results
+
+    @patch("charm.apply_ldif_files")
+    @patch("charm.find_ldif_files", return_value=[Path("a.ldif"), Path("b.ldif")])
+    def test_run_action_with_failed_file(
+        self,
+        mocked_find_ldif_files: MagicMock,
+        mocked_apply_ldif_files: MagicMock,
+        harness: Harness,
+        auxiliary_integration: int,
+        auxiliary_data_ready: AuxiliaryData,
+    ) -> None:
+        harness.model.unit.status = ActiveStatus()
+        error = PartiallyAppliedError(applied=["a.ldif"], failed=["b.ldif"])
+        error.__cause__ = ValueError("duplicate user")
+        mocked_apply_ldif_files.side_effect = error
+
+        with pytest.raises(ActionFailed) as exc:
+            harness.run_action("apply-ldif", {"path": "/ldif"})
+
+        assert "duplicate user" in exc.value.message
+        assert "b.ldif" in exc.value.message
+        assert {"applied-files": "a.ldif"} == exc.value.output.results
+
+    @patch("charm.find_ldif_files", return_value=[Path("a.ldif"), Path("b.ldif")])
+    def test_chunks_with_multiple_files(
+        self,
+        mocked_find_ldif_files: MagicMock,
+        harness: Harness,
+    ) -> None:
+        harness.model.unit.status = ActiveStatus()
+
+        with pytest.raises(ActionFailed) as exc:
+            harness.run_action("apply-ldif", {"path": "/ldif", "commit-every": 100})
+
+        assert (
+            "The commit-every, resume and incremental parameters require a single LDIF file."
+            == exc.value.message
+        )
+
+    @patch("charm.apply_ldif")
+    @patch("charm.plan_ldif")
+    def test_dry_run(
+        self,
+        mocked_plan_ldif: MagicMock,
+        mocked_apply_ldif: MagicMock,
+        harness: Harness,
+        auxiliary_integration: int,
+        auxiliary_data_ready: AuxiliaryData,
+        ldif_file_mock: MagicMock,
+    ) -> None:
+        mocked_plan_ldif.return_value.to_dict.return_value = {"no-op-updates": 1}
+        harness.model.unit.status = ActiveStatus()
+
+        output = harness.run_action("apply-ldif", {"path": LDIF_FILE_PATH, "dry-run": True})
+
+        mocked_apply_ldif.assert_not_called()
+        assert {"no-op-updates": 1} == output.results
+        assert any(log.find("No changes were applied.") > -1 for log in output.logs)
+
+    @patch("charm.sync_ldif", return_value=Counter({OperationType.UPDATE: 2}))
+    def test_sync(
+        self,
+        mocked_sync_ldif: MagicMock,
+        harness: Harness,
+        auxiliary_integration: int,
+        auxiliary_data_ready: AuxiliaryData,
+        ldif_file_mock: MagicMock,
+    ) -> None:
+        harness.model.unit.status = ActiveStatus()
+
+        output = harness.run_action(
+            "apply-ldif", {"path": LDIF_FILE_PATH, "sync": True, "dry-run": True}
+        )
+
+        assert {"dry_run": True, "summarize_audit_log": False} == mocked_sync_ldif.call_args.kwargs
+        assert 2 == output.results["operations"]["update"]
+        assert any(log.find("No changes were applied.") > -1 for log in output.logs)
+
+    def test_sync_in_chunks(
+        self,
+        harness: Harness,
+        auxiliary_integration: int,
+        auxiliary_data_ready: AuxiliaryData,
+        ldif_file_mock: MagicMock,
+    ) -> None:
+        harness.model.unit.status = ActiveStatus()
+
+        with pytest.raises(ActionFailed) as exc:
+            harness.run_action(
+                "apply-ldif", {"path": LDIF_FILE_PATH, "sync": True, "resume": True}
+            )
+
+        assert (
+            "The commit-every, resume and incremental parameters are not supported with sync."
+            == exc.value.message
+        )
+
+    @patch("charm.apply_ldif")
+    @patch("charm.validate_ldif", return_value=ValidationReport(entries=3))
+    def test_validate(
+        self,
+        mocked_validate_ldif: MagicMock,
+        mocked_apply_ldif: MagicMock,
+        harness: Harness,
+        auxiliary_integration: int,
+        auxiliary_data_ready: AuxiliaryData,
+        ldif_file_mock: MagicMock,
+    ) -> None:
+        harness.model.unit.status = ActiveStatus()
+
+        output = harness.run_action("apply-ldif", {"path": LDIF_FILE_PATH, "validate": True})
+
+        mocked_validate_ldif.assert_called_once()
+        mocked_apply_ldif.assert_called_once()
+        assert any(log.find("Successfully validated 3 LDIF entries.") > -1 for log in output.logs)
+
+    @patch("charm.apply_ldif")
+    @patch(
+        "charm.validate_ldif",
+        return_value=ValidationReport(
+            entries=3, issues=[Issue(LDIF_FILE_PATH, 4, "The user foo already exists")]
+        ),
+    )
+    def test_validate_with_errors(
+        self,
+        mocked_validate_ldif: MagicMock,
+        mocked_apply_ldif: MagicMock,
+        harness: Harness,
+        auxiliary_integration: int,
+        auxiliary_data_ready: AuxiliaryData,
+        ldif_file_mock: MagicMock,
+    ) -> None:
+        harness.model.unit.status = ActiveStatus()
+
+        with pytest.raises(ActionFailed) as exc:
+            harness.run_action("apply-ldif", {"path": LDIF_FILE_PATH, "validate": True})
+
+        mocked_apply_ldif.assert_not_called()
+        assert exc.value.message.startswith("The LDIF file has 1 error(s).")
+        assert (
+            f"{LDIF_FILE_PATH}:4: The user foo already exists"
+            == exc.value.output.results["issues"]
+        )
+
+    @patch("charm.apply_ldif")
+    @patch("charm.bulk_load_ldif", return_value=Counter({OperationType.CREATE: 3}))
+    def test_bulk_load(
+        self,
+        mocked_bulk_load_ldif: MagicMock,
+        mocked_apply_ldif: MagicMock,
+        harness: Harness,
+        auxiliary_integration: int,
+        auxiliary_data_ready: AuxiliaryData,
+        ldif_file_mock: MagicMock,
+    ) -> None:
+        harness.model.unit.status = ActiveStatus()
+
+        output = harness.run_action("apply-ldif", {"path": LDIF_FILE_PATH, "bulk-load": True})
+
+        mocked_apply_ldif.assert_not_called()
+        mocked_bulk_load_ldif.assert_called_once()
+        assert 3 == output.results["operations"]["create"]
+        assert any(log.find("Successfully loaded") > -1 for log in output.logs)
+
+    def test_bulk_load_with_dry_run(
+        self,
+        harness: Harness,
+        auxiliary_integration: int,
+        auxiliary_data_ready: AuxiliaryData,
+        ldif_file_mock: MagicMock,
+    ) -> None:
+        harness.model.unit.status = ActiveStatus()
+
+        with pytest.raises(ActionFailed) as exc:
+            harness.run_action(
+                "apply-ldif", {"path": LDIF_FILE_PATH, "bulk-load": True, "dry-run": True}
+            )
+
+        assert exc.value.message.startswith("The bulk-load parameter requires a single LDIF file")
+
+    @patch("charm.apply_ldif")
+    def test_reorder(
+        self,
+        mocked_apply_ldif: MagicMock,
+        harness: Harness,
+        auxiliary_integration: int,
+        auxiliary_data_ready: AuxiliaryData,
+        ldif_file_mock: MagicMock,
+    ) -> None:
+        harness.model.unit.status = ActiveStatus()
+
+        harness.run_action("apply-ldif", {"path": LDIF_FILE_PATH, "reorder": True})
+
+        assert mocked_apply_ldif.call_args.kwargs["reorder"] is True
+
+    @patch("charm.plan_ldif")
+    def test_reorder_with_dry_run(
+        self,
+        mocked_plan_ldif: MagicMock,
+        harness: Harness,
+        auxiliary_integration: int,
+        auxiliary_data_ready: AuxiliaryData,
+        ldif_file_mock: MagicMock,
+    ) -> None:
+        mocked_plan_ldif.return_value.to_dict.return_value = {}
+        harness.model.unit.status = ActiveStatus()
+
+        harness.run_action(
+            "apply-ldif", {"path": LDIF_FILE_PATH, "reorder": True, "dry-run": True}
+        )
+
+        assert {"reorder": True} == mocked_plan_ldif.call_args.kwargs
+
+    @pytest.mark.parametrize(
+        "param,value",
+        [("commit-every", 100), ("resume", True), ("validate", True), ("sync", True)],
+    )
+    @patch("charm.apply_ldif")
+    def test_reorder_with_unsupported_param(
+        self,
+        mocked_apply_ldif: MagicMock,
+        param: str,
+        value: int | bool,
+        harness: Harness,
+        ldif_file_mock: MagicMock,
+    ) -> None:
+        harness.model.unit.status = ActiveStatus()
+
+        with pytest.raises(ActionFailed) as exc:
+            harness.run_action(
+                "apply-ldif", {"path": LDIF_FILE_PATH, "reorder": True, param: value}
+            )
+
+        mocked_apply_ldif.assert_not_called()
+        assert exc.value.message.startswith("The reorder parameter requires a single LDIF file")
+
+
+class TestExportLdifAction:
+    def test_charm_not_ready(self, harness: Harness) -> None:
+        with pytest.raises(ActionFailed) as exc:
+            harness.run_action("export-ldif", {"path": "/tmp/export.ldif"})
+
+        assert f"The {harness.charm.app.name} is not ready yet." == exc.value.message
+
+    def test_directory_not_exists(self, harness: Harness) -> None:
+        harness.model.unit.status = ActiveStatus()
+        with pytest.raises(ActionFailed) as exc:
+            harness.run_action("export-ldif", {"path": "/nonexistent/export.ldif"})
+
+        assert "The directory /nonexistent does not exist." == exc.value.message
+
+    @patch("charm.export_ldif", side_effect=RuntimeError("boom"))
+    def test_with_unknown_error(
+        self,
+        mocked_export_ldif: MagicMock,
+        harness: Harness,
+        auxiliary_integration: int,
+        auxiliary_data_ready: AuxiliaryData,
+        tmp_path: Path,
+    ) -> None:
+        harness.model.unit.status = ActiveStatus()
+
+        with pytest.raises(ActionFailed) as exc:
+            harness.run_action("export-ldif", {"path": str(tmp_path / "export.ldif")})
+
+        assert "The failed action is caused by: boom" == exc.value.message
+
+    @patch("charm.export_ldif")
+    def test_run_action(
+        self,
+        mocked_export_ldif: MagicMock,
+        harness: Harness,
+        auxiliary_integration: int,
+        auxiliary_data_ready: AuxiliaryData,
+        tmp_path: Path,
+    ) -> None:
+        mocked_export_ldif.return_value.to_dict.return_value = {"users": 2}
+        harness.model.unit.status = ActiveStatus()
+        path = tmp_path / "export.ldif"
+
+        output = harness.run_action(
+            "export-ldif", {"path": str(path), "base-dn": "dc=example,dc=com"}
+        )
+
+        assert {"path": str(path), "users": 2} == output.results
+        assert (path, "dc=example,dc=com") == (
+            mocked_export_ldif.call_args.args[0],
+            mocked_export_ldif.call_args.args[2],
+        )
+        assert any(log.find("Successfully exported the LDIF file.") > -1 for log in output.logs)
@@ -0,0 +1,68 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+import pytest
+
+from dn import escape_dn_value, parse_dn
+
+
+class TestParseDn:
+    def test_parse_user_dn(self) -> None:
+        dn = parse_dn("cn=hackers,ou=superheros,ou=caped,dc=glauth,dc=com")
+
+        assert dn.is_valid
+        assert ("cn", "hackers") == (dn.id_attribute, dn.identifier)
+        assert "caped" == dn.parent_group
+
+    def test_parse_group_dn(self) -> None:
+        dn = parse_dn("OU=superheros,OU=caped,dc=glauth,dc=com")
+
+        assert dn.is_valid
+        assert ("ou", "superheros") == (dn.id_attribute, dn.identifier)
+        assert "caped" == dn.parent_group
+
+    def test_without_parent_group(self) -> None:
+        assert "" == parse_dn("ou=superheros,dc=glauth,dc=com").parent_group
+
+    @pytest.mark.parametrize(
+        "dn",
+        [
+            "cn=hackers",
+            "cn=,ou=superheros,dc=glauth,dc=com",
+            "x=hackers,ou=superheros,dc=glauth,dc=com",
+            "",
+        ],
+    )
+    def test_invalid_dn(self, dn: str) -> None:
+        parsed = parse_dn(dn)
+
+        assert not parsed.is_valid
+        assert "" == parsed.identifier
+
+    def test_escaped_comma(self) -> None:
+        dn = parse_dn(r"cn=doe\, john,ou=superheros\\,dc=glauth,dc=com")
+
+        assert "doe, john" == dn.identifier
+        assert ("ou=superheros\\\\", "dc=glauth", "dc=com") == dn.rdns[1:]
+
+    def test_cache(self) -> None:
+        parse_dn.cache_clear()
+        dn = parse_dn("ou=superheros,dc=glauth,dc=com")
+
+        assert dn is parse_dn("ou=superheros,dc=glauth,dc=com")
+        assert 1 == parse_dn.cache_info().hits
+
+
+@pytest.mark.parametrize(
+    "value, escaped",
+    [
+        ("hackers", "hackers"),
+        ("doe, john", r"doe\, john"),
+        ('a+b="c"', r"a\+b\=\"c\""),
+        (" #admins ", r"\ #admins\ "),
+        ("#admins", r"\#admins"),
+    ],
+)
+def test_escape_dn_value(value: str, escaped: str) -> None:
+    assert escaped == escape_dn_value(value)
+    assert value == parse_dn(f"cn={escaped},dc=glauth,dc=com").identifier
@@ -0,0 +1,242 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+from parser import Record
+from typing import Iterator
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy import Engine, event, select, text
+from sqlalchemy.orm import Session
+
+from constants import OperationType
+from database import Group, User
+from executor import BatchExecutor
+from operations import security_logger
+
+
+@pytest.fixture
+def statements(database: Engine) -> Iterator[list[str]]:
+    executed: list[str] = []
+
+    def _record(conn, cursor, statement, *args) -> None:
+        executed.append(statement)
+
+    event.listen(database, "before_cursor_execute", _record)
+    yield executed
+    event.remove(database, "before_cursor_execute", _record)
+
+
+def user_records(op: OperationType, count: int, **attributes: str) -> list[Record]:
+    return [
+        Record(
+            identifier=f"user{i}",
+            model=User,
+            op=op,
+            attributes={"cn": f"user{i}", "uidNumber": str(6000 + i), "gidNumber": "5501"}
+            if op is OperationType.CREATE
+            else dict(attributes),
+        )
+        for i in range(count)
+    ]
+
+
+class TestBatchExecutor:
+    def test_bulk_create(self, database: Engine, statements: list[str]) -> None:
+        with Session(database) as session:
+            executor = BatchExecutor(session)
+            for record in user_records(OperationType.CREATE, 100):
+                executor.submit(record)
+            executor.flush()
+
+            assert 1 == sum(stmt.startswith("INSERT INTO users") for stmt in statements)
+            assert 100 == len(session.scalars(select(User).where(User.name.like("user%"))).all())
+
+    def test_bulk_update(self, database: Engine, statements: list[str]) -> None:
+        with Session(database) as session:
+            executor = BatchExecutor(session)
+            for record in user_records(OperationType.CREATE, 10):
+                executor.submit(record)
+            for record in user_records(OperationType.UPDATE, 10, mail="foo@glauth.com"):
+                executor.submit(record)
+            executor.flush()
+
+            assert 1 == sum("UPDATE users" in stmt for stmt in statements)
+            assert {"foo@glauth.com"} == set(
+                session.scalars(select(User.email).where(User.name.like("user%")))
+            )
+
+    def test_bulk_update_keeps_record_order(self, database: Engine) -> None:
+        records = [
+            Record(identifier="modify", model=User, op=OperationType.UPDATE, attributes=attrs)
+            for attrs in ({"sn": "wick"}, {"sn": "doe"})
+        ]
+        with Session(database) as session:
+            executor = BatchExecutor(session)
+            for record in records:
+                executor.submit(record)
+            executor.flush()
+
+            assert (
+                "doe" == session.scalars(select(User.surname).where(User.name == "modify")).one()
+            )
+
+    def test_noop_updates(
+        self, database: Engine, statements: list[str], mocker: MockerFixture
+    ) -> None:
+        log_event = mocker.patch.object(security_logger, "log_event")
+        records = [
+            Record(identifier="modify", model=User, op=OperationType.UPDATE, attributes=attrs)
+            for attrs in ({"sn": "modify"}, {"uidNumber": "5003", "mail": "modify.glauth.com"})
+        ]
+        records.append(
+            Record(
+                identifier="modify",
+                model=User,
+                op=OperationType.UPDATE,
+                attributes={"sn": "modify"},
+                custom_attributes={"employeeNumber": ""},
+            )
+        )
+        records.append(
+            Record(
+                identifier="smoker",
+                model=Group,
+                op=OperationType.UPDATE,
+                attributes={"gidNumber": "5505"},
+            )
+        )
+
+        with Session(database) as session:
+            executor = BatchExecutor(session)
+            for record in records:
+                executor.submit(record)
+            executor.flush()
+
+        assert not any(stmt.startswith("UPDATE") for stmt in statements)
+        log_event.assert_not_called()
+
+    def test_bulk_delete(self, database: Engine, statements: list[str]) -> None:
+        with Session(database) as session:
+            executor = BatchExecutor(session)
+            for record in user_records(OperationType.CREATE, 10):
+                executor.submit(record)
+            for record in user_records(OperationType.DELETE, 10):
+                executor.submit(record)
+            executor.flush()
+
+            assert 1 == sum(stmt.startswith("DELETE FROM users") for stmt in statements)
+            assert not session.scalars(select(User).where(User.name.like("user%"))).all()
+
+    def test_change_created_users(self, database: Engine, mocker: MockerFixture) -> None:
+        log_event = mocker.patch.object(security_logger, "log_event")
+        records = [
+            *user_records(OperationType.CREATE, 2),
+            Record(
+                identifier="user0", model=User, op=OperationType.UPDATE, attributes={"sn": "0"}
+            ),
+            Record(
+                identifier="user0", model=User, op=OperationType.MOVE, attributes={"ou": "top"}
+            ),
+            Record(identifier="user1", model=User, op=OperationType.DELETE),
+        ]
+        with Session(database) as session:
+            executor = BatchExecutor(session)
+            for record in records:
+                executor.submit(record)
+            executor.flush()
+
+            user = session.scalars(select(User).where(User.name == "user0")).one()
+            assert ("0", 5507) == (user.surname, user.gid_number)
+            assert not session.scalars(select(User).where(User.name == "user1")).first()
+
+        events = [call.kwargs["event"] for call in log_event.call_args_list]
+        assert "authz_admin:user_moved:user0" in events
+        assert "authz_admin:user_deleted:user1" in events
+
+    def test_batch_size(self, database: Engine, statements: list[str]) -> None:
+        with Session(database) as session:
+            executor = BatchExecutor(session, batch_size=10)
+            for record in user_records(OperationType.CREATE, 25):
+                executor.submit(record)
+            executor.flush()
+
+            assert 3 == sum(stmt.startswith("INSERT INTO users") for stmt in statements)
+
+    def test_prefetch_lookups(self, database: Engine, statements: list[str]) -> None:
+        records = [
+            Record(
+                identifier="move",
+                model=User,
+                op=OperationType.MOVE,
+                attributes={"ou": group},
+            )
+            for group in ("sub", "top") * 5
+        ]
+        with Session(database) as session:
+            executor = BatchExecutor(session)
+            for record in records:
+                executor.submit(record)
+            executor.flush()
+
+            assert 1 == sum(stmt.startswith("SELECT users.") for stmt in statements)
+            assert 1 == sum(stmt.startswith("SELECT ldapgroups.") for stmt in statements)
+            assert (
+                5507 == session.scalars(select(User.gid_number).where(User.name == "move")).one()
+            )
+
+    def test_coalesce_memberships(self, database: Engine, statements: list[str]) -> None:
+        def membership(op: OperationType, group: str, *uids: int) -> Record:
+            return Record(
+                identifier=group,
+                model=Group,
+                op=op,
+                attributes={"memberUid": [str(uid) for uid in uids]},
+            )
+
+        records = [
+            membership(OperationType.ATTACH, "secondary", *range(6000, 6010)),
+            membership(OperationType.DETACH, "secondary", *range(6000, 6005)),
+            membership(OperationType.ATTACH, "primary", 6000, 5007),
+            membership(OperationType.DETACH, "secondary", 5007, 6009),
+            membership(OperationType.ATTACH, "secondary", 6009),
+        ]
+        with Session(database) as session:
+            executor = BatchExecutor(session)
+            for record in user_records(OperationType.CREATE, 10):
+                executor.submit(record)
+            statements.clear()
+            for record in records:
+                executor.submit(record)
+            executor.flush()
+
+            assert 3 == sum(stmt.startswith("UPDATE users") for stmt in statements)
+
+            other_groups = dict(session.execute(select(User.uid_number, User.other_groups)).all())
+            assert {"5509"} == other_groups[6000]
+            assert set() == other_groups[6001]
+            assert {"5510"} == other_groups[6009]
+            assert {"5509"} == other_groups[5007]
+
+    def test_membership_group_set(self, database: Engine) -> None:
+        records = [
+            Record(identifier=group, model=Group, op=op, attributes={"memberUid": "5007"})
+            for group, op in (
+                ("primary", OperationType.ATTACH),
+                ("secondary", OperationType.ATTACH),
+                ("delete", OperationType.ATTACH),
+                ("primary", OperationType.DETACH),
+            )
+        ]
+        with Session(database) as session:
+            executor = BatchExecutor(session)
+            for record in records:
+                executor.submit(record)
+                executor.flush()
+
+            assert (
+                "5510,5511"
+                == session.execute(
+                    text("SELECT othergroups FROM users WHERE name = 'detach'")
+                ).scalar_one()
+            )
@@ -0,0 +1,63 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+from pathlib import Path
+
+import pytest
+from conftest import dump_database
+from sqlalchemy import Engine, update
+from sqlalchemy.orm import Session
+
+from action import apply_ldif
+from database import Group, IncludeGroup, User
+from export import export_ldif
+
+
+@pytest.fixture
+def hierarchy(database: Engine) -> Engine:
+    with Session(database) as session:
+        session.add(Group(name="doe, john", gid_number=5512))
+        session.add_all([
+            IncludeGroup(parent_group_id=5507, child_group_id=5508),
+            IncludeGroup(parent_group_id=5508, child_group_id=5512),
+            IncludeGroup(parent_group_id=5509, child_group_id=5512),
+        ])
+        session.execute(
+            update(User)
+            .where(User.name == "attach")
+            .values(custom_attributes={"employeeNumber": "42", "roles": ["a", "b"]})
+        )
+        session.commit()
+
+    return database
+
+
+class TestExportLdif:
+    def test_export_ldif(self, hierarchy: Engine, tmp_path: Path) -> None:
+        ldif_file = tmp_path / "export.ldif"
+
+        summary = export_ldif(ldif_file, hierarchy)
+
+        assert {"groups": 10, "users": 7, "memberships": 1} == summary.to_dict()
+        content = ldif_file.read_text()
+        assert "dn: ou=doe\\, john,ou=sub,ou=top,dc=glauth,dc=com\n" in content
+        assert "dn: cn=move,ou=top,dc=glauth,dc=com\n" in content
+        assert "userPassword: {SHA256}652c7dc6" in content
+        assert "newsuperior: ou=primary,dc=glauth,dc=com\n" in content
+        assert content.index("dn: ou=top,") < content.index("dn: ou=sub,ou=top,")
+        assert not (tmp_path / "export.ldif.tmp").exists()
+
+    def test_export_with_base_dn(self, database: Engine, tmp_path: Path) -> None:
+        ldif_file = tmp_path / "export.ldif"
+
+        export_ldif(ldif_file, database, base_dn="dc=example,dc=com")
+
+        assert "dn: cn=serviceuser,ou=juju,dc=example,dc=com\n" in ldif_file.read_text()
+
+    def test_round_trip(self, hierarchy: Engine, empty_database: Engine, tmp_path: Path) -> None:
+        ldif_file = tmp_path / "export.ldif"
+        export_ldif(ldif_file, hierarchy)
+
+        apply_ldif(ldif_file, empty_database)
+
+        assert dump_database(hierarchy) == dump_database(empty_database)
@@ -0,0 +1,26 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+from fingerprint import canonical, element_fingerprint, fingerprint, set_fingerprint
+
+
+def test_canonical() -> None:
+    assert {"uid": "5001", "keys": ["a", "1"], "custom": {"b": "2"}} == canonical({
+        "uid": 5001,
+        "keys": ("a", 1),
+        "custom": {"a": "", "b": 2},
+        "mail": None,
+    })
+
+
+def test_fingerprint() -> None:
+    assert fingerprint({"a": 1, "b": "2"}) == fingerprint({"b": 2, "a": "1", "c": ""})
+    assert fingerprint({"a": 1}) != fingerprint({"a": 2})
+    assert fingerprint({"a": ["1", "2"]}) != fingerprint({"a": ["2", "1"]})
+
+
+def test_set_fingerprint() -> None:
+    assert 0 == set_fingerprint([])
+    assert set_fingerprint([1, 2, 3]) == set_fingerprint([3, 1, 2])
+    assert set_fingerprint([1, 2]) == element_fingerprint(1) ^ element_fingerprint("2")
+    assert set_fingerprint([1, 2]) != set_fingerprint([1, 3])
@@ -0,0 +1,104 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+from parser import Record
+
+import pytest
+from sqlalchemy import Engine, select
+from sqlalchemy.orm import Session
+
+from constants import OperationType
+from database import Group, IncludeGroup
+from exceptions import InvalidGroupHierarchyError
+from executor import BatchExecutor
+from hierarchy import GroupHierarchyIndex
+
+
+def move_record(group: str, new_parent_group: str, parent_group: str = "") -> Record:
+    return Record(
+        identifier=group,
+        model=Group,
+        op=OperationType.MOVE,
+        attributes={"parentGroup": parent_group, "newParentGroup": new_parent_group},
+    )
+
+
+@pytest.fixture
+def hierarchy() -> GroupHierarchyIndex:
+    # top -> sub -> leaf, and top -> other
+    index = GroupHierarchyIndex(max_depth=3)
+    for parent, child in (("top", "sub"), ("sub", "leaf"), ("top", "other")):
+        index.add(parent, child, IncludeGroup())
+    return index
+
+
+class TestGroupHierarchyIndex:
+    def test_load(self, database: Engine) -> None:
+        with Session(database) as session:
+            session.add(IncludeGroup(parent_group_id=5507, child_group_id=5508))
+            session.flush()
+
+            index = GroupHierarchyIndex()
+            index.load(session)
+
+            assert index.get("top", "sub") is not None
+            assert index.get("sub", "top") is None
+
+    @pytest.mark.parametrize(
+        "child, new_parent",
+        [("top", "top"), ("top", "sub"), ("top", "leaf"), ("sub", "leaf")],
+    )
+    def test_check_move_with_cycle(
+        self, hierarchy: GroupHierarchyIndex, child: str, new_parent: str
+    ) -> None:
+        with pytest.raises(InvalidGroupHierarchyError, match="creates a cycle"):
+            hierarchy.check_move(child, new_parent)
+
+    def test_check_move_with_max_depth(self, hierarchy: GroupHierarchyIndex) -> None:
+        hierarchy.check_move("new", "leaf")
+        hierarchy.check_move("other", "sub")
+
+        hierarchy.add("new", "deeper", IncludeGroup())
+        with pytest.raises(InvalidGroupHierarchyError, match="nests 4 levels"):
+            hierarchy.check_move("new", "leaf")
+
+    def test_rename(self, hierarchy: GroupHierarchyIndex) -> None:
+        hierarchy.rename("sub", "renamed")
+
+        assert hierarchy.get("top", "sub") is None
+        assert hierarchy.get("top", "renamed") is not None
+        assert hierarchy.get("renamed", "leaf") is not None
+        with pytest.raises(InvalidGroupHierarchyError):
+            hierarchy.check_move("top", "leaf")
+
+    def test_discard(self, hierarchy: GroupHierarchyIndex) -> None:
+        hierarchy.discard("sub")
+
+        assert hierarchy.get("top", "sub") is None
+        hierarchy.check_move("top", "leaf")
+
+
+class TestGroupMoves:
+    def test_moves_are_served_from_the_index(self, database: Engine) -> None:
+        records = [move_record("sub", "top"), move_record("sub", "primary", parent_group="top")]
+        with Session(database) as session:
+            executor = BatchExecutor(session)
+            for record in records:
+                executor.submit(record)
+            executor.flush()
+
+            associations = session.execute(
+                select(IncludeGroup.parent_group_id, IncludeGroup.child_group_id)
+            ).all()
+            assert [(5509, 5508)] == associations
+            assert executor.hierarchy.get("primary", "sub") is not None
+
+    def test_move_with_cycle(self, database: Engine) -> None:
+        records = [move_record("sub", "top"), move_record("top", "sub")]
+        with Session(database) as session:
+            executor = BatchExecutor(session)
+            for record in records:
+                executor.submit(record)
+
+            with pytest.raises(InvalidGroupHierarchyError, match="top under group sub"):
+                executor.flush()
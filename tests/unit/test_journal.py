@@ -0,0 +1,37 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+from pathlib import Path
+
+from journal import ApplyJournal
+
+
+class TestApplyJournal:
+    def test_commit_staged_entries(self, tmp_path: Path) -> None:
+        with ApplyJournal(tmp_path / "journal.sqlite3") as journal:
+            assert not journal.seen(b"a", 1)
+            assert not journal.seen(b"b", 3)
+            assert not journal.seen(b"a", 4), "Staged entries are not applied yet"
+
+            journal.commit(2)
+            assert journal.seen(b"a", 5)
+            assert not journal.seen(b"c", 6)
+            assert 1 == journal.skipped
+
+        with ApplyJournal(tmp_path / "journal.sqlite3") as journal:
+            assert journal.seen(b"a", 1)
+            assert not journal.seen(b"b", 2)
+
+    def test_evict_least_recently_applied(self, tmp_path: Path) -> None:
+        with ApplyJournal(tmp_path / "journal.sqlite3", max_entries=2) as journal:
+            for offset, digest in enumerate((b"a", b"b"), start=1):
+                journal.seen(digest, offset)
+                journal.commit()
+
+            assert journal.seen(b"a", 1)
+            assert not journal.seen(b"c", 2)
+            journal.commit()
+
+            assert journal.seen(b"a", 1)
+            assert not journal.seen(b"b", 2)
+            assert journal.seen(b"c", 3)
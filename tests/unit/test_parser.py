@@ -1,22 +1,31 @@
 # Copyright 2023 Canonical Ltd.
 # See LICENSE file for licensing details.
 
+import parser
+from concurrent.futures import ProcessPoolExecutor
+from io import StringIO
 from parser import (
     Record,
+    ShardedParser,
+    StreamParser,
     attribute_processor,
-    custom_attribute_processor,
+    chain_order,
     dn_processor,
     entry_validation_processor,
     operation_processor,
     password_processor,
+    process_entry,
     stringify_processor,
 )
+from pathlib import Path
 
 import pytest
+from pytest_mock import MockerFixture
 
 from constants import LDIF_SANITIZE_ATTRIBUTES, SUPPORTED_LDIF_ATTRIBUTES, OperationType
 from database import Group, User
 from exceptions import InvalidAttributeValueError, InvalidDistinguishedNameError
+from journal import ApplyJournal
 
 
 class TestStringifyProcessor:
@@ -26,16 +35,28 @@ class TestStringifyProcessor:
         stringify_processor(user_dn, raw_user_entry, record)
 
         assert all(
-            (isinstance(value, str) for value in raw_user_entry.values()),
-        ), "All attribute values should be of type str."
+            (isinstance(value, bytes) for value in raw_user_entry.values()),
+        ), "Single attribute values should be unwrapped and left undecoded."
 
     def test_with_multi_attribute_values(self, user_dn: str, record: Record) -> None:
         entry = {"ability": [b"hacking", b"fly"]}
         stringify_processor(user_dn, entry, record)
 
-        assert ["hacking", "fly"] == entry[
-            "ability"
-        ], "All elements in an attribute should be of type str."
+        assert [b"hacking", b"fly"] == entry["ability"]
+
+    def test_with_processed_attributes(self, user_dn: str, record: Record) -> None:
+        entry = {"changetype": [b"modify"], "memberUid": [b"5001", b"5002"]}
+        stringify_processor(user_dn, entry, record)
+
+        assert {"changetype": "modify", "memberUid": ["5001", "5002"]} == entry, (
+            "The attributes read by the processors should be decoded."
+        )
+
+    def test_decode_attributes_when_read(self, user_dn: str, raw_user_entry: dict) -> None:
+        record = process_entry(user_dn, {**raw_user_entry, "ability": [b"hacking", b"fly"]})
+
+        assert "hackers" == record.attributes["cn"]
+        assert {"ability": ["hacking", "fly"]} == record.custom_attributes
 
 
 class TestEntryValidationProcessor:
@@ -112,12 +133,12 @@ class TestDnProcessor:
     def test_user_dn(self, user_dn: str, stringify_user_entry: dict, record: Record) -> None:
         dn_processor(user_dn, stringify_user_entry, record)
         assert User == record.model
-        assert stringify_user_entry["cn"] == record.identifier
+        assert "hackers" == record.identifier
 
     def test_group_dn(self, group_dn: str, stringify_group_entry: dict, record: Record) -> None:
         dn_processor(group_dn, stringify_group_entry, record)
         assert Group == record.model
-        assert stringify_group_entry["ou"] == record.identifier
+        assert "superheros" == record.identifier
 
 
 class TestPasswordProcessor:
@@ -296,23 +317,162 @@ class TestAttributeProcessor:
         assert "unsupported" not in user_record.attributes
         assert SUPPORTED_LDIF_ATTRIBUTES == user_record.attributes.keys()
 
-
-class TestCustomAttributeProcessor:
     def test_group_attributes(
         self, group_dn: str, stringify_group_entry: dict, group_record: Record
-    ):
-        custom_attribute_processor(group_dn, stringify_group_entry, group_record)
+    ) -> None:
+        attribute_processor(group_dn, {**stringify_group_entry, "unsupported": ""}, group_record)
 
         assert not group_record.custom_attributes, "Group does not support custom attributes"
 
     def test_unsupported_attributes(self, user_dn: str, user_record: Record) -> None:
         entry = {
             **dict.fromkeys(SUPPORTED_LDIF_ATTRIBUTES, ""),
+            **dict.fromkeys(LDIF_SANITIZE_ATTRIBUTES, ""),
             "unsupported": "unsupported",
         }
-        custom_attribute_processor(user_dn, entry, user_record)
+        attribute_processor(user_dn, entry, user_record)
 
-        assert "unsupported" not in user_record.attributes
-        assert (
-            "unsupported" == user_record.custom_attributes["unsupported"]
-        ), "Any unsupported attributes should be mapped to custom attributes"
+        assert {"unsupported": "unsupported"} == user_record.custom_attributes, (
+            "Any unsupported attributes should be mapped to custom attributes"
+        )
+
+
+class TestProcessorChain:
+    def test_register_processor(self, monkeypatch: pytest.MonkeyPatch, user_dn: str) -> None:
+        monkeypatch.setattr(parser, "processor_chain", list(parser.processor_chain))
+        monkeypatch.setattr(parser, "_compiled_chain", parser._compiled_chain)
+
+        @chain_order(order=7)
+        def tag_processor(dn: str, entry: dict, record: Record) -> None:
+            record.custom_attributes["tagged"] = "true"
+
+        record = process_entry(user_dn, {"cn": [b"serviceuser"]})
+
+        assert tag_processor is parser.processor_chain[-1]
+        assert {"tagged": "true"} == record.custom_attributes
+
+
+class TestStreamParser:
+    def test_stream_records(self) -> None:
+        ldif = StringIO(
+            "dn: ou=superheros,dc=glauth,dc=com\n"
+            "ou: superheros\n"
+            "gidNumber: 5501\n"
+            "\n"
+            "dn: cn=hackers,ou=superheros,dc=glauth,dc=com\n"
+            "cn: hackers\n"
+            "uidNumber: 5001\n"
+            "gidNumber: 5501\n"
+        )
+
+        records = list(StreamParser(ldif, buffer_size=1))
+
+        assert [Group, User] == [record.model for record in records]
+        assert ["superheros", "hackers"] == [record.identifier for record in records]
+
+    def test_stream_modify_record_with_multiple_changes(self) -> None:
+        ldif = StringIO(
+            "dn: cn=hackers,ou=superheros,dc=glauth,dc=com\n"
+            "changetype: modify\n"
+            "replace: sn\n"
+            "sn: hackers\n"
+            "-\n"
+            "add: employeeNumber\n"
+            "employeeNumber: 1\n"
+            "-\n"
+        )
+
+        record = next(iter(StreamParser(ldif)))
+
+        assert OperationType.UPDATE == record.op
+        assert {"sn": "hackers"} == dict(record.attributes)
+        assert {"employeeNumber": "1"} == dict(record.custom_attributes), (
+            "The change separators should not be kept as custom attributes."
+        )
+
+    def test_stream_invalid_record(self) -> None:
+        ldif = StringIO(
+            "dn: ou=superheros,dc=glauth,dc=com\n"
+            "ou: superheros\n"
+            "gidNumber: 5501\n"
+            "\n"
+            "dn: x=hackers,ou=superheros,dc=glauth,dc=com\n"
+            "cn: hackers\n"
+        )
+        stream = iter(StreamParser(ldif))
+
+        assert "superheros" == next(stream).identifier
+        with pytest.raises(InvalidDistinguishedNameError):
+            next(stream)
+
+    def test_stop_streaming(self) -> None:
+        ldif = StringIO(
+            "".join(
+                f"dn: ou=group{i},dc=glauth,dc=com\nou: group{i}\ngidNumber: {i}\n\n"
+                for i in range(10)
+            )
+        )
+        parser = StreamParser(ldif, buffer_size=1)
+        stream = iter(parser)
+
+        assert "group0" == next(stream).identifier
+        stream.close()
+
+        assert parser.records_read < 10, "Parsing should stop once the stream is closed."
+
+
+class TestShardedParser:
+    @pytest.fixture
+    def ldif_file(self, tmp_path: Path) -> Path:
+        (ldif_file := tmp_path / "sharded.ldif").write_text(
+            "".join(
+                f"dn: cn=user{i},ou=group{i},dc=glauth,dc=com\ncn: user{i}\ngidNumber: {i}\n\n"
+                f"dn: ou=group{i},dc=glauth,dc=com\nou: group{i}\ngidNumber: {i}\n\n"
+                for i in range(20)
+            )
+        )
+        return ldif_file
+
+    def test_file_order(self, ldif_file: Path) -> None:
+        parser = ShardedParser(ldif_file, max_workers=2, shard_size=256)
+        with open(ldif_file, "rt") as f:
+            expected = [record.identifier for record in StreamParser(f)]
+
+        assert 1 < len(parser.shards())
+        assert expected == [record.identifier for record in parser]
+        assert 40 == parser.records_read
+
+    def test_groups_first(self, ldif_file: Path) -> None:
+        parser = ShardedParser(ldif_file, max_workers=2, shard_size=256, groups_first=True)
+        records = list(parser)
+
+        assert [Group] * 20 + [User] * 20 == [record.model for record in records]
+        assert [f"user{i}" for i in range(20)] == [record.identifier for record in records[20:]]
+
+    def test_skip_applied_entries(self, ldif_file: Path, tmp_path: Path) -> None:
+        with ApplyJournal(tmp_path / "journal.db") as journal:
+            list(ShardedParser(ldif_file, max_workers=2, shard_size=256, journal=journal))
+            journal.commit()
+
+            parser = ShardedParser(ldif_file, max_workers=2, shard_size=256, journal=journal)
+            assert [] == list(parser)
+            assert 40 == parser.records_read
+
+    def test_skip(self, ldif_file: Path) -> None:
+        parser = ShardedParser(ldif_file, max_workers=2, shard_size=256, skip=35)
+
+        assert ["group17", "user18", "group18", "user19", "group19"] == [
+            record.identifier for record in parser
+        ]
+
+    def test_workers_not_forked(self, ldif_file: Path, mocker: MockerFixture) -> None:
+        pool = mocker.patch("parser.ProcessPoolExecutor", wraps=ProcessPoolExecutor)
+
+        assert 40 == len(list(ShardedParser(ldif_file, max_workers=1)))
+        assert "spawn" == pool.call_args.kwargs["mp_context"].get_start_method()
+
+    def test_invalid_entry(self, tmp_path: Path) -> None:
+        (ldif_file := tmp_path / "invalid.ldif").write_text("dn: cn=user,dc=glauth,dc=com\n\nx\n")
+
+        with pytest.raises(ValueError, match="^Line 3: no value-spec"):
+            list(ShardedParser(ldif_file, max_workers=1))
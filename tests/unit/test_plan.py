@@ -0,0 +1,153 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+from pathlib import Path
+
+import pytest
+from sqlalchemy import Engine, func, select
+from sqlalchemy.orm import Session
+
+from constants import OperationType
+from database import Group, User
+from plan import plan_ldif
+
+
+@pytest.fixture
+def ldif_file(tmp_path: Path) -> Path:
+    ldif_file = tmp_path / "plan.ldif"
+    ldif_file.write_text(
+        "dn: ou=planned,ou=missing,dc=glauth,dc=com\n"
+        "ou: planned\n"
+        "gidNumber: 6200\n"
+        "\n"
+        "dn: cn=planned,ou=planned,dc=glauth,dc=com\n"
+        "cn: planned\n"
+        "uidNumber: 6201\n"
+        "gidNumber: 6200\n"
+        "\n"
+        "dn: cn=planned,ou=planned,dc=glauth,dc=com\n"
+        "changetype: modify\n"
+        "replace: sn\n"
+        "sn: planned\n"
+        "\n"
+        "dn: cn=rename,ou=rename,dc=glauth,dc=com\n"
+        "changetype: modify\n"
+        "replace: sn\n"
+        "sn: rename\n"
+        "\n"
+        "dn: cn=ghost,ou=rename,dc=glauth,dc=com\n"
+        "changetype: modify\n"
+        "replace: sn\n"
+        "sn: ghost\n"
+        "\n"
+        "dn: cn=move,ou=top,dc=glauth,dc=com\n"
+        "changetype: modrdn\n"
+        "newrdn: cn=move\n"
+        "deleteoldrdn: 1\n"
+        "newsuperior: ou=planned,dc=glauth,dc=com\n"
+        "\n"
+        "dn: cn=delete,ou=delete,dc=glauth,dc=com\n"
+        "changetype: delete\n"
+        "\n"
+        "dn: cn=delete,ou=delete,dc=glauth,dc=com\n"
+        "changetype: modrdn\n"
+        "newrdn: cn=delete\n"
+        "deleteoldrdn: 1\n"
+        "newsuperior: ou=nowhere,dc=glauth,dc=com\n"
+    )
+    return ldif_file
+
+
+class TestPlanLdif:
+    def test_plan(self, database: Engine, ldif_file: Path) -> None:
+        plan = plan_ldif([ldif_file], database)
+
+        assert {
+            OperationType.CREATE: 2,
+            OperationType.UPDATE: 3,
+            OperationType.MOVE: 2,
+            OperationType.DELETE: 1,
+        } == plan.operations
+        assert {"missing", "nowhere"} == plan.missing_groups
+        assert 2 == plan.noop_updates, "Updates to the same or missing values are no-ops"
+        assert plan.estimated_statements > 0
+
+    def test_plan_does_not_write(self, database: Engine, ldif_file: Path) -> None:
+        plan_ldif([ldif_file], database)
+
+        with Session(database) as session:
+            assert not session.scalars(select(User).where(User.name == "planned")).first()
+            assert not session.scalars(select(Group).where(Group.name == "planned")).first()
+            assert 1 == session.scalar(
+                select(func.count()).select_from(User).where(User.name == "delete")
+            )
+
+    def test_to_dict(self, database: Engine, ldif_file: Path) -> None:
+        results = plan_ldif([ldif_file], database).to_dict()
+
+        assert {
+            "create": 2,
+            "update": 3,
+            "delete": 1,
+            "move": 2,
+            "attach": 0,
+            "detach": 0,
+        } == results["operations"]
+        assert "missing,nowhere" == results["missing-groups"]
+        assert 2 == results["no-op-updates"]
+
+    def test_plan_reordered(self, database: Engine, tmp_path: Path) -> None:
+        ldif_file = tmp_path / "reorder.ldif"
+        ldif_file.write_text(
+            "dn: cn=move,ou=top,dc=glauth,dc=com\n"
+            "changetype: modrdn\n"
+            "newrdn: cn=move\n"
+            "deleteoldrdn: 1\n"
+            "newsuperior: ou=reordered,dc=glauth,dc=com\n"
+            "\n"
+            "dn: ou=reordered,dc=glauth,dc=com\n"
+            "ou: reordered\n"
+            "gidNumber: 6300\n"
+        )
+
+        assert {"reordered"} == plan_ldif([ldif_file], database).missing_groups
+        assert set() == plan_ldif([ldif_file], database, reorder=True).missing_groups
+
+    def test_plan_missing_primary_groups(self, database: Engine, tmp_path: Path) -> None:
+        ldif_file = tmp_path / "primary.ldif"
+        ldif_file.write_text(
+            "dn: cn=existing,ou=juju,dc=glauth,dc=com\n"
+            "cn: existing\n"
+            "uidNumber: 6401\n"
+            "gidNumber: 5501\n"
+            "\n"
+            "dn: cn=orphan,ou=missing,dc=glauth,dc=com\n"
+            "cn: orphan\n"
+            "uidNumber: 6402\n"
+            "gidNumber: 9999\n"
+            "\n"
+            "dn: ou=juju,dc=glauth,dc=com\n"
+            "changetype: delete\n"
+            "\n"
+            "dn: cn=serviceuser,ou=juju,dc=glauth,dc=com\n"
+            "changetype: modify\n"
+            "replace: gidNumber\n"
+            "gidNumber: 5501\n"
+            "-\n"
+            "replace: sn\n"
+            "sn: service\n"
+            "-\n"
+            "\n"
+            "dn: ou=recreated,dc=glauth,dc=com\n"
+            "ou: recreated\n"
+            "gidNumber: 5501\n"
+            "\n"
+            "dn: cn=recreated,ou=recreated,dc=glauth,dc=com\n"
+            "cn: recreated\n"
+            "uidNumber: 6403\n"
+            "gidNumber: 5501\n"
+        )
+
+        assert {"9999", "5501"} == plan_ldif([ldif_file], database).missing_groups, (
+            "Primary groups should be missing until created, and once deleted."
+        )
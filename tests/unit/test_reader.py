@@ -0,0 +1,180 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+import random
+from pathlib import Path
+from typing import Optional
+
+import pytest
+from conftest import INTEGRATION_TEST_DIR
+from ldif import LDIFRecordList
+
+from reader import MappedLDIFParser, parse_record, record_boundaries, split_ranges
+
+LDIF = (
+    b"version: 1\n"
+    b"\n"
+    b"# A comment\n"
+    b"#  folded\n"
+    b"\n"
+    b"dn: cn=hackers,ou=superheros,dc=glauth,dc=com\r\n"
+    b"cn: hackers\r\n"
+    b"description: folded\r\n"
+    b"  value\r\n"
+    b"objectClass: posixAccount\r\n"
+    b"mail:: aGFja2Vyc0BnbGF1dGguY29t\r\n"
+    b"sn:\r\n"
+    b"\r\n"
+    b"\n"
+    b"dn: ou=superheros,dc=glauth,dc=com\n"
+    b"changetype: modify\n"
+    b"add: memberUid\n"
+    b"memberUid: 5001\n"
+    b"memberUid: 5002\n"
+    b"-\n"
+)
+
+
+class _RecordList(MappedLDIFParser, LDIFRecordList):
+    pass
+
+
+def _generate_ldif(rng: random.Random) -> bytes:
+    # Records separated and followed by empty lines, space lines and comments
+    newline = rng.choice([b"\n", b"\r\n"])
+    lines = []
+    for i in range(rng.randint(1, 3)):
+        lines += [b"dn: cn=%d,dc=glauth,dc=com" % i, b"cn: %d" % i]
+        lines += rng.choices([b"", b" ", b"  ", b"# comment", b"#  folded", b" folded"], k=3)
+    return newline.join(lines) + rng.choice([b"", newline])
+
+
+def _parse_or_fail(ldif_file: Path) -> tuple[Optional[list], Optional[list]]:
+    # The records of each parser, or None if it fails
+    results = []
+    for parser, mode in ((LDIFRecordList, "rt"), (_RecordList, "rb")):
+        with open(ldif_file, mode) as f:
+            records = parser(f)
+            try:
+                records.parse()
+            except ValueError:
+                results.append(None)
+            else:
+                results.append(records.all_records)
+    return results[0], results[1]
+
+
+def _parse(ldif_file: Path) -> tuple[list, list]:
+    with open(ldif_file, "rt") as f:
+        expected = LDIFRecordList(f, ignored_attr_types=["objectClass"])
+        expected.parse()
+    with open(ldif_file, "rb") as f:
+        actual = _RecordList(f, ignored_attr_types=["objectClass"])
+        actual.parse()
+    return expected.all_records, actual.all_records
+
+
+class TestRecordBoundaries:
+    def test_boundaries(self) -> None:
+        data = b"\n\ndn: a\n b\n#c\n\r\n\ndn: d\r\n\r\ndn: e"
+
+        assert [b"dn: a\n b\n#c", b"dn: d", b"dn: e"] == [
+            data[r.start : r.stop] for r in record_boundaries(data)
+        ]
+
+    def test_boundaries_in_range(self) -> None:
+        data = b"dn: a\n\ndn: b\n\ndn: c\n"
+
+        assert [range(7, 12)] == list(record_boundaries(data, 7, 14))
+
+
+class TestSplitRanges:
+    def test_split_ranges(self) -> None:
+        data = b"".join(b"dn: cn=%d\n\n" % i for i in range(10))
+        ranges = split_ranges(data, 3)
+
+        assert 3 == len(ranges)
+        assert (0, len(data)) == (ranges[0].start, ranges[-1].stop)
+        assert all(data[r.start : r.start + 3] == b"dn:" for r in ranges)
+        assert 10 == sum(len(list(record_boundaries(data, r.start, r.stop))) for r in ranges)
+
+    def test_more_ranges_than_records(self) -> None:
+        assert [range(0, 7), range(7, 13)] == split_ranges(b"dn: a\n\ndn: b\n", 5)
+
+
+class TestParseRecord:
+    def test_parse_record(self) -> None:
+        dn, entry = parse_record(b"dn: cn=a,dc=b\ncn: a\nobjectclass: x\nmail:< file:///x\n-")
+
+        assert "cn=a,dc=b" == dn
+        assert {"cn": [b"a"], "objectclass": [b"x"], "mail": [None], "-": [None]} == entry
+
+    def test_ignored_attributes(self) -> None:
+        _, entry = parse_record(b"dn: cn=a,dc=b\nobjectClass: x", {"objectclass"})
+
+        assert {} == entry
+
+    def test_comments_only(self) -> None:
+        assert parse_record(b"# comment\n folded") is None
+
+    @pytest.mark.parametrize(
+        "data,error",
+        [
+            (b"cn: a", 'does not start with "dn:"'),
+            (b"dn: invalid", "Not a valid string-representation for dn"),
+            (b"dn: cn=a,dc=b\ninvalid", "no value-spec"),
+        ],
+    )
+    def test_invalid_record(self, data: bytes, error: str) -> None:
+        with pytest.raises(ValueError, match=error):
+            parse_record(data)
+
+
+class TestMappedLDIFParser:
+    @pytest.mark.parametrize("name", ["add", "modify", "rename", "move", "attach", "delete"])
+    def test_same_entries_as_ldif_parser(self, name: str) -> None:
+        expected, actual = _parse(INTEGRATION_TEST_DIR / "ldif" / f"{name}.ldif")
+
+        assert expected == actual
+
+    def test_same_entries_with_syntax_variants(self, tmp_path: Path) -> None:
+        (ldif_file := tmp_path / "variants.ldif").write_bytes(LDIF)
+        expected, actual = _parse(ldif_file)
+
+        assert 2 == len(actual)
+        assert expected == actual
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            b"dn: cn=a,dc=b\ncn: a\n\n \ndn: cn=b,dc=b\ncn: b\n\n \n \n\ndn: cn=c,dc=b\ncn: c\n",
+            b"dn: cn=a,dc=b\r\ncn: a\r\n\r\n \r\ndn: cn=b,dc=b\r\ncn: b\r\n\r\n \r\n",
+            b"dn: cn=a,dc=b\ncn: a\n \n\n# comment\n\ndn: cn=b,dc=b\n#  folded\ncn: b\n \n",
+            b"dn: cn=a,dc=b\ncn: a\n\n  \ndn: cn=b,dc=b\ncn: b\n",
+        ],
+    )
+    def test_same_entries_with_separator_variants(self, tmp_path: Path, data: bytes) -> None:
+        (ldif_file := tmp_path / "separators.ldif").write_bytes(data)
+        expected, actual = _parse_or_fail(ldif_file)
+
+        assert expected == actual
+
+    def test_same_entries_with_generated_files(self, tmp_path: Path) -> None:
+        rng = random.Random(0)
+        ldif_file = tmp_path / "generated.ldif"
+        for _ in range(500):
+            ldif_file.write_bytes(data := _generate_ldif(rng))
+            expected, actual = _parse_or_fail(ldif_file)
+
+            assert expected == actual, data
+
+    def test_empty_file(self, tmp_path: Path) -> None:
+        (ldif_file := tmp_path / "empty.ldif").write_bytes(b"")
+
+        assert ([], []) == _parse(ldif_file)
+
+    def test_error_line(self, tmp_path: Path) -> None:
+        (ldif_file := tmp_path / "invalid.ldif").write_bytes(LDIF + b"\ncn: hackers\n")
+
+        with open(ldif_file, "rb") as f, pytest.raises(ValueError, match="^Line 22: "):
+            _RecordList(f).parse()
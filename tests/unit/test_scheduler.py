@@ -0,0 +1,119 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+from parser import Record
+
+import pytest
+
+from constants import OperationType
+from database import Group, User
+from exceptions import CircularDependencyError
+from scheduler import DependencyScheduler, record_access
+
+
+def user(name: str, op: OperationType = OperationType.CREATE, **attributes: str) -> Record:
+    return Record(identifier=name, model=User, op=op, attributes=attributes)
+
+
+def group(name: str, op: OperationType = OperationType.CREATE, **attributes: str) -> Record:
+    return Record(identifier=name, model=Group, op=op, attributes=attributes)
+
+
+def waves(*records: Record) -> list[list[tuple[str, OperationType]]]:
+    return [
+        [(record.identifier, record.op) for record in wave]
+        for wave in DependencyScheduler(records).waves()
+    ]
+
+
+class TestRecordAccess:
+    def test_user_creation(self) -> None:
+        access = record_access(user("johndoe", uidNumber="5001", gidNumber="5501"))
+
+        assert {("user", "johndoe"), ("uid", "5001")} == access.creates
+        assert {("gid", "5501"), ("gid", None), ("uid", None)} == access.reads
+
+    def test_attach(self) -> None:
+        access = record_access(group("hackers", OperationType.ATTACH, memberUid=["5001", "5002"]))
+
+        assert {("member", "hackers", "5001"), ("member", "hackers", "5002")} == access.writes
+        assert {("group", "hackers"), ("uid", "5001"), ("uid", "5002"), ("uid", None)} == (
+            access.reads
+        )
+
+
+class TestDependencyScheduler:
+    def test_creations_before_references(self) -> None:
+        assert [
+            [("hackers", OperationType.CREATE)],
+            [("johndoe", OperationType.CREATE)],
+            [("hackers", OperationType.ATTACH)],
+        ] == waves(
+            group("hackers", OperationType.ATTACH, memberUid="5001"),
+            user("johndoe", uidNumber="5001", gidNumber="5501"),
+            group("hackers", gidNumber="5501"),
+        )
+
+    def test_move_after_parent_group_creation(self) -> None:
+        assert [
+            [("child", OperationType.CREATE), ("parent", OperationType.CREATE)],
+            [("child", OperationType.MOVE)],
+        ] == waves(
+            group("child", OperationType.MOVE, parentGroup="", newParentGroup="parent"),
+            group("child", gidNumber="5502"),
+            group("parent", gidNumber="5501"),
+        )
+
+    def test_delete_after_detach(self) -> None:
+        assert [
+            [("hackers", OperationType.DETACH)],
+            [("hackers", OperationType.DELETE)],
+            [("hackers", OperationType.CREATE)],
+        ] == waves(
+            group("hackers", OperationType.DETACH, memberUid="5001"),
+            group("hackers", OperationType.DELETE),
+            group("hackers", gidNumber="5501"),
+        )
+
+    def test_independent_records_batched_in_one_wave(self) -> None:
+        assert [
+            [
+                ("johndoe", OperationType.CREATE),
+                ("janedoe", OperationType.CREATE),
+                ("hackers", OperationType.CREATE),
+                ("serviceuser", OperationType.UPDATE),
+            ]
+        ] == waves(
+            user("johndoe", uidNumber="5001"),
+            group("hackers", gidNumber="5501"),
+            user("serviceuser", OperationType.UPDATE, sn="service"),
+            user("janedoe", uidNumber="5002"),
+        )
+
+    def test_updates_in_file_order(self) -> None:
+        assert [
+            [("johndoe", OperationType.UPDATE)],
+            [("johndoe", OperationType.MOVE)],
+        ] == waves(
+            user("johndoe", OperationType.UPDATE, sn="doe"),
+            user("johndoe", OperationType.MOVE, ou="hackers"),
+        )
+
+    def test_circular_dependencies(self) -> None:
+        records = [
+            user("johndoe", uidNumber="5001"),
+            group("child", OperationType.MOVE, parentGroup="", newParentGroup="parent"),
+            group("parent", gidNumber="5501", parentGroup="child"),
+            group("child", gidNumber="5502"),
+        ]
+
+        with pytest.raises(
+            CircularDependencyError,
+            match=": move child -> create parent -> move child$",
+        ):
+            list(DependencyScheduler(records).waves())
+
+    def test_iterate_records(self) -> None:
+        records = [user("johndoe", gidNumber="5501"), group("hackers", gidNumber="5501")]
+
+        assert records[::-1] == list(DependencyScheduler(records))
@@ -0,0 +1,152 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+import json
+import logging
+from logging import INFO, WARN
+
+import pytest
+from pytest_mock import MockerFixture
+
+from security_logging import NESTED_JSON_KEY, OWASPLogger
+
+
+class ListHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.records: list[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+
+
+@pytest.fixture
+def handler() -> ListHandler:
+    return ListHandler()
+
+
+@pytest.fixture
+def security_logger(handler: ListHandler) -> OWASPLogger:
+    logger = logging.getLogger("test_security_logging")
+    logger.setLevel(INFO)
+    logger.propagate = False
+    logger.handlers = [handler]
+    return OWASPLogger(appid="test", logger=logger)
+
+
+def log_users_created(security_logger: OWASPLogger, *names: str) -> None:
+    for name in names:
+        security_logger.log_event(
+            event=f"authz_admin:user_created:{name}",
+            level=WARN,
+            description=f"User `{name}` was created",
+            user=name,
+        )
+
+
+class TestOWASPLogger:
+    def test_log_event(self, security_logger: OWASPLogger, handler: ListHandler) -> None:
+        log_users_created(security_logger, "john")
+
+        (record,) = handler.records
+        event = getattr(record, NESTED_JSON_KEY)
+        assert event == json.loads(record.getMessage())
+        assert {
+            "appid": "test",
+            "event": "authz_admin:user_created:john",
+            "level": "WARNING",
+            "description": "User `john` was created",
+            "type": "security",
+            "user": "john",
+        } == {k: v for k, v in event.items() if k != "datetime"}
+
+    def test_disabled_level(self, security_logger: OWASPLogger, handler: ListHandler) -> None:
+        security_logger.log_event(event="authz_admin:debug", level=logging.DEBUG, description="")
+
+        assert not handler.records
+
+    def test_batched(self, security_logger: OWASPLogger, handler: ListHandler) -> None:
+        with security_logger.batched(batch_size=2, queue_size=2):
+            log_users_created(security_logger, "john", "jane", "joe")
+
+        assert ["john", "jane", "joe"] == [
+            getattr(r, NESTED_JSON_KEY)["user"] for r in handler.records
+        ]
+
+    def test_batched_summary(self, security_logger: OWASPLogger, handler: ListHandler) -> None:
+        with security_logger.batched(summarize=True):
+            log_users_created(security_logger, "john", "jane")
+            security_logger.log_event(
+                event="authz_admin:user_deleted:joe", level=WARN, description="User `joe`"
+            )
+
+        summary, deleted = (getattr(r, NESTED_JSON_KEY) for r in handler.records)
+        assert "authz_admin:user_created" == summary["event"]
+        assert (2, "john,jane") == (summary["count"], summary["identifiers"])
+        assert {"datetime", "appid", "event", "level", "description", "type"} <= summary.keys()
+        assert "authz_admin:user_deleted:joe" == deleted["event"]
+
+    def test_summary_of_interleaved_events(
+        self, security_logger: OWASPLogger, handler: ListHandler, mocker: MockerFixture
+    ) -> None:
+        now = mocker.patch("security_logging._now", return_value="2026-01-01T00:00:00+00:00")
+        with security_logger.batched(summarize=True):
+            log_users_created(security_logger, "john")
+            security_logger.log_event(
+                event="authz_admin:group_created:hackers", level=WARN, description="Group"
+            )
+            log_users_created(security_logger, "jane", "joe")
+
+        summary, created = (getattr(r, NESTED_JSON_KEY) for r in handler.records)
+        assert ("authz_admin:user_created", "john,jane,joe") == (
+            summary["event"],
+            summary["identifiers"],
+        )
+        assert "authz_admin:group_created:hackers" == created["event"]
+        assert {"2026-01-01T00:00:00+00:00"} == {summary["datetime"], created["datetime"]}
+        now.assert_called_once()
+
+    def test_summary_labels(self, security_logger: OWASPLogger, handler: ListHandler) -> None:
+        with security_logger.batched(summarize=True):
+            for group, uids in (("hackers", "5001,5002"), ("crackers", "5003")):
+                security_logger.log_event(
+                    event=f"authz_admin:group_attached:{group}",
+                    level=WARN,
+                    description=f"Attached users to group `{group}`",
+                    group=group,
+                    uids=uids,
+                )
+
+        (summary,) = (getattr(r, NESTED_JSON_KEY) for r in handler.records)
+        assert "hackers,crackers" == summary["identifiers"]
+        assert ["5001,5002", "5003"] == summary["uids"]
+        assert "group" not in summary, "Labels repeating the identifiers should be skipped"
+
+    def test_summary_per_batch(self, security_logger: OWASPLogger, handler: ListHandler) -> None:
+        with security_logger.batched(summarize=True, batch_size=2):
+            log_users_created(security_logger, "john", "jane", "joe")
+
+        assert ["john,jane", "joe"] == [
+            getattr(r, NESTED_JSON_KEY).get("identifiers", "joe") for r in handler.records
+        ]
+
+    def test_nested_batched(self, security_logger: OWASPLogger, handler: ListHandler) -> None:
+        with security_logger.batched(summarize=True):
+            with security_logger.batched():
+                log_users_created(security_logger, "john", "jane")
+
+            assert not handler.records
+
+        assert 1 == len(handler.records)
+
+    def test_failed_write(self, security_logger: OWASPLogger, handler: ListHandler) -> None:
+        with security_logger.batched(batch_size=1, queue_size=1):
+            security_logger.log_event(
+                event="authz_admin:user_created:john",
+                level=WARN,
+                description="User `john` was created",
+                user=object(),
+            )
+            log_users_created(security_logger, "jane", "joe")
+
+        assert ["jane", "joe"] == [getattr(r, NESTED_JSON_KEY)["user"] for r in handler.records]
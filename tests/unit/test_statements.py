@@ -0,0 +1,53 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+from sqlalchemy import Engine
+from sqlalchemy.orm import Session
+
+from database import Group, User
+from statements import (
+    attach_members,
+    detach_members,
+    select_by_name,
+    select_by_names,
+    select_groups_by_gid_numbers,
+)
+
+
+class TestStatements:
+    def test_statements_are_built_once(self) -> None:
+        assert select_by_name(User) is select_by_name(User)
+        assert select_by_names(Group, "sqlite") is select_by_names(Group, "sqlite")
+        assert attach_members("sqlite") is not attach_members("postgresql")
+
+    def test_select(self, database: Engine) -> None:
+        with Session(database) as session:
+            user = session.scalars(select_by_name(User), {"name": "attach"}).one()
+            groups = session.scalars(
+                select_by_names(Group, "sqlite"), {"names": ["top", "sub", "missing"]}
+            ).all()
+            group = session.scalars(
+                select_groups_by_gid_numbers("sqlite"), {"gid_numbers": [5509]}
+            ).one()
+
+        assert 5006 == user.uid_number
+        assert {"top", "sub"} == {group.name for group in groups}
+        assert "primary" == group.name
+
+    def test_attach_and_detach_members(self, database: Engine) -> None:
+        with Session(database) as session:
+            for gid_number in ("5510", "5511"):
+                session.execute(
+                    attach_members("sqlite"),
+                    {"uid_numbers": [5006, 5007], "gid_number": gid_number},
+                )
+            session.execute(
+                detach_members("sqlite"), {"uid_numbers": [5007], "gid_number": "5510"}
+            )
+
+            users = {
+                name: session.scalars(select_by_name(User), {"name": name}).one().other_groups
+                for name in ("attach", "detach")
+            }
+
+        assert {"attach": {"5510", "5511"}, "detach": {"5511"}} == users
@@ -0,0 +1,131 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+from pathlib import Path
+
+import pytest
+from sqlalchemy import Engine, event, func, select
+from sqlalchemy.orm import Session
+
+from action import sync_ldif
+from constants import OperationType
+from database import Group, IncludeGroup, User
+from exceptions import InvalidAttributeValueError
+from export import export_ldif
+
+
+@pytest.fixture
+def desired_state(database: Engine, tmp_path: Path) -> Path:
+    ldif_file = tmp_path / "desired.ldif"
+    export_ldif(ldif_file, database)
+    return ldif_file
+
+
+def _edit(ldif_file: Path, old: str, new: str) -> None:
+    content = ldif_file.read_text()
+    assert old in content
+    ldif_file.write_text(content.replace(old, new))
+
+
+def _user(engine: Engine, name: str) -> User:
+    with Session(engine) as session:
+        return session.scalars(select(User).where(User.name == name)).one_or_none()
+
+
+class TestSyncLdif:
+    def test_unchanged(self, database: Engine, desired_state: Path) -> None:
+        writes = []
+
+        def record_write(conn, cursor, statement: str, *args) -> None:
+            if not statement.lstrip().upper().startswith("SELECT"):
+                writes.append(statement)
+
+        event.listen(database, "before_cursor_execute", record_write)
+        assert not sync_ldif([desired_state], database)
+        assert not writes
+
+    def test_changes(self, database: Engine, desired_state: Path) -> None:
+        _edit(desired_state, "sn: modify\n", "sn: modified\nemployeeNumber: 42\n")
+        _edit(desired_state, "mail: modify.glauth.com\n", "")
+        _edit(
+            desired_state,
+            "dn: cn=delete,ou=delete,dc=glauth,dc=com\n",
+            "dn: cn=created,ou=delete,dc=glauth,dc=com\n",
+        )
+        _edit(desired_state, "cn: delete\n", "cn: created\n")
+        _edit(desired_state, "uidNumber: 5008\n", "uidNumber: 5009\n")
+        _edit(
+            desired_state, "dn: ou=sub,dc=glauth,dc=com\n", "dn: ou=sub,ou=top,dc=glauth,dc=com\n"
+        )
+        _edit(desired_state, "memberUid: 5007\n", "memberUid: 5006\n")
+
+        operations = sync_ldif([desired_state], database)
+
+        assert {
+            OperationType.CREATE: 1,
+            OperationType.UPDATE: 1,
+            OperationType.DELETE: 1,
+            OperationType.MOVE: 1,
+            OperationType.ATTACH: 1,
+            OperationType.DETACH: 1,
+        } == operations
+
+        modified = _user(database, "modify")
+        assert ("modified", "", {"employeeNumber": "42"}) == (
+            modified.surname,
+            modified.email,
+            modified.custom_attributes,
+        )
+        assert _user(database, "delete") is None
+        assert 5009 == _user(database, "created").uid_number
+        assert {"5510"} == _user(database, "attach").other_groups
+        assert set() == _user(database, "detach").other_groups
+
+        with Session(database) as session:
+            assert [(5507, 5508)] == session.execute(
+                select(IncludeGroup.parent_group_id, IncludeGroup.child_group_id)
+            ).all()
+
+        assert not sync_ldif([desired_state], database)
+
+    def test_delete_missing_entries(self, database: Engine, tmp_path: Path) -> None:
+        ldif_file = tmp_path / "desired.ldif"
+        ldif_file.write_text(
+            "dn: ou=juju,dc=glauth,dc=com\n"
+            "ou: juju\n"
+            "gidNumber: 5501\n"
+            "\n"
+            "dn: cn=serviceuser,ou=juju,dc=glauth,dc=com\n"
+            "cn: serviceuser\n"
+            "uidNumber: 5001\n"
+            "gidNumber: 5501\n"
+            "userPassword: {SHA256}"
+            "652c7dc687d98c9889304ed2e408c74b611e86a40caa51c4b43f1dd5913c5cd0\n"
+        )
+
+        operations = sync_ldif([ldif_file], database)
+
+        assert {OperationType.DELETE: 14} == operations
+        with Session(database) as session:
+            assert ["serviceuser"] == session.scalars(select(User.name)).all()
+            assert 1 == session.scalar(select(func.count()).select_from(Group))
+
+    def test_dry_run(self, database: Engine, desired_state: Path) -> None:
+        _edit(desired_state, "sn: modify\n", "sn: modified\n")
+
+        assert {OperationType.UPDATE: 1} == sync_ldif([desired_state], database, dry_run=True)
+        assert "modify" == _user(database, "modify").surname
+
+    @pytest.mark.parametrize(
+        "entry",
+        [
+            "dn: cn=modify,ou=smoker,dc=glauth,dc=com\nchangetype: delete\n",
+            "dn: cn=nobody,ou=smoker,dc=glauth,dc=com\ncn: nobody\ngidNumber: 5505\n",
+        ],
+    )
+    def test_invalid_desired_state(self, database: Engine, tmp_path: Path, entry: str) -> None:
+        ldif_file = tmp_path / "desired.ldif"
+        ldif_file.write_text(entry)
+
+        with pytest.raises(InvalidAttributeValueError):
+            sync_ldif([ldif_file], database)
@@ -0,0 +1,131 @@
+# Copyright 2026 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+from conftest import INTEGRATION_TEST_DIR
+from pytest_mock import MockerFixture
+from sqlalchemy import Engine
+
+from validation import check_syntax, split_entries, validate_ldif
+
+
+@pytest.fixture
+def ldif_file(tmp_path: Path) -> Path:
+    ldif_file = tmp_path / "invalid.ldif"
+    ldif_file.write_text(
+        "version: 1\n"
+        "\n"
+        "# A user whose primary group does not exist\n"
+        "dn: cn=orphan,ou=missing,dc=glauth,dc=com\n"
+        "cn: orphan\n"
+        "uidNumber: 6001\n"
+        "gidNumber: 6000\n"
+        "\n"
+        "dn: cn=invalid password,ou=juju,dc=glauth,dc=com\n"
+        "cn: invalid password\n"
+        "uidNumber: 6002\n"
+        "gidNumber: 5501\n"
+        "userPassword: secret\n"
+        "\n"
+        "dn: ou=created,ou=juju,dc=glauth,dc=com\n"
+        "ou: created\n"
+        "gidNumber: 6003\n"
+        "\n"
+        "dn: cn=created,ou=created,dc=glauth,dc=com\n"
+        "cn: created\n"
+        "uidNumber: 6004\n"
+        "gidNumber: 6003\n"
+        "\n"
+        "dn: ou=juju,dc=glauth,dc=com\n"
+        "ou: juju\n"
+        "gidNumber: 5501\n"
+        "\n"
+        "dn: ou=secondary,dc=glauth,dc=com\n"
+        "changetype: modify\n"
+        "add: memberUid\n"
+        "memberUid: 6004\n"
+        "memberUid: 6666\n"
+        "\n"
+        "dn: ou=created,ou=juju,dc=glauth,dc=com\n"
+        "changetype: moddn\n"
+        "deleteoldrdn: 1\n"
+        "newsuperior: ou=missing,dc=glauth,dc=com\n"
+    )
+    return ldif_file
+
+
+class TestSplitEntries:
+    def test_split_entries(self) -> None:
+        entries = list(
+            split_entries(
+                b"version: 1\n\n# comment\ndn: ou=a,dc=glauth,dc=com\n"
+                b"description: folded\n  value\n\n\n"
+                b"dn: ou=b,dc=glauth,dc=com\nou: b"
+            )
+        )
+
+        assert [1, 4, 9] == [line for line, _ in entries]
+        assert 4 == len(entries[1][1])
+
+    def test_split_entries_with_crlf(self) -> None:
+        entries = list(
+            split_entries(
+                b"dn: ou=a,dc=glauth,dc=com\r\nou: a\r\n\r\n\r\ndn: ou=b,dc=glauth,dc=com\r\n"
+            )
+        )
+
+        assert [1, 5] == [line for line, _ in entries]
+        assert ["dn: ou=a,dc=glauth,dc=com\r\n", "ou: a\n"] == entries[0][1]
+
+
+class TestCheckSyntax:
+    def test_check_syntax(self) -> None:
+        results = check_syntax([
+            (1, ["dn: ou=group,dc=glauth,dc=com\n", "ou: group\n"]),
+            (4, ["dn: cn=user,ou=group,dc=glauth,dc=com\n", "userPassword: secret\n"]),
+            (7, ["cn: user\n"]),
+        ])
+
+        assert 1 == results[0][0] and results[0][1].identifier == "group"
+        assert (4, "Invalid password for DN: cn=user,ou=group,dc=glauth,dc=com") == results[1]
+        assert 7 == results[2][0] and "does not start with" in results[2][1]
+
+
+class TestValidateLdif:
+    def test_validate_ldif(self, database: Engine, ldif_file: Path) -> None:
+        report = validate_ldif([ldif_file], database, max_workers=2, chunk_size=2)
+
+        assert 7 == report.entries
+        assert [
+            (4, "The primary group 6000 of user orphan does not exist"),
+            (9, "Invalid password for DN: cn=invalid password,ou=juju,dc=glauth,dc=com"),
+            (24, "The group juju already exists"),
+            (28, "The members 6666 of group secondary do not exist"),
+            (34, "The parent group missing of group created does not exist"),
+        ] == [(issue.line, issue.message) for issue in report.issues]
+        assert f"{ldif_file}:4: The primary group" in report.to_dict()["issues"]
+
+    def test_validate_empty_ldif(self, database: Engine, tmp_path: Path) -> None:
+        (ldif_file := tmp_path / "empty.ldif").write_text("")
+
+        report = validate_ldif([ldif_file], database, max_workers=1)
+
+        assert (0, True) == (report.entries, report.is_valid)
+
+    def test_workers_not_forked(
+        self, database: Engine, ldif_file: Path, mocker: MockerFixture
+    ) -> None:
+        pool = mocker.patch("validation.ProcessPoolExecutor", wraps=ProcessPoolExecutor)
+
+        assert 7 == validate_ldif([ldif_file], database, max_workers=1).entries
+        assert "spawn" == pool.call_args.kwargs["mp_context"].get_start_method()
+
+    def test_validate_integration_ldif_files(self, database: Engine) -> None:
+        ldif_files = sorted((INTEGRATION_TEST_DIR / "ldif").glob("*.ldif"))
+
+        report = validate_ldif(ldif_files, database, max_workers=1)
+
+        assert report.is_valid, report.to_dict()["issues"]